@@ -8,25 +8,26 @@ import threading
 import time
 
 from drink_runner import make_drink
+from drink_catalog import estimate_order, get_catalog
+from serial_comm import close_all_connections
+from ui_events import UIStateBus
+from order_queue import OrderQueue, PENDING, PROCESSING, format_time
+from fleet import make_station_robot
+from scheduling import make_policy
+from config import SCHEDULING_POLICY, ORDER_SERVER_URL
+import order_client
 import gui  # teaching GUI
 
 OWNER_PASSWORD = "0000"
 DEV_PASSWORD = "0000"
 
-DRINKS = [
-    ("mango", "Mango Juice"),      
-    ("orange", "Orange Juice"),
-    ("grape", "Grape Juice"),
-    ("apple", "Apple Juice"),
-]
-
-# Estimated time per drink in seconds (adjust based on your actual times)
-DRINK_TIME_ESTIMATE = {
-    "mango": 45,
-    "orange": 40,
-    "grape": 50,
-    "apple": 42,
-}
+# Only drinks with a recipe in programs/juices can be ordered
+DRINKS = [(key, f"{key.replace('_', ' ').title()} Juice") for key in get_catalog().keys()]
+
+def drink_label(juice_key: str) -> str:
+    return next((lbl for k, lbl in DRINKS if k == juice_key), juice_key)
+
+
 class App(tk.Tk):
     def __init__(self):
         super().__init__()
@@ -36,6 +37,18 @@ class App(tk.Tk):
         self.container = tk.Frame(self)
         self.container.pack(fill="both", expand=True)
 
+        # Live queue: customers add orders at any time, the worker takes the
+        # next one as soon as the robot is free. With ORDER_SERVER_URL set, both
+        # live in order_server.py and this kiosk is one of its clients.
+        self.remote = bool(ORDER_SERVER_URL)
+        if self.remote:
+            self.order_queue, self.robot = order_client.connect(ORDER_SERVER_URL)
+        else:
+            self.order_queue = OrderQueue(estimate=estimate_order,
+                                          policy=make_policy(SCHEDULING_POLICY))
+            self.robot = make_station_robot(self.order_queue)  # One arm, or a fleet
+
+        self.test_running = False  # Developer test drink on the arm; the queue stays paused
         self.frame = None
         self.show_owner_login()
 
@@ -49,13 +62,13 @@ class App(tk.Tk):
         self.show_frame(OwnerLogin, self.show_customer)
 
     def show_customer(self):
-        self.show_frame(CustomerScreen, self.show_dev_login)
+        self.show_frame(CustomerScreen, self.show_dev_login, self.order_queue, self.robot)
 
     def show_dev_login(self):
         self.show_frame(DevLogin, self.show_dev_screen, self.show_customer)
 
     def show_dev_screen(self):
-        self.show_frame(DeveloperScreen, self.show_customer)
+        self.show_frame(DeveloperScreen, self.show_customer, self.robot)
 
 
 class OwnerLogin(tk.Frame):
@@ -106,13 +119,11 @@ class DevLogin(tk.Frame):
             messagebox.showerror("Access denied", "Wrong developer password")
             self.entry.delete(0, tk.END)
 class CustomerScreen(tk.Frame):
-    def __init__(self, master, on_open_dev):
+    def __init__(self, master, on_open_dev, order_queue, robot):
         super().__init__(master)
         self.on_open_dev = on_open_dev
-        self.order_queue = []  # List of (drink_key, quantity) tuples
-        self.running = False
-        self.current_order_index = 0
-        self.current_drink_in_order = 0
+        self.order_queue = order_queue  # Shared OrderQueue (owned by App)
+        self.robot = robot              # RobotWorker or FleetDispatcher consuming it
 
         # Top bar
         top = tk.Frame(self)
@@ -217,148 +228,173 @@ class CustomerScreen(tk.Frame):
         tk.Label(right, textvariable=self.status, fg="green", 
                 wraplength=220, bg="#f0f0f0", font=("Arial", 9)).pack(pady=5)
 
+        self._bind_ui_state()
+        self._show_running(self.robot.running)
+        self.refresh_queue_display()
+
     def add_to_queue(self, juice_key):
-        """Add drink to queue with quantity."""
-        if self.running:
-            messagebox.showwarning("Processing", "Wait for current queue to finish!")
-            return
-        
+        """Add drink to queue with quantity (also while the robot is working)."""
         quantity = self.quantity_vars[juice_key].get()
-        drink_name = next((lbl for k, lbl in DRINKS if k == juice_key), juice_key)
+        drink_name = drink_label(juice_key)
         
-        self.order_queue.append((juice_key, quantity))
+        try:
+            order = self.order_queue.add_order(juice_key, quantity)
+        except order_client.OrderServerError as e:
+            messagebox.showerror("Order Server", str(e))
+            return
         self.refresh_queue_display()
         self.update_total_time()
         
-        self.status.set(f"✓ Added {quantity}x {drink_name}")
+        self.status.set(f"✓ Added {quantity}x {drink_name} (#{order.order_id})")
 
     def refresh_queue_display(self):
-        """Refresh the queue listbox."""
+        """Refresh the queue listbox (order in progress first, then waiting orders)."""
+        if self.winfo_toplevel().remote:
+            self._orders_wanted.set()  # Fetched by _fetch_orders, shown via ui_state
+            return
+        self._show_orders(self.order_queue.orders)
+
+    def _fetch_orders(self):
+        """Remote kiosk thread: GET /queue when a refresh is asked for, off the Tk thread."""
+        while not self._closed.is_set():
+            if not self._orders_wanted.wait(0.5):
+                continue
+            self._orders_wanted.clear()
+            try:
+                self.ui_state.set("orders", self.order_queue.orders)
+            except order_client.OrderServerError as e:
+                self.ui_state.set("status", f"⚠ {e}")  # Asked for on every queue event; no dialog
+
+    def _show_orders(self, orders):
         self.queue_listbox.delete(0, tk.END)
         
-        for idx, (key, qty) in enumerate(self.order_queue, start=1):
-            drink_name = next((lbl for k, lbl in DRINKS if k == key), key)
-            status = "🔄" if idx - 1 == self.current_order_index and self.running else "⏳"
-            display_text = f"{status} #{idx}: {drink_name} x{qty}"
+        active = [o for o in orders if o.status in (PROCESSING, PENDING)]
+        for order in active:
+            status = "🔄" if order.status == PROCESSING else "⏳"
+            display_text = f"{status} #{order.order_id}: {drink_label(order.flavor)} x{order.quantity}"
             self.queue_listbox.insert(tk.END, display_text)
             
             # Highlight current order
-            if idx - 1 == self.current_order_index and self.running:
+            if order.status == PROCESSING:
                 self.queue_listbox.itemconfig(tk.END, bg="#d5f4e6")
         
-        count = len(self.order_queue)
+        count = len(active)
         self.queue_count_label.config(text=f"Queue: {count} order{'s' if count != 1 else ''}")
 
     def update_total_time(self):
-        """Calculate and display total queue time."""
-        total_seconds = 0
-        for key, qty in self.order_queue:
-            drink_time = DRINK_TIME_ESTIMATE.get(key, 45)
-            total_seconds += drink_time * qty
-        
-        minutes = int(total_seconds // 60)
-        seconds = int(total_seconds % 60)
-        self.total_time_label.config(text=f"Total Queue: {minutes}m {seconds}s")
+        """Show the time until everything queued now is made (O(1))."""
+        p50, p90 = self.robot.eta_range()
+        text = f"Total Queue: {format_time(p50)}"
+        if p90 - p50 >= 1:
+            text += f" (up to {format_time(p90)})"
+        self.total_time_label.config(text=text)
 
     def clear_queue(self):
-        """Clear all orders from queue."""
-        if self.running:
-            messagebox.showwarning("Processing", "Cannot clear during processing!")
-            return
-        
-        if not self.order_queue:
+        """Clear orders that have not started yet."""
+        count = self.order_queue.get_pending_count()
+        if count == 0:
             return
         
         response = messagebox.askyesno("Clear Queue", 
-                                       f"Clear all {len(self.order_queue)} orders?")
+                                       f"Clear {count} waiting order{'s' if count != 1 else ''}?")
         if response:
-            self.order_queue.clear()
+            try:
+                self.order_queue.clear_pending()
+            except order_client.OrderServerError as e:
+                messagebox.showerror("Order Server", str(e))
+                return
             self.refresh_queue_display()
             self.update_total_time()
             self.status.set("Queue cleared")
 
     def start_queue(self):
-        """Start processing the order queue."""
-        if self.running:
-            return
-        
-        if not self.order_queue:
-            messagebox.showinfo("No Orders", "Add drinks to queue first!")
-            return
-
-        self.running = True
-        self.start_btn.config(state="disabled", bg="gray")
-        self.clear_btn.config(state="disabled")
-        self.status.set("Starting queue...")
-        self.current_order_index = 0
-
-        threading.Thread(target=self.process_queue, daemon=True).start()
-
-    def process_queue(self):
-        """Process all orders in FIFO order."""
+        """Start the robot worker, or pause it after the current order."""
         try:
-            total_orders = len(self.order_queue)
-            
-            for order_idx, (juice_key, quantity) in enumerate(self.order_queue):
-                self.current_order_index = order_idx
-                drink_name = next((lbl for k, lbl in DRINKS if k == juice_key), juice_key)
-                
-                self.after(0, self.refresh_queue_display)
-                
-                # Process each drink in this order
-                for drink_num in range(1, quantity + 1):
-                    self.current_drink_in_order = drink_num
-                    
-                    # Update UI
-                    self.after(0, lambda: self.current_label.config(
-                        text=f"Order #{order_idx + 1}: {drink_name} ({drink_num}/{quantity})"))
-                    self.after(0, lambda: self.status.set(
-                        f"Making {drink_name} {drink_num}/{quantity}"))
-                    
-                    # Calculate progress
-                    total_drinks = sum(qty for _, qty in self.order_queue)
-                    completed_drinks = sum(qty for _, qty in self.order_queue[:order_idx])
-                    completed_drinks += drink_num
-                    progress = (completed_drinks / total_drinks) * 100
-                    
-                    self.after(0, lambda p=progress: self.progress_var.set(p))
-                    self.after(0, lambda p=progress: self.progress_text.config(text=f"{p:.0f}%"))
-                    
-                    # Calculate time remaining
-                    remaining_drinks = total_drinks - completed_drinks
-                    avg_time = DRINK_TIME_ESTIMATE.get(juice_key, 45)
-                    remaining_seconds = remaining_drinks * avg_time
-                    remaining_min = int(remaining_seconds // 60)
-                    remaining_sec = int(remaining_seconds % 60)
-                    
-                    self.after(0, lambda m=remaining_min, s=remaining_sec: 
-                              self.time_remaining_label.config(text=f"Time: {m}m {s}s"))
-                    
-                    # Execute the drink program
-                    make_drink(juice_key)
-            
-            # All done
-            self.after(0, lambda: self.status.set("✓ All orders complete!"))
-            self.after(0, lambda: self.current_label.config(text="Current: None"))
-            self.after(0, lambda: self.progress_var.set(0))
-            self.after(0, lambda: self.progress_text.config(text="0%"))
-            self.after(0, lambda: messagebox.showinfo("Complete", "All orders finished!"))
-            
-        except Exception as e:
-            self.after(0, lambda: self.status.set(f"Error: {e}"))
-            self.after(0, lambda: messagebox.showerror("Order Failed", str(e)))
-        
-        finally:
-            self.running = False
-            self.order_queue.clear()
-            self.after(0, lambda: self.start_btn.config(state="normal", bg="#2ecc71"))
-            self.after(0, lambda: self.clear_btn.config(state="normal"))
-            self.after(0, self.refresh_queue_display)
-            self.after(0, self.update_total_time)
+            if self.robot.running:
+                self.robot.pause()
+                self.status.set("Pausing after current order...")
+            elif self.winfo_toplevel().test_running:
+                messagebox.showwarning("Test Drink", "A test drink is running - start the "
+                                       "queue when it has finished.")
+            else:
+                self.robot.start()
+                self.status.set("Robot ready - orders start as soon as they are added")
+        except order_client.OrderServerError as e:
+            messagebox.showerror("Order Server", str(e))
+        self._show_running(self.robot.running)
+
+    def _show_running(self, running):
+        if running:
+            self.start_btn.config(text="Pause", bg="#e67e22")
+        else:
+            self.start_btn.config(text="Start", bg="#2ecc71")
+
+    def _bind_ui_state(self):
+        """Fields the robot worker publishes; applied at a fixed rate on the Tk thread."""
+        self.ui_state = UIStateBus(self)
+        self.ui_state.bind("queue", lambda _: (self.refresh_queue_display(), self.update_total_time()))
+        self.ui_state.bind("current", lambda text: self.current_label.config(text=text))
+        self.ui_state.bind("status", self.status.set)
+        self.ui_state.bind("progress", self._show_progress)
+        self.ui_state.bind("running", self._show_running)
+        self.ui_state.bind("error", lambda err: messagebox.showerror("Order Failed", err))
+        self.ui_state.bind("orders", self._show_orders)
+        self.ui_state.start()
+
+        self._orders_wanted = threading.Event()
+        self._closed = threading.Event()
+        if self.winfo_toplevel().remote:
+            threading.Thread(target=self._fetch_orders, name="kiosk-orders", daemon=True).start()
+        self._tick_job = None
+        self.robot.add_listener(self._on_robot_event)
+        self.bind("<Destroy>", lambda e: e.widget is self and self.robot.remove_listener(
+            self._on_robot_event))
+        self._tick()
+
+    def _show_progress(self, percent):
+        self.progress_var.set(percent)
+        self.progress_text.config(text=f"{percent:.0f}%")
+
+    def _tick(self):
+        """Once a second: count the ETA down between worker events."""
+        remaining = self.robot.current_remaining()
+        self.time_remaining_label.config(
+            text=f"Time: {format_time(remaining)}" if self.robot.busy else "Time: --")
+        self.update_total_time()
+        self._tick_job = self.after(1000, self._tick)
+
+    def destroy(self):
+        """Cancel the once-a-second tick and the state pump before the widgets go."""
+        if self._tick_job is not None:
+            self.after_cancel(self._tick_job)
+            self._tick_job = None
+        self._closed.set()
+        self.ui_state.stop()
+        super().destroy()
+
+    def _on_robot_event(self, info):
+        """Robot worker thread: publish to ui_state only."""
+        ui = self.ui_state
+        order, event = info['order'], info['event']
+        if event == 'drink_started':
+            name = drink_label(order.flavor)
+            ui.update(current=f"Order #{order.order_id}: {name} ({info['drink']}/{order.quantity})",
+                      status=f"Making {name} {info['drink']}/{order.quantity}")
+        elif event == 'drink_done':
+            ui.set("progress", self.robot.progress())
+        elif event == 'order_failed':
+            ui.update(status=f"Error: {info['error']}", running=False, error=info['error'])
+        elif event == 'robot_failed':
+            ui.update(status=f"⚠ {info['error']} - its cups moved to the other robots")
+        elif event == 'idle':
+            ui.update(status="✓ All orders complete!", current="Current: None", progress=0)
+        ui.set("queue")
+
 class DeveloperScreen(tk.Frame):
-    def __init__(self, master, on_back):
+    def __init__(self, master, on_back, robot):
         super().__init__(master)
         self.on_back = on_back
+        self.robot = robot
         self.status = tk.StringVar(value="Idle")
 
         tk.Label(self, text="Developer / Maintenance", font=("Arial", 20, "bold")).pack(pady=20)
@@ -377,12 +413,28 @@ class DeveloperScreen(tk.Frame):
 
         tk.Label(self, textvariable=self.status, fg="blue", wraplength=600).pack(pady=10)
 
+        self.ui_state = UIStateBus(self)
+        self.ui_state.bind("status", self.status.set)
+        self.ui_state.bind("error", lambda err: messagebox.showerror("Error", err))
+        self.ui_state.start()
+
     def open_teaching(self):
         win = tk.Toplevel(self)
         win.title("ZKBot Teaching GUI")
         gui.MainWindow(win)
 
     def test_drink(self, key):
+        if ORDER_SERVER_URL:
+            messagebox.showwarning("Order Server", "The robot is run by the order server - "
+                                   "test drinks from there.")
+            return
+        app = self.winfo_toplevel()
+        if self.robot.running or self.robot.busy or app.test_running:
+            messagebox.showwarning("Robot Busy", "Pause the queue and let the current order "
+                                   "finish before a test drink.")
+            return
+        app.test_running = True  # Keeps the queue from being started until the test ends
+
         def worker():
             try:
                 self.set_status(f"Running test: {key}")
@@ -390,13 +442,18 @@ class DeveloperScreen(tk.Frame):
                 self.set_status("Test done.")
             except Exception as e:
                 self.set_status(f"Error: {e}")
-                messagebox.showerror("Error", str(e))
+                self.ui_state.set("error", str(e))
+            finally:
+                app.test_running = False
 
         threading.Thread(target=worker, daemon=True).start()
 
     def set_status(self, text):
-        self.after(0, lambda: self.status.set(text))
+        self.ui_state.set("status", text)
 
 
 if __name__ == "__main__":
-    App().mainloop()
+    app = App()
+    app.mainloop()
+    app.robot.stop()
+    close_all_connections()
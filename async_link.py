@@ -0,0 +1,221 @@
+# async_link.py
+#
+# asyncio transport for the robot: awaitable commands over one serial port.
+
+import asyncio
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Optional, Union
+
+import serial
+
+from config import REPLY_TIMEOUTS
+from serial_comm import (get_connection, Reply, parse_reply_status, parse_position, parse_estop,
+                         reply_timeout, POSITION_QUERY, ESTOP_QUERY)
+
+# How long one blocking read may take before the reader checks for close()
+READ_SLICE = 0.05
+
+STOP_FRAME = "0xff0xfe0x020xfd0xfc"
+
+# Seconds a timed-out command keeps its place in the FIFO for a late reply
+LATE_REPLY_WINDOW = 2.0
+
+
+class AsyncRobotLink:
+    """
+    asyncio driver for one ZKBot controller.
+
+    The controller answers commands strictly in order, so a single reader
+    task resolves a FIFO of pending futures, one per reply line. Any number
+    of coroutines can await commands concurrently on the same event loop:
+
+        async with AsyncRobotLink() as link:
+            await link.send("0x550xAA G00 X0 Y0 Z0 F20 0xAA0x55")
+            pos = await link.query_position()
+
+    The link runs on the port's shared SerialConnection (get_connection).
+    A reader thread holds the connection while the link is open, so no
+    other caller's reply can be taken for one of ours, and stop() still
+    goes out between frames with write_urgent(). pyserial is blocking, so
+    writes run on one private thread; everything else stays on the event loop.
+    """
+
+    def __init__(self, port: str = None):
+        self.conn = get_connection(port)
+        self.port = self.conn.port
+        self.ser: Optional[serial.Serial] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._reader: Optional[threading.Thread] = None
+        self._closing = threading.Event()
+        self._pending = deque()  # [frame, future, start time, expiry], oldest first
+        self._write_lock: Optional[asyncio.Lock] = None
+
+    # ---------- Lifecycle ----------
+
+    async def open(self) -> "AsyncRobotLink":
+        """Take the shared connection and start the reader thread."""
+        if self._reader is not None:
+            return self
+        self._loop = asyncio.get_running_loop()
+        self._closing.clear()
+        acquired = Future()
+        self._reader = threading.Thread(target=self._read_loop, args=(acquired,),
+                                        name=f"robotlink-{self.port}", daemon=True)
+        self._reader.start()
+        try:
+            self.ser = await asyncio.wrap_future(acquired)
+        except Exception:
+            self._reader = None  # The thread has already ended
+            raise
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="robotlink")
+        self._write_lock = asyncio.Lock()
+        return self
+
+    async def close(self) -> None:
+        """Finish queued writes, join the reader (releasing the connection), fail pending commands."""
+        loop = asyncio.get_running_loop()
+        if self._executor is not None:
+            await loop.run_in_executor(None, self._executor.shutdown)
+            self._executor = None
+        if self._reader is not None:
+            self._closing.set()
+            await loop.run_in_executor(None, self._reader.join)  # At most READ_SLICE
+            self._reader = None
+        self._fail_pending(ConnectionError("Link closed"))
+        self.ser = None  # The port stays open for the other users of the connection
+
+    async def __aenter__(self):
+        return await self.open()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+        return False
+
+    # ---------- Commands ----------
+
+    async def send(self, frame: Union[str, bytes], timeout: float = None,
+                   expect_reply: bool = True) -> Optional[Reply]:
+        """
+        Write one frame and await its ok / error reply.
+
+        A command that times out keeps its place in the pending FIFO, so a
+        late reply is consumed by it instead of being handed to the next
+        command. The place is given up once the line is quiet and
+        LATE_REPLY_WINDOW has passed (the command is then assumed lost).
+        Returns None when expect_reply is False.
+        """
+        if self.ser is None:
+            raise ConnectionError("Link not open")
+        loop = asyncio.get_running_loop()
+        if isinstance(frame, str):
+            data, label = frame.encode("utf-8"), frame
+        else:
+            data, label = frame, frame.hex()
+        if timeout is None:
+            timeout = reply_timeout(label) if isinstance(frame, str) else REPLY_TIMEOUTS["MANUAL"]
+
+        future = loop.create_future() if expect_reply else None
+        async with self._write_lock:
+            # Register before writing so a fast reply always finds its future
+            if future is not None:
+                entry = [label, future, time.perf_counter(), None]
+                self._pending.append(entry)
+            await loop.run_in_executor(self._executor, self.ser.write, data)
+
+        if future is None:
+            return None
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        except asyncio.TimeoutError:
+            future.cancel()  # Placeholder: still consumes one reply (see _resolve)
+            entry[3] = time.perf_counter() + LATE_REPLY_WINDOW
+            return Reply(raw=b"", status="timeout", rtt=time.perf_counter() - entry[2])
+
+    async def query_position(self) -> Optional[dict]:
+        """Return {'x','y','z'} from the manual-mode position query, or None."""
+        reply = await self.send(POSITION_QUERY)
+        return parse_position(reply.raw.decode("utf-8", errors="ignore"))
+
+    async def estop_status(self) -> dict:
+        """Return the G14 e-stop status in the check_emergency_stop() format."""
+        reply = await self.send(ESTOP_QUERY)
+        if reply.status == "timeout":
+            return {'is_pressed': None, 'status': 'No reply', 'raw_response': ''}
+        return parse_estop(reply.raw.decode("utf-8", errors="ignore"))
+
+    async def stop(self) -> None:
+        """Send the manual-mode stop frame, between frames of whoever is writing."""
+        await asyncio.get_running_loop().run_in_executor(
+            None, self.conn.write_urgent, STOP_FRAME.encode("utf-8"))
+
+    # ---------- Reader ----------
+
+    def _read_loop(self, acquired: Future) -> None:
+        """Reader thread: hold the connection until close() and hand replies to the loop."""
+        try:
+            with self.conn as ser:
+                old_timeout = ser.timeout
+                ser.timeout = READ_SLICE
+                try:
+                    ser.reset_input_buffer()
+                    acquired.set_result(ser)
+                    self._read_replies(ser)
+                finally:
+                    ser.timeout = old_timeout
+        except Exception as e:
+            if not acquired.done():
+                acquired.set_exception(e)
+                return
+            print(f"AsyncRobotLink reader stopped: {e}")
+            try:
+                self._loop.call_soon_threadsafe(self._fail_pending, e)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+    def _read_replies(self, ser: serial.Serial) -> None:
+        buffer = b""
+        while not self._closing.is_set():
+            chunk = ser.read_until(b"\n")
+            if chunk:
+                buffer += chunk
+                status = parse_reply_status(buffer)
+            elif buffer:
+                # Line went quiet without a newline: accept a bare ok / error
+                status = parse_reply_status(buffer + b"\n")
+                if status is None:
+                    buffer = b""  # unterminated noise
+            else:
+                status = None
+                self._loop.call_soon_threadsafe(self._expire_lost)
+
+            if status:
+                self._loop.call_soon_threadsafe(self._resolve, buffer, status)
+                buffer = b""
+
+    def _resolve(self, raw: bytes, status: str) -> None:
+        """Hand a complete reply to the oldest waiting command."""
+        if not self._pending:
+            print(f"Unsolicited reply: {raw}")
+            return
+        label, future, start, _ = self._pending.popleft()
+        if future.done():
+            print(f"Late reply to timed-out {label}: {raw}")
+            return
+        future.set_result(Reply(raw=raw, status=status, rtt=time.perf_counter() - start))
+
+    def _expire_lost(self) -> None:
+        """Quiet line: drop timed-out commands at the front whose window has passed."""
+        now = time.perf_counter()
+        while self._pending and self._pending[0][3] is not None and self._pending[0][3] < now:
+            label = self._pending.popleft()[0]
+            print(f"No reply to {label}; assumed lost")
+
+    def _fail_pending(self, error: Exception) -> None:
+        while self._pending:
+            _, future, _, _ = self._pending.popleft()
+            if not future.done():
+                future.set_exception(error)
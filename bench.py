@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the ZKBot controller.
+
+Usage:
+    python bench.py throughput mango --runs 3
+    python bench.py compile mango
+    python bench.py queue --orders 100000
+
+Point config PORT at the robot (or an emulated controller) before running.
+"""
+
+import argparse
+import threading
+import time
+
+from drink_runner import build_drink_program
+from models import Program
+from order_queue import OrderQueue
+from program_compiler import compile_program, clear_compile_cache
+from serial_comm import run_program, transact
+from streaming import stream_program
+
+
+def drinks_per_hour(seconds_per_drink: float) -> float:
+    """Convert a per-drink cycle time to drinks/hour."""
+    return 3600.0 / seconds_per_drink if seconds_per_drink > 0 else 0.0
+
+
+def bench_throughput(juice_key: str, runs: int = 3, speed_override: float = 1.0) -> dict:
+    """
+    Time the strictly synchronous loop against pipelined streaming.
+
+    Returns: {
+        'sync': float,       # Mean seconds per drink, run_program
+        'stream': float,     # Mean seconds per drink, stream_program (until the arm is done)
+    }
+    """
+    prog = build_drink_program(juice_key)
+    modes = {
+        'sync': lambda: run_program(prog, speed_override),
+        'stream': lambda: stream_program(prog, speed_override),
+    }
+    results = {}
+    for mode, run in modes.items():
+        times = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - start)
+        results[mode] = sum(times) / len(times)
+    return results
+
+
+class InstantAckPort:
+    """In-memory port that acks every frame immediately (isolates host-side cost)."""
+
+    is_open = True
+    timeout = 0
+
+    def reset_input_buffer(self):
+        pass
+
+    def write(self, data: bytes) -> int:
+        return len(data)
+
+    def read_until(self, terminator: bytes = b"\n") -> bytes:
+        return b"ok\r\n"
+
+
+def bench_compile(juice_key: str, repeat: int = 1000, speed_override: float = 1.0) -> dict:
+    """
+    Time compilation and the bare write/ack loop over compiled frames.
+
+    Returns: {
+        'compile_cold': float,    # Seconds per uncached compile
+        'compile_cached': float,  # Seconds per cache hit
+        'loop': float,            # Seconds per program through the write/ack loop
+        'frames': int,
+        'bytes': int
+    }
+    """
+    prog = build_drink_program(juice_key)
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        clear_compile_cache()
+        compiled = compile_program(prog, speed_override)
+    cold = (time.perf_counter() - start) / repeat
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compiled = compile_program(prog, speed_override)
+    cached = (time.perf_counter() - start) / repeat
+
+    port = InstantAckPort()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for step in compiled.steps:
+            for frame in step.frames:
+                transact(port, frame.data, frame.timeout)
+    loop = (time.perf_counter() - start) / repeat
+
+    return {
+        'compile_cold': cold,
+        'compile_cached': cached,
+        'loop': loop,
+        'frames': compiled.frame_count,
+        'bytes': compiled.total_bytes,
+    }
+
+
+def bench_queue(orders: int = 100000) -> dict:
+    """
+    Time OrderQueue operations at scale, single-threaded and with a producer
+    thread feeding a consumer thread.
+
+    Returns: {
+        'add': float,          # Seconds per add_order
+        'peek': float,         # Seconds per get_next_pending + counters
+        'drain': float,        # Seconds per take_next + complete
+        'threaded': float,     # Seconds for producer/consumer to move all orders
+        'history': int         # Completed orders retained
+    }
+    """
+    program = Program("bench")
+    queue = OrderQueue()
+
+    start = time.perf_counter()
+    for i in range(orders):
+        queue.add_order("mango", 1 + i % 3, program)
+    add = (time.perf_counter() - start) / orders
+
+    start = time.perf_counter()
+    for _ in range(orders):
+        queue.get_next_pending()
+        queue.get_pending_count()
+        queue.get_current_order()
+    peek = (time.perf_counter() - start) / orders
+
+    start = time.perf_counter()
+    while True:
+        order = queue.take_next()
+        if order is None:
+            break
+        queue.complete(order)
+    drain = (time.perf_counter() - start) / orders
+
+    queue = OrderQueue()
+
+    def producer():
+        for i in range(orders):
+            queue.add_order("orange", 1, program)
+
+    def consumer():
+        for _ in range(orders):
+            queue.complete(queue.wait_next())
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=producer), threading.Thread(target=consumer)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    threaded = time.perf_counter() - start
+
+    return {
+        'add': add,
+        'peek': peek,
+        'drain': drain,
+        'threaded': threaded,
+        'history': len(queue.history),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ZKBot controller benchmarks")
+    sub = parser.add_subparsers(dest="bench", required=True)
+
+    p_tp = sub.add_parser("throughput", help="Synchronous vs streamed drinks/hour")
+    p_tp.add_argument("juice", help="Juice key, e.g. mango")
+    p_tp.add_argument("--runs", type=int, default=3)
+    p_tp.add_argument("--speed", type=float, default=1.0, help="Speed override multiplier")
+
+    p_cc = sub.add_parser("compile", help="Compile cost and bare execution-loop cost")
+    p_cc.add_argument("juice", help="Juice key, e.g. mango")
+    p_cc.add_argument("--repeat", type=int, default=1000)
+
+    p_q = sub.add_parser("queue", help="OrderQueue operation cost at scale")
+    p_q.add_argument("--orders", type=int, default=100000)
+
+    args = parser.parse_args()
+
+    if args.bench == "throughput":
+        results = bench_throughput(args.juice, args.runs, args.speed)
+        print(f"\n{'mode':<8}{'s/drink':>10}{'drinks/h':>10}")
+        for mode, seconds in results.items():
+            print(f"{mode:<8}{seconds:>10.2f}{drinks_per_hour(seconds):>10.1f}")
+
+    elif args.bench == "compile":
+        r = bench_compile(args.juice, args.repeat)
+        print(f"{r['frames']} frames, {r['bytes']} bytes")
+        print(f"compile (cold):   {r['compile_cold'] * 1e6:8.1f} us")
+        print(f"compile (cached): {r['compile_cached'] * 1e6:8.1f} us")
+        print(f"write/ack loop:   {r['loop'] * 1e6:8.1f} us")
+
+    elif args.bench == "queue":
+        r = bench_queue(args.orders)
+        print(f"{args.orders} orders")
+        print(f"add_order:            {r['add'] * 1e6:8.2f} us")
+        print(f"peek + counts:        {r['peek'] * 1e6:8.2f} us")
+        print(f"take_next + complete: {r['drain'] * 1e6:8.2f} us")
+        print(f"producer/consumer:    {r['threaded']:8.2f} s")
+        print(f"history kept:         {r['history']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+Discrete-event capacity simulator for the juice station.
+
+Replays an order-arrival trace through the real OrderQueue and scheduling
+policy on a virtual clock (a heap of arrival / cup-done events; no sleeps,
+no serial I/O). Service times come from the program time estimator for the
+trays and stitched cups the worker really runs, so delay tuning, wait modes
+and scheduling choices can be compared offline.
+
+    python capacity_sim.py --rate 60 --hours 10 --rush 3-5:150
+    python capacity_sim.py --trace orders.csv --policy grouping --robots 2
+    python capacity_sim.py --rate 90 --wait-mode arrival --stream
+
+Trace CSV rows: seconds (or HH:MM:SS), flavor, quantity.
+"""
+
+import argparse
+import csv
+import functools
+import heapq
+import random
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from config import TRAY_MODE
+from drink_catalog import DEFAULT_DRINK_SECONDS, get_catalog
+from estimator import estimate_programs
+from order_queue import OrderQueue
+from scheduling import SchedulingPolicy, FIFO, make_policy, POLICIES
+from sequence_planner import SequencePlanner, end_state
+
+Trace = List[Tuple[float, str, int]]   # (arrival seconds, flavor, quantity)
+
+
+# ========== Traces ==========
+
+def poisson_trace(rate_per_hour: float, hours: float, flavors: Sequence[str],
+                  rush: Sequence[Tuple[float, float, float]] = (), max_quantity: int = 3,
+                  seed: int = 1) -> Trace:
+    """
+    Poisson arrivals over hours. rush is [(start hour, end hour, rate), ...]
+    replacing rate_per_hour inside those windows (e.g. lunch).
+    """
+    rng = random.Random(seed)
+
+    def rate_at(t: float) -> float:
+        hour = t / 3600.0
+        return next((r for start, end, r in rush if start <= hour < end), rate_per_hour)
+
+    # Thinning: draw at the peak rate and keep each arrival with rate(t) / peak
+    peak = max([rate_per_hour] + [r for _, _, r in rush])
+    t, end, trace = 0.0, hours * 3600.0, []
+    while peak > 0:
+        t += rng.expovariate(peak / 3600.0)
+        if t >= end:
+            break
+        if rng.random() * peak < rate_at(t):
+            trace.append((t, rng.choice(flavors), rng.randint(1, max_quantity)))
+    return trace
+
+
+def load_trace(path: str) -> Trace:
+    """Recorded orders from CSV: seconds or HH:MM:SS, flavor, quantity (header optional)."""
+    trace = []
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.reader(f):
+            if not row or row[0].strip().lower() in ("time", "seconds", "t"):
+                continue
+            stamp = row[0].strip()
+            if ":" in stamp:
+                h, m, s = (stamp.split(":") + ["0"])[:3]
+                seconds = int(h) * 3600 + int(m) * 60 + float(s)
+            else:
+                seconds = float(stamp)
+            trace.append((seconds, row[1].strip(), int(row[2]) if len(row) > 2 else 1))
+    trace.sort(key=lambda item: item[0])
+    if trace:
+        start = trace[0][0]
+        trace = [(t - start, flavor, quantity) for t, flavor, quantity in trace]
+    return trace
+
+
+def model_order_seconds(wait_mode: str = None, streaming: bool = None,
+                        speed_override: float = 1.0,
+                        tray: bool = TRAY_MODE) -> Callable[[str, int, bool], float]:
+    """
+    Per-order times from the path estimator for one execution setup, for the
+    programs RobotWorker really runs: a multi-cup order as one tray (tray,
+    config TRAY_MODE) or as back-to-back stitched cups, and the first cup
+    without its homing head when the arm comes straight from the previous
+    order (continuing).
+    """
+    catalog = get_catalog()
+
+    @functools.lru_cache(maxsize=None)
+    def per_order(flavor: str, quantity: int, continuing: bool = False) -> float:
+        try:
+            full = catalog.program(flavor)
+        except FileNotFoundError:
+            return float(DEFAULT_DRINK_SECONDS) * quantity
+        planner = SequencePlanner(catalog)
+        if continuing:
+            planner.state = end_state(full.steps)  # Every drink ends in the same parked pose
+        if tray and quantity > 1:
+            programs = [planner.plan_tray(flavor, quantity).program]
+        else:
+            programs = []
+            for _ in range(quantity):
+                plan = planner.plan(flavor)
+                planner.state = end_state(plan.program.steps, plan.start)
+                programs.append(plan.program)
+        return float(sum(estimate_programs(programs, speed_override, wait_mode, streaming)))
+    return per_order
+
+
+# ========== Simulation ==========
+
+@dataclass
+class SimResult:
+    """Outcome of one simulated run (all times in seconds)."""
+    orders: int
+    drinks: int
+    duration: float                         # Until the last cup was done
+    busy: List[float]                       # Busy seconds per robot
+    waits: np.ndarray                       # Queue wait per order
+    queue_time: Dict[int, float]            # Pending orders -> seconds spent at that length
+    switches: int = 0
+    max_skips: int = 0
+    service: Dict[str, float] = field(default_factory=dict)   # Seconds per drink by flavour
+
+    @property
+    def utilisation(self) -> float:
+        return sum(self.busy) / (len(self.busy) * self.duration) if self.duration else 0.0
+
+    @property
+    def drinks_per_hour(self) -> float:
+        return 3600.0 * self.drinks / self.duration if self.duration else 0.0
+
+    def queue_length_percentile(self, q: float) -> int:
+        """Smallest length the queue was at or below for q percent of the time."""
+        total = sum(self.queue_time.values())
+        seen = 0.0
+        for length in sorted(self.queue_time):
+            seen += self.queue_time[length]
+            if total and seen / total * 100.0 >= q:
+                return length
+        return 0
+
+    def summary(self) -> dict:
+        total = sum(self.queue_time.values())
+        waits = self.waits if len(self.waits) else np.zeros(1)
+        return {
+            'orders': self.orders,
+            'drinks': self.drinks,
+            'hours': self.duration / 3600.0,
+            'drinks_per_hour': self.drinks_per_hour,
+            'utilisation': self.utilisation,
+            'mean_wait': float(waits.mean()),
+            'p50_wait': float(np.percentile(waits, 50)),
+            'p95_wait': float(np.percentile(waits, 95)),
+            'max_wait': float(waits.max()),
+            'mean_queue': sum(n * s for n, s in self.queue_time.items()) / total if total else 0.0,
+            'p95_queue': self.queue_length_percentile(95),
+            'max_queue': max(self.queue_time, default=0),
+            'switches': self.switches,
+            'max_skips': self.max_skips,
+        }
+
+    def report(self) -> str:
+        s = self.summary()
+        lines = [
+            f"{s['orders']} orders / {s['drinks']} drinks in {s['hours']:.2f} h "
+            f"({s['drinks_per_hour']:.1f} drinks/h), utilisation {s['utilisation'] * 100:.0f}%",
+            f"wait   mean {s['mean_wait']:.0f}s  p50 {s['p50_wait']:.0f}s  "
+            f"p95 {s['p95_wait']:.0f}s  max {s['max_wait']:.0f}s",
+            f"queue  mean {s['mean_queue']:.1f}  p95 {s['p95_queue']}  max {s['max_queue']} orders",
+            "per drink: " + ", ".join(f"{k} {v:.1f}s" for k, v in sorted(self.service.items())),
+        ]
+        edges = [0, 60, 120, 300, 600, 1200, float("inf")]
+        counts, _ = np.histogram(self.waits, bins=edges) if len(self.waits) else ([0] * 6, None)
+        lines.append("wait histogram:")
+        for low, high, count in zip(edges, edges[1:], counts):
+            label = f"{low / 60:g}-{high / 60:g} min" if high != float("inf") else f">{low / 60:g} min"
+            share = count / max(1, len(self.waits))
+            lines.append(f"  {label:<10}{count:>6}  {'#' * int(share * 40)}")
+        return "\n".join(lines)
+
+
+ARRIVAL, DONE = 0, 1
+
+
+def simulate_station(trace: Trace, policy: SchedulingPolicy = None, robots: int = 1,
+                     per_drink: Callable[[str], float] = None, switch_seconds: float = 0.0,
+                     jitter: float = 0.0, seed: int = 1,
+                     per_order: Callable[[str, int, bool], float] = None) -> SimResult:
+    """
+    Run trace through an OrderQueue served by robots identical arms.
+
+    per_order(flavor, quantity, continuing) gives seconds per order
+    (default: model_order_seconds(), trays and stitching as the worker runs
+    them); continuing is True when the arm goes straight on from its
+    previous order. per_drink(flavor) instead times every cup the same.
+    jitter is the relative spread of each order's time (0.1 = 10% standard
+    deviation); switch_seconds is added when an arm changes flavour.
+    """
+    if per_order is None:
+        if per_drink is not None:
+            per_drink = functools.lru_cache(maxsize=None)(per_drink)
+            per_order = lambda flavor, quantity, continuing=False: per_drink(flavor) * quantity
+        else:
+            per_order = model_order_seconds()
+    rng = random.Random(seed)
+    service = {flavor: per_order(flavor, 1, False) for flavor in {f for _, f, _ in trace}}
+    queue = OrderQueue(estimate=lambda o: per_order(o.flavor, o.quantity, False),
+                       policy=policy or FIFO())
+
+    events = [(t, index, ARRIVAL, index) for index, (t, _, _) in enumerate(trace)]
+    heapq.heapify(events)
+    sequence = len(events)
+    idle = list(range(robots))
+    last_flavor: List[Optional[str]] = [None] * robots
+    free_at: List[Optional[float]] = [None] * robots   # When each arm finished its last order
+    busy = [0.0] * robots
+    arrivals: Dict[int, float] = {}
+    waits, skips = [], []
+    queue_time: Dict[int, float] = {}
+    clock = last_event = 0.0
+    drinks = switches = 0
+
+    while events:
+        clock, _, kind, payload = heapq.heappop(events)
+        pending = queue.get_pending_count()
+        queue_time[pending] = queue_time.get(pending, 0.0) + clock - last_event
+        last_event = clock
+
+        if kind == ARRIVAL:
+            _, flavor, quantity = trace[payload]
+            arrivals[queue.add_order(flavor, quantity).order_id] = clock
+        else:
+            robot, order = payload
+            queue.complete(order)
+            idle.append(robot)
+            free_at[robot] = clock
+
+        # Every free arm takes the policy's next order
+        while idle and queue.get_pending_count():
+            robot = idle.pop(0)
+            order = queue.take_next()
+            waits.append(clock - arrivals[order.order_id])
+            skips.append(order.skips)
+            seconds = per_order(order.flavor, order.quantity, free_at[robot] == clock)
+            if jitter:
+                seconds *= max(0.1, rng.gauss(1.0, jitter))
+            if last_flavor[robot] is not None and last_flavor[robot] != order.flavor:
+                seconds += switch_seconds
+                switches += 1
+            last_flavor[robot] = order.flavor
+            busy[robot] += seconds
+            drinks += order.quantity
+            heapq.heappush(events, (clock + seconds, sequence, DONE, (robot, order)))
+            sequence += 1
+
+    return SimResult(orders=len(trace), drinks=drinks, duration=clock, busy=busy,
+                     waits=np.array(waits), queue_time=queue_time, switches=switches,
+                     max_skips=max(skips, default=0), service=service)
+
+
+def _rush(text: str) -> Tuple[float, float, float]:
+    """'3-5:150' -> (3.0, 5.0, 150.0)"""
+    hours, rate = text.split(":")
+    start, end = hours.split("-")
+    return float(start), float(end), float(rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Juice station capacity simulator")
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--trace", help="Recorded orders CSV (seconds or HH:MM:SS, flavor, quantity)")
+    source.add_argument("--rate", type=float, default=60.0, help="Poisson orders per hour")
+    parser.add_argument("--hours", type=float, default=10.0)
+    parser.add_argument("--rush", type=_rush, action="append", default=[],
+                        help="Busy window START-END:RATE in hours from opening, e.g. 3-5:150")
+    parser.add_argument("--flavors", default="mango,orange")
+    parser.add_argument("--policy", choices=sorted(POLICIES), default="fifo")
+    parser.add_argument("--max-skip", type=int, default=None)
+    parser.add_argument("--robots", type=int, default=1)
+    parser.add_argument("--switch", type=float, default=0.0, help="Seconds per flavour change")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Relative spread of cup times")
+    parser.add_argument("--wait-mode", choices=("delay", "arrival"), default=None)
+    parser.add_argument("--stream", action="store_true", help="Estimate streamed execution")
+    parser.add_argument("--no-tray", action="store_true",
+                        help="Make multi-cup orders cup by cup (config TRAY_MODE off)")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed override multiplier")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    if args.trace:
+        trace = load_trace(args.trace)
+    else:
+        trace = poisson_trace(args.rate, args.hours, args.flavors.split(","), args.rush,
+                              seed=args.seed)
+    policy = (make_policy(args.policy) if args.max_skip is None
+              else make_policy(args.policy, args.max_skip))
+    per_order = model_order_seconds(args.wait_mode, args.stream or None, args.speed,
+                                    tray=TRAY_MODE and not args.no_tray)
+    result = simulate_station(trace, policy, args.robots, switch_seconds=args.switch,
+                              jitter=args.jitter, seed=args.seed, per_order=per_order)
+    print(f"{policy}, {args.robots} robot(s)")
+    print(result.report())
+
+
+if __name__ == "__main__":
+    main()
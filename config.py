@@ -2,10 +2,17 @@
 #
 # Configuration for ZKBot serial communication.
 
+import os
 from pathlib import Path
 
-# Serial port settings - Use COM3 (your robot port)
-PORT = "COM3"
+# Serial port settings - Use COM3 (your robot port).
+# SERIAL_PORT overrides it, e.g. to point at the emulator (python emulator.py).
+PORT = os.environ.get("SERIAL_PORT", "COM3")
+
+# One entry per arm for a multi-robot station (fleet.py); ROBOT_PORTS overrides
+# it as a comma-separated list, e.g. "COM3,COM4". A single port runs one arm.
+ROBOT_PORTS = [p.strip() for p in os.environ.get("ROBOT_PORTS", "").split(",") if p.strip()] or [PORT]
+
 BAUD = 9600
 BYTESIZE = 8
 PARITY = "N"
@@ -59,3 +66,79 @@ DEFAULT_FEEDRATE = 200  # Medium speed
 # Minimum feedrate
 MIN_FEEDRATE = 1
 
+
+# ========== Reply Timeouts ==========
+# Seconds to wait for the controller's "ok" / "error" reply, per command type.
+# Replies normally arrive in a few milliseconds; these only bound a silent controller.
+REPLY_TIMEOUTS = {
+    "G00": 1.0,      # Rapid move
+    "G01": 1.0,      # Linear move
+    "G06": 0.5,      # Digital output / gripper servo
+    "G14": 0.5,      # E-stop status query
+    "MANUAL": 0.2,   # 0xff 0xfe ... manual-mode frames
+    "DEFAULT": 1.0,
+}
+
+# ========== Pipelined Streaming ==========
+# Size of the controller's serial receive buffer in characters. The streamer keeps
+# as many frames in flight as fit in this window (grbl-style character counting).
+CONTROLLER_RX_BUFFER = 128
+
+# Seconds to wait for any ack while frames are in flight before giving up
+STREAM_ACK_TIMEOUT = 30.0
+
+# Use pipelined streaming for drinks instead of the strictly synchronous loop
+STREAM_MODE = False
+
+# Make multi-cup orders as one fused program (homing / retracts shared between cups)
+TRAY_MODE = True
+
+# ========== Order Scheduling ==========
+# Which waiting order the kiosk makes next (scheduling.py):
+# "fifo", "sjf" (shortest first) or "grouping" (same flavour as the last cup first).
+SCHEDULING_POLICY = "fifo"
+
+# Most later orders allowed to jump ahead of any one order (sjf / grouping)
+SCHEDULING_MAX_SKIP = 3
+
+# ========== Modal Output ==========
+# Skip repeated gripper frames and unchanged axis / F words when compiling programs
+MODAL_ELISION = True
+
+# ========== Motion Model ==========
+# Tool speed in mm/s produced by F1 (F is scaled linearly); calibrate on the arm.
+# Used by the emulator and the program time estimator.
+FEED_MM_PER_S = 5.0
+
+# Acceleration in mm/s^2 for rapid (G00) and linear (G01) moves
+ACCEL_MM_PER_S2 = {"G00": 400.0, "G01": 200.0}
+
+# ========== Step Completion ==========
+# "delay": sleep each step's authored delay (original behaviour).
+# "arrival": end a step as soon as the arm reaches its target; the delay becomes
+#            the longest wait and Step.dwell an optional hold after arriving.
+WAIT_MODE = "delay"
+
+# The controller acks moves only once they are finished (instead of on receipt)
+ACK_ON_COMPLETE = False
+
+# Position reading counted as arrived (mm per axis) and polling interval (s)
+ARRIVAL_TOLERANCE_MM = 0.5
+ARRIVAL_POLL_INTERVAL = 0.05
+
+# ========== Learned Timings ==========
+# Measured run times (timing_store.py) that drive the kiosk ETAs. Relative paths
+# are inside the project folder; TIMING_FILE overrides it, e.g. to keep emulator
+# runs out of the robot's history.
+TIMING_FILE = os.environ.get("TIMING_FILE", "timings.json")
+
+# ========== Order Server ==========
+# Headless order service (order_server.py): owns the robot link and the queue.
+# Only bound to localhost by default; kiosks and tablets on the same machine
+# talk to it over HTTP/JSON.
+ORDER_SERVER_HOST = "127.0.0.1"
+ORDER_SERVER_PORT = 8765
+
+# When set (e.g. http://127.0.0.1:8765), app.py is a thin client of that server
+# instead of driving the robot itself.
+ORDER_SERVER_URL = os.environ.get("ORDER_SERVER_URL", "")
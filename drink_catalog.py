@@ -0,0 +1,205 @@
+# drink_catalog.py
+#
+# Parsed, merged and compiled drink recipes, kept in memory between cups.
+# Recipe files are re-read only when they change on disk, so edits saved
+# from the teaching GUI apply to the next cup without a restart.
+
+import copy
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from config import TRAY_MODE
+from estimator import estimate_program, program_eta
+from models import Program
+from program_compiler import CompiledProgram, compile_program
+
+BASE_DIR = Path(__file__).parent
+PROGRAM_DIR = BASE_DIR / "programs"
+
+# Shared start of every drink, run before programs/juices/<key>.json
+COMMON_PARTS = ("orgin.json", "common/pick_cup.json")
+
+# Seconds per drink for flavours without a recipe file (no path to estimate)
+DEFAULT_DRINK_SECONDS = 45
+
+
+@dataclass
+class RecipePart:
+    """One parsed JSON file and what it looked like on disk when read."""
+    path: Path
+    stat: Tuple[int, int]       # (mtime_ns, size) - cheap change check
+    digest: str                 # sha1 of the content - confirms a real change
+    program: Program
+
+
+@dataclass
+class Recipe:
+    """A merged drink and its compiled forms, valid for one set of part digests."""
+    key: str
+    digests: Tuple[str, ...]
+    program: Program
+    head: int                   # Steps before the pick_cup part (orgin.json)
+    compiled: Dict[float, CompiledProgram] = field(default_factory=dict)
+    estimates: Dict[float, float] = field(default_factory=dict)
+    trays: Dict[int, Tuple[Program, float]] = field(default_factory=dict)  # quantity -> (program, model)
+
+
+class DrinkCatalog:
+    """
+    Loads each recipe file once and each drink (origin + pick_cup + juice)
+    once, and keeps the compiled frames and time estimate per speed override.
+
+    Every lookup stats the drink's files; only a changed mtime or size
+    causes a re-read, and the merged drink is rebuilt only if a file's
+    content hash actually changed. Programs returned by program() are shared
+    and must not be modified - use build_drink_program() for a copy.
+    """
+
+    def __init__(self, program_dir: Path = PROGRAM_DIR):
+        self.program_dir = Path(program_dir)
+        self._lock = threading.Lock()
+        self._parts: Dict[Path, RecipePart] = {}
+        self._recipes: Dict[str, Recipe] = {}
+        self.loads = 0      # Files parsed (for bench / diagnostics)
+        self.builds = 0     # Drinks merged
+
+    def part_paths(self, juice_key: str) -> List[Path]:
+        paths = [self.program_dir / part for part in COMMON_PARTS]
+        paths.append(self.program_dir / "juices" / f"{juice_key}.json")
+        return paths
+
+    def keys(self) -> List[str]:
+        """Juice keys with a recipe file."""
+        return sorted(p.stem for p in (self.program_dir / "juices").glob("*.json"))
+
+    # ---------- Lookup ----------
+
+    def program(self, juice_key: str) -> Program:
+        """Merged drink Program (shared, read-only)."""
+        with self._lock:
+            return self._recipe(juice_key).program
+
+    def head_length(self, juice_key: str) -> int:
+        """Number of leading steps that come from orgin.json (the homing head)."""
+        with self._lock:
+            return self._recipe(juice_key).head
+
+    def compiled(self, juice_key: str, speed_override: float = 1.0) -> CompiledProgram:
+        """Compiled drink, cached per speed override until a recipe file changes."""
+        with self._lock:
+            recipe = self._recipe(juice_key)
+            compiled = recipe.compiled.get(speed_override)
+            if compiled is None:
+                compiled = compile_program(recipe.program, speed_override)
+                recipe.compiled[speed_override] = compiled
+            return compiled
+
+    def estimate(self, juice_key: str, speed_override: float = 1.0) -> float:
+        """Estimated seconds for one drink, cached like compiled()."""
+        with self._lock:
+            recipe = self._recipe(juice_key)
+            seconds = recipe.estimates.get(speed_override)
+            if seconds is None:
+                seconds = estimate_program(recipe.program, speed_override)
+                recipe.estimates[speed_override] = seconds
+            return seconds
+
+    def eta(self, juice_key: str, speed_override: float = 1.0) -> dict:
+        """Learned p50 / p90 seconds for one drink, model estimate until it has run."""
+        model = self.estimate(juice_key, speed_override)
+        return program_eta(self.program(juice_key), speed_override, model=model)
+
+    def tray_eta(self, juice_key: str, quantity: int) -> dict:
+        """
+        Learned p50 / p90 seconds for quantity cups as one fused tray
+        (SequencePlanner.plan_tray from a fresh arm), path estimate until it has run.
+        """
+        from sequence_planner import SequencePlanner  # Imports this module
+        with self._lock:
+            recipe = self._recipe(juice_key)
+            tray = recipe.trays.get(quantity)
+        if tray is None:
+            program = SequencePlanner(self).plan_tray(juice_key, quantity).program
+            tray = (program, estimate_program(program))
+            with self._lock:
+                recipe.trays[quantity] = tray
+        program, model = tray
+        return program_eta(program, model=model)
+
+    def invalidate(self, juice_key: str = None) -> None:
+        """Forget one drink (or everything) so the next lookup re-reads from disk."""
+        with self._lock:
+            if juice_key is None:
+                self._parts.clear()
+                self._recipes.clear()
+            else:
+                self._recipes.pop(juice_key, None)
+
+    # ---------- Loading ----------
+
+    def _part(self, path: Path) -> RecipePart:
+        st = os.stat(path)
+        stat = (st.st_mtime_ns, st.st_size)
+        part = self._parts.get(path)
+        if part is not None and part.stat == stat:
+            return part
+
+        raw = path.read_bytes()
+        digest = hashlib.sha1(raw).hexdigest()
+        if part is not None and part.digest == digest:
+            part.stat = stat  # Touched but not changed
+            return part
+
+        part = RecipePart(path, stat, digest, Program.from_dict(json.loads(raw.decode("utf-8"))))
+        self._parts[path] = part
+        self.loads += 1
+        return part
+
+    def _recipe(self, juice_key: str) -> Recipe:
+        parts = [self._part(p) for p in self.part_paths(juice_key)]
+        digests = tuple(p.digest for p in parts)
+        recipe = self._recipes.get(juice_key)
+        if recipe is not None and recipe.digests == digests:
+            return recipe
+
+        program = Program(name=f"drink_{juice_key}")
+        for part in parts:
+            program.steps.extend(copy.copy(s) for s in part.program.steps)
+        recipe = Recipe(juice_key, digests, program, head=len(parts[0].program.steps))
+        self._recipes[juice_key] = recipe
+        self.builds += 1
+        return recipe
+
+
+_catalog: Optional[DrinkCatalog] = None
+_catalog_lock = threading.Lock()
+
+
+def get_catalog() -> DrinkCatalog:
+    """Process-wide catalog for programs/."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = DrinkCatalog()
+        return _catalog
+
+
+def estimate_order(order) -> tuple:
+    """
+    (seconds, variance) for a whole order (OrderQueue estimate hook): the
+    recipe's measured drink times, or its path estimate until it has run.
+    In TRAY_MODE a multi-cup order is timed as the tray the robot will run.
+    """
+    try:
+        if TRAY_MODE and order.quantity > 1:
+            eta = get_catalog().tray_eta(order.flavor, order.quantity)
+            return eta['p50'], eta['variance']
+        eta = get_catalog().eta(order.flavor)
+    except FileNotFoundError:
+        return DEFAULT_DRINK_SECONDS * order.quantity, 0.0
+    return eta['p50'] * order.quantity, eta['variance'] * order.quantity
@@ -2,32 +2,94 @@
 #
 # High-level drink runner: combines origin + pick_cup + juice recipe.
 
-from pathlib import Path
+import copy
+import time
+from typing import Callable
 
+from config import STREAM_MODE
+from drink_catalog import get_catalog
 from models import Program
-from serial_comm import run_program
+from program_compiler import compile_program, run_compiled
+from sequence_planner import SequencePlanner
+from streaming import stream_compiled
+from timing_store import get_timing_store, timing_key, program_signature
 
-BASE_DIR = Path(__file__).parent
-PROGRAM_DIR = BASE_DIR / "programs"
 
-
-def make_drink(juice_key: str) -> None:
+def build_drink_program(juice_key: str) -> Program:
     """
-    Execute complete drink sequence:
+    Merge the complete drink sequence into one Program:
       1) programs/orgin.json
       2) programs/common/pick_cup.json
       3) programs/juices/<juice_key>.json
+    Returns an editable copy of the catalog's cached drink.
+    """
+    return copy.deepcopy(get_catalog().program(juice_key))
+
+
+def record_cup_seconds(juice_key: str, seconds: float, streaming: bool = STREAM_MODE) -> None:
     """
-    # Load each JSON
-    origin_prog = Program.load(str(PROGRAM_DIR / "orgin.json"))
-    common_prog = Program.load(str(PROGRAM_DIR / "common" / "pick_cup.json"))
-    juice_prog = Program.load(str(PROGRAM_DIR / "juices" / f"{juice_key}.json"))
+    Credit one cup of a stitched or tray run to the drink's own learned time,
+    which is what single-cup ETAs read (the run itself is recorded under the
+    stitched / tray program's name).
+    """
+    catalog = get_catalog()
+    get_timing_store().record_run(
+        timing_key(catalog.program(juice_key).name, streaming=streaming),
+        program_signature(catalog.compiled(juice_key)), seconds)
+
 
-    # Merge steps in order
-    full_prog = Program(name=f"drink_{juice_key}")
-    full_prog.steps.extend(origin_prog.steps)
-    full_prog.steps.extend(common_prog.steps)
-    full_prog.steps.extend(juice_prog.steps)
+def make_drink(juice_key: str, streaming: bool = STREAM_MODE, port: str = None,
+               planner: SequencePlanner = None) -> None:
+    """
+    Execute complete drink sequence (see build_drink_program).
+    streaming=True pipelines the frames instead of the synchronous loop.
+    The compiled drink comes from the catalog, so repeat cups skip parsing.
+    With a SequencePlanner, back-to-back cups skip the redundant homing head.
+    """
+    if planner is None:
+        compiled = get_catalog().compiled(juice_key)
+    else:
+        plan = planner.plan(juice_key)
+        compiled = compile_program(plan.program)
 
     # Run merged program
-    run_program(full_prog)
+    started = time.perf_counter()
+    if streaming:
+        stream_compiled(compiled, port=port)
+    else:
+        run_compiled(compiled, port=port)
+
+    if planner is not None:
+        planner.finished(plan)
+        if plan.skipped:
+            record_cup_seconds(juice_key, time.perf_counter() - started, streaming)
+
+
+def make_tray(juice_key: str, quantity: int, streaming: bool = STREAM_MODE, port: str = None,
+              planner: SequencePlanner = None, on_cup: Callable[[int], None] = None) -> float:
+    """
+    Make quantity cups as one fused program (see SequencePlanner.plan_tray).
+    on_cup(n) is called as cup n (1-based) starts; while streaming the
+    controller works ahead, so only cup 1 is reported.
+    Returns the estimated seconds saved against quantity separate drinks.
+    """
+    planner = planner or SequencePlanner()
+    plan = planner.plan_tray(juice_key, quantity)
+    compiled = compile_program(plan.program)
+    cups = {index: cup for cup, index in enumerate(plan.cup_starts, start=1)}
+
+    def on_step(index):
+        if on_cup is not None and index in cups:
+            on_cup(cups[index])
+
+    started = time.perf_counter()
+    if streaming:
+        on_step(0)
+        stream_compiled(compiled, port=port)
+    else:
+        run_compiled(compiled, port=port, on_step=on_step)
+
+    planner.finished(plan)
+    if quantity > 1 or plan.skipped:  # A plain single drink was recorded by the run itself
+        record_cup_seconds(juice_key, (time.perf_counter() - started) / quantity, streaming)
+    return plan.saved_seconds
@@ -0,0 +1,320 @@
+#!/usr/bin/env python3
+"""
+ZKBot controller emulator on a pseudo-terminal.
+
+Shows up as a serial device so serial_comm, drink_runner and the GUIs can
+run without the arm:
+
+    python emulator.py                 # prints e.g. /dev/pts/7
+    SERIAL_PORT=/dev/pts/7 python app.py
+
+Understands the 0x550xAA ... 0xAA0x55 frames (G00/G01/G04/G06/G14) and the
+0xff 0xfe ... 0xfd 0xfc manual frames (stop, jog, position query), sent as
+text or raw bytes. Moves take the time given by kinematics.move_duration.
+
+Console keys while running: e = toggle E-stop, s = show state, q = quit.
+POSIX only (uses os.openpty).
+"""
+
+import argparse
+import math
+import os
+import re
+import select
+import sys
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Tuple
+
+from kinematics import feed_speed, move_duration
+
+AUTO_HEAD, AUTO_TAIL = b"0x550xAA", b"0xAA0x55"
+MANUAL_HEAD, MANUAL_TAIL = b"0xff0xfe", b"0xfd0xfc"
+RAW_HEAD, RAW_TAIL = b"\xff\xfe", b"\xfd\xfc"
+FRAME_MARKERS = ((AUTO_HEAD, AUTO_TAIL), (MANUAL_HEAD, MANUAL_TAIL), (RAW_HEAD, RAW_TAIL))
+
+# Manual-mode codes: axis index and direction for jog frames
+JOG_CODES = {0x03: (0, -1), 0x04: (0, 1), 0x05: (1, -1), 0x06: (1, 1), 0x07: (2, -1), 0x08: (2, 1)}
+MANUAL_STOP = 0x02
+MANUAL_POSITION = 0x0c
+
+# How far one jog frame moves the arm, in seconds of travel
+JOG_PULSE = 0.06
+
+_WORD_RE = re.compile(r"([A-Z])(-?\d+(?:\.\d+)?)")
+
+
+class Segment:
+    """One planned motion (or dwell when start == end)."""
+
+    def __init__(self, start: Tuple[float, float, float], end: Tuple[float, float, float],
+                 t_start: float, t_end: float):
+        self.start = start
+        self.end = end
+        self.t_start = t_start
+        self.t_end = t_end
+
+    def position(self, now: float) -> Tuple[float, float, float]:
+        if now >= self.t_end or self.t_end <= self.t_start:
+            return self.end
+        frac = max(0.0, (now - self.t_start) / (self.t_end - self.t_start))
+        return tuple(a + (b - a) * frac for a, b in zip(self.start, self.end))
+
+
+class ControllerEmulator:
+    """
+    Emulated ZKBot controller behind one pty.
+
+    Args:
+        latency: Seconds before each reply is written
+        planner_depth: Queued moves accepted before acks are held back
+        ack_on_complete: Ack motion frames when they finish instead of on receipt
+        time_scale: Multiplier on simulated move and dwell times (0.1 = 10x faster)
+    """
+
+    def __init__(self, latency: float = 0.002, planner_depth: int = 16,
+                 ack_on_complete: bool = False, time_scale: float = 1.0):
+        self.latency = latency
+        self.planner_depth = planner_depth
+        self.ack_on_complete = ack_on_complete
+        self.time_scale = time_scale
+
+        self.estop = False
+        self.gripper = 0
+        self.feed = 20.0
+        self.frames_received = 0
+        self._pos = (0.0, 0.0, 0.0)   # Position when the planner last went idle
+        self._target = (0.0, 0.0, 0.0)  # Where the last queued segment ends
+        self._segments: deque = deque()
+        self._lock = threading.Lock()
+
+        self.port: Optional[str] = None
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------- Lifecycle ----------
+
+    def start(self) -> str:
+        """Create the pty, start serving it and return the device path."""
+        import tty  # POSIX only; imported here so main() can report a missing openpty
+        self._master, self._slave = os.openpty()
+        tty.setraw(self._slave)  # no echo or line editing on the device side
+        self.port = os.ttyname(self._slave)
+        self._running = True
+        self._thread = threading.Thread(target=self._serve, name=f"emu-{self.port}", daemon=True)
+        self._thread.start()
+        return self.port
+
+    def close(self) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(1.0)
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+        self._master = self._slave = None
+
+    # ---------- Motion state ----------
+
+    def position(self, now: float = None) -> Tuple[float, float, float]:
+        """Current simulated position."""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            while self._segments and self._segments[0].t_end <= now:
+                self._pos = self._segments.popleft().end
+            if self._segments:
+                return self._segments[0].position(now)
+            return self._pos
+
+    def is_moving(self) -> bool:
+        self.position()
+        with self._lock:
+            return bool(self._segments)
+
+    def _queue_segment(self, end: Tuple[float, float, float], duration: float) -> Segment:
+        with self._lock:
+            now = time.monotonic()
+            t_start = max(now, self._segments[-1].t_end) if self._segments else now
+            segment = Segment(self._target, end, t_start, t_start + duration * self.time_scale)
+            self._segments.append(segment)
+            self._target = end
+            return segment
+
+    def _halt(self) -> None:
+        pos = self.position()
+        with self._lock:
+            self._segments.clear()
+            self._pos = self._target = pos
+
+    def _wait_for_planner_space(self) -> None:
+        while self._running:
+            self.position()
+            with self._lock:
+                if len(self._segments) < self.planner_depth:
+                    return
+            time.sleep(0.005)
+
+    # ---------- Protocol ----------
+
+    def _reply(self, text: str) -> None:
+        if self.latency > 0:
+            time.sleep(self.latency)
+        os.write(self._master, text.encode("utf-8"))
+
+    def _handle_auto(self, body: str) -> None:
+        words = dict(_WORD_RE.findall(body.upper()))
+        gcode = re.search(r"G(\d\d)", body.upper())
+        code = gcode.group(0) if gcode else ""
+
+        if code == "G14":
+            self._reply("error\r\n" if self.estop else "ok\r\n")
+            return
+        if self.estop:
+            self._halt()
+            self._reply("error\r\n")
+            return
+
+        if code in ("G00", "G01"):
+            if "F" in words:
+                self.feed = float(words["F"])
+            end = tuple(float(words[a]) if a in words else t for a, t in zip("XYZ", self._target))
+            distance = math.dist(self._target, end)
+            self._wait_for_planner_space()
+            segment = self._queue_segment(end, move_duration(distance, feed_speed(self.feed), code))
+        elif code == "G04":
+            segment = self._queue_segment(self._target, float(words.get("P", 0)) / 1000.0)
+        elif code == "G06":
+            self.gripper = int(float(words.get("A", self.gripper)))
+            segment = None
+        else:
+            self._reply("error\r\n")
+            return
+
+        if self.ack_on_complete and segment is not None:
+            while self._running and time.monotonic() < segment.t_end:
+                time.sleep(0.002)
+        self._reply("ok\r\n")
+
+    def _handle_manual(self, body: bytes) -> None:
+        if body.strip().startswith(b"0x"):
+            body = body.strip()
+            code, rest = int(body[2:4], 16), body[4:].decode("ascii", errors="ignore")
+        elif body:
+            code, rest = body[0], body[1:].decode("ascii", errors="ignore")
+        else:
+            return
+
+        if code == MANUAL_POSITION:
+            x, y, z = self.position()
+            self._reply(f"{x:.1f},{y:.1f},{z:.1f},ok\r\n")
+        elif code == MANUAL_STOP:
+            self._halt()
+        elif code in JOG_CODES and not self.estop:
+            axis, direction = JOG_CODES[code]
+            match = re.search(r"F(\d+)", rest)
+            speed = feed_speed(float(match.group(1))) if match else feed_speed(self.feed)
+            end = list(self._target)
+            end[axis] += direction * speed * JOG_PULSE
+            self._queue_segment(tuple(end), JOG_PULSE)
+
+    def _dispatch(self, head: bytes, body: bytes) -> None:
+        self.frames_received += 1
+        if head == AUTO_HEAD:
+            self._handle_auto(body.decode("utf-8", errors="ignore"))
+        else:
+            self._handle_manual(body)
+
+    def _extract_frames(self, buffer: bytes) -> bytes:
+        """Dispatch every complete frame in buffer and return the unconsumed rest."""
+        while True:
+            found = [(buffer.find(head), head, tail) for head, tail in FRAME_MARKERS]
+            found = [f for f in found if f[0] >= 0]
+            if not found:
+                return buffer[-len(AUTO_HEAD):]  # keep a possible partial header
+            start, head, tail = min(found)
+            end = buffer.find(tail, start + len(head))
+            if end < 0:
+                return buffer[start:]
+            self._dispatch(head, buffer[start + len(head):end])
+            buffer = buffer[end + len(tail):]
+
+    def _serve(self) -> None:
+        buffer = b""
+        while self._running:
+            ready, _, _ = select.select([self._master], [], [], 0.1)
+            if not ready:
+                continue
+            try:
+                data = os.read(self._master, 1024)
+            except OSError:
+                break
+            buffer = self._extract_frames(buffer + data)
+
+    def state(self) -> dict:
+        x, y, z = self.position()
+        return {'port': self.port, 'x': x, 'y': y, 'z': z, 'gripper': self.gripper,
+                'estop': self.estop, 'moving': self.is_moving(),
+                'frames_received': self.frames_received}
+
+
+def start_emulators(count: int = 1, **kwargs) -> List[ControllerEmulator]:
+    """Start several independent emulated controllers (e.g. for a multi-robot fleet)."""
+    emulators = []
+    for _ in range(count):
+        emu = ControllerEmulator(**kwargs)
+        emu.start()
+        emulators.append(emu)
+    return emulators
+
+
+def main():
+    parser = argparse.ArgumentParser(description="ZKBot controller emulator on a pty")
+    parser.add_argument("--count", type=int, default=1, help="Number of controllers")
+    parser.add_argument("--latency", type=float, default=0.002, help="Reply latency (s)")
+    parser.add_argument("--planner-depth", type=int, default=16)
+    parser.add_argument("--ack-on-complete", action="store_true",
+                        help="Ack moves when they finish instead of on receipt")
+    parser.add_argument("--time-scale", type=float, default=1.0,
+                        help="Multiplier on simulated motion time")
+    args = parser.parse_args()
+
+    if not hasattr(os, "openpty"):
+        print("The emulator needs a POSIX system (os.openpty).")
+        sys.exit(1)
+
+    emulators = start_emulators(args.count, latency=args.latency,
+                                planner_depth=args.planner_depth,
+                                ack_on_complete=args.ack_on_complete,
+                                time_scale=args.time_scale)
+    for emu in emulators:
+        print(f"ZKBot emulator on {emu.port}")
+    print(f"\nSERIAL_PORT={emulators[0].port} python app.py")
+    print("Keys: e = toggle E-stop, s = state, q = quit")
+
+    try:
+        for line in sys.stdin:
+            key = line.strip().lower()
+            if key == "q":
+                break
+            if key == "e":
+                for emu in emulators:
+                    emu.estop = not emu.estop
+                print(f"E-stop {'ACTIVE' if emulators[0].estop else 'released'}")
+            elif key == "s":
+                for emu in emulators:
+                    print(emu.state())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for emu in emulators:
+            emu.close()
+
+
+if __name__ == "__main__":
+    main()
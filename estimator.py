@@ -0,0 +1,160 @@
+# estimator.py
+#
+# Program time estimation from the real path: the modal XYZ targets are
+# filled forward, segment lengths and trapezoidal move times come from the
+# kinematics model, and the host / controller waits are added on top.
+# Everything is NumPy arrays, so a whole queue is estimated in one pass.
+# Once a program has run, program_eta() prefers its measured times.
+
+from typing import Sequence, Tuple
+
+import numpy as np
+
+from config import FEED_MM_PER_S, ACCEL_MM_PER_S2, WAIT_MODE, STREAM_MODE
+from models import Program, Step
+from program_compiler import compile_program
+from timing_store import get_timing_store, timing_key, program_signature
+
+# Where the arm is assumed to be before a program's first move (mm)
+START_POSE = (0.0, 0.0, 0.0)
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """Replace NaNs with the last non-NaN value above them, per column."""
+    rows = np.arange(len(values))[:, None]
+    last = np.where(np.isnan(values), 0, rows)
+    np.maximum.accumulate(last, axis=0, out=last)
+    return np.take_along_axis(values, last, axis=0)
+
+
+def move_durations(steps: Sequence[Step], speed_override: float = 1.0,
+                   start: Tuple[float, float, float] = START_POSE) -> np.ndarray:
+    """
+    Seconds each step's move takes (0 for steps that do not move).
+
+    Vectorised form of kinematics.move_duration over the path the
+    controller actually follows: None axes keep their previous value.
+    """
+    return _durations(steps, np.zeros(1, dtype=np.intp), speed_override, start)
+
+
+def _durations(steps: Sequence[Step], offsets: np.ndarray, speed_override: float,
+               start: Tuple[float, float, float]) -> np.ndarray:
+    """move_durations for several programs laid end to end (offsets = first step of each)."""
+    n = len(steps)
+    if n == 0:
+        return np.zeros(0)
+    nan = np.nan
+    xyz = np.array([(nan if s.x is None else s.x, nan if s.y is None else s.y,
+                     nan if s.z is None else s.z) for s in steps], dtype=float)
+    feed = np.array([s.f for s in steps], dtype=float)
+    rapid = np.array([s.cmd == "G00" for s in steps])
+
+    # Every program starts from `start`: give each one a leading row
+    rows = np.insert(xyz, offsets, start, axis=0)
+    filled = _forward_fill(rows)
+    step_rows = np.arange(n) + np.searchsorted(offsets, np.arange(n), side="right")
+    pose, prev = filled[step_rows], filled[step_rows - 1]
+
+    moving = ~np.isnan(xyz).all(axis=1)
+    distance = np.where(moving, np.linalg.norm(pose - prev, axis=1), 0.0)
+
+    speed = np.clip(np.trunc(feed * speed_override), 1, 500) * FEED_MM_PER_S
+    accel = np.where(rapid, ACCEL_MM_PER_S2["G00"], ACCEL_MM_PER_S2["G01"])
+    cruise = distance >= speed * speed / accel
+    with np.errstate(divide="ignore", invalid="ignore"):
+        duration = np.where(cruise, distance / speed + speed / accel,
+                            2.0 * np.sqrt(distance / accel))
+    return np.where(distance > 0, duration, 0.0)
+
+
+def estimate_programs(programs: Sequence[Program], speed_override: float = 1.0,
+                      wait_mode: str = None, streaming: bool = None,
+                      start: Tuple[float, float, float] = START_POSE) -> np.ndarray:
+    """
+    Estimated run time in seconds of each program, as one array.
+
+    Mirrors how the program is executed:
+      streaming          - moves and G04 holds queue back to back on the controller
+      "delay" loop       - the host sleeps each delay while the planner works
+                           through the queued moves; done when both are
+      "arrival" loop     - each step ends on arrival (at most its delay after
+                           sending), then holds its dwell; steps without a
+                           move wait their dwell, or their delay
+    """
+    wait_mode = wait_mode or WAIT_MODE
+    streaming = STREAM_MODE if streaming is None else streaming
+    counts = np.array([len(p.steps) for p in programs], dtype=np.intp)
+    if counts.sum() == 0:
+        return np.zeros(len(programs))
+    offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    steps = [s for p in programs for s in p.steps]
+
+    move = _durations(steps, offsets[counts > 0], speed_override, start)
+    delay = np.array([s.delay or 0.0 for s in steps], dtype=float)
+    dwell = np.array([s.dwell or 0.0 for s in steps], dtype=float)
+    has_dwell = np.array([s.dwell is not None for s in steps])
+    moving = np.array([not (s.x is None and s.y is None and s.z is None) for s in steps])
+
+    def per_program(values: np.ndarray) -> np.ndarray:
+        sums = np.concatenate(([0.0], np.cumsum(values)))
+        return sums[offsets + counts] - sums[offsets]
+
+    if streaming:
+        return per_program(move + (dwell if wait_mode == "arrival" else delay))
+    if wait_mode == "arrival":
+        return np.array([_arrival_time(move[a:a + n], delay[a:a + n], dwell[a:a + n],
+                                       has_dwell[a:a + n], moving[a:a + n])
+                         for a, n in zip(offsets, counts)])
+
+    # Delay loop: step k is sent at S[k] (sum of earlier delays) and the planner
+    # finishes at max over k of S[k] + (moves from k on). With exclusive prefix
+    # sums S and M that is max_k(S[k] - M[k]) + M[end] - S[start].
+    host = np.concatenate(([0.0], np.cumsum(delay)))
+    motion = np.concatenate(([0.0], np.cumsum(move)))
+    lead = host[:-1] - motion[:-1]
+    result = np.zeros(len(programs))
+    nonempty = counts > 0
+    starts, ends = offsets[nonempty], offsets[nonempty] + counts[nonempty]
+    planner = np.maximum.reduceat(lead, starts) + motion[ends] - host[starts]
+    result[nonempty] = np.maximum(host[ends] - host[starts], planner)
+    return result
+
+
+def _arrival_time(move, delay, dwell, has_dwell, moving) -> float:
+    """
+    Arrival loop for one program. A step gives up waiting once its delay has
+    passed while the planner may still be busy, so the next move starts
+    late; that min/max recurrence is a short scalar scan over the arrays.
+    """
+    host = planner = 0.0
+    for m, d, w, held, moves in zip(move.tolist(), delay.tolist(), dwell.tolist(),
+                                    has_dwell.tolist(), moving.tolist()):
+        if not moves:
+            host += w if held else d
+            continue
+        planner = max(planner, host) + m
+        host = min(planner, host + d) + w
+    return max(host, planner)
+
+
+def estimate_program(program: Program, speed_override: float = 1.0,
+                     wait_mode: str = None, streaming: bool = None,
+                     start: Tuple[float, float, float] = START_POSE) -> float:
+    """Estimated run time of one program in seconds (see estimate_programs)."""
+    return float(estimate_programs([program], speed_override, wait_mode, streaming, start)[0])
+
+
+def program_eta(program: Program, speed_override: float = 1.0, wait_mode: str = None,
+                streaming: bool = None, model: float = None) -> dict:
+    """
+    p50 / p90 run time of a program (see TimingStore.eta for the dict):
+    learned from its completed runs in this mode, else the model estimate
+    (model, when the caller already has it cached).
+    """
+    streaming = STREAM_MODE if streaming is None else streaming
+    if model is None:
+        model = estimate_program(program, speed_override, wait_mode, streaming)
+    compiled = compile_program(program, speed_override)
+    key = timing_key(program.name, speed_override, wait_mode, streaming)
+    return get_timing_store().eta(key, program_signature(compiled), model)
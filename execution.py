@@ -0,0 +1,113 @@
+# execution.py
+#
+# Background execution for the teaching GUI: serial work runs on one worker
+# thread and results come back through a UIEventQueue post function.
+
+import queue
+import threading
+from typing import Callable
+
+from models import Program
+from serial_comm import run_program, check_emergency_stop, StepExecutor
+from io_worker import get_io_worker
+
+
+class ExecutionController:
+    """
+    Runs serial jobs one at a time off the Tk thread.
+
+    Every on_done / on_error / on_step callback is handed to post(), so with
+    post=UIEventQueue.post they all run on the Tk thread. cancel() stops a
+    running program before its next step and sends the manual stop frame
+    through the I/O worker's stop lane right away.
+    """
+
+    def __init__(self, post: Callable, port: str = None):
+        self.post = post
+        self.port = port
+        self._tasks: "queue.Queue" = queue.Queue()
+        self._busy = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="execution", daemon=True)
+        self._thread.start()
+
+    @property
+    def busy(self) -> bool:
+        """True while a job is queued or running."""
+        return self._busy.is_set() or not self._tasks.empty()
+
+    def submit(self, fn: Callable, *args, on_done: Callable = None,
+               on_error: Callable = None) -> None:
+        """Run fn(*args) on the worker; post on_done(result) or on_error(exc)."""
+        self._tasks.put((fn, args, on_done, on_error))
+
+    def shutdown(self) -> None:
+        self.cancel(send_stop=False)
+        self._tasks.put(None)
+
+    def cancel(self, send_stop: bool = True) -> None:
+        """Stop the running program (and the arm, unless send_stop is False)."""
+        self._stop_event.set()
+        if send_stop:
+            try:
+                get_io_worker(self.port).stop_now()
+            except Exception as e:
+                print(f"Stop error: {e}")
+
+    # ---------- Jobs ----------
+
+    def run_program(self, prog: Program, speed_override: float = 1.0,
+                    on_step: Callable[[int], None] = None, on_done: Callable = None,
+                    on_error: Callable = None) -> None:
+        """
+        Check the E-stop, then run prog. on_done receives True if the
+        program completed, False if it was cancelled.
+        """
+        self._stop_event = stop_event = threading.Event()
+
+        def step_callback(index):
+            if on_step is not None:
+                self.post(on_step, index)
+
+        def job():
+            estop = check_emergency_stop()
+            if estop['is_pressed'] is True:
+                raise RuntimeError("Release E-stop first")
+            return run_program(prog, speed_override, self.port,
+                               stop_event=stop_event, on_step=step_callback)
+
+        self.submit(job, on_done=on_done, on_error=on_error)
+
+    def check_estop(self, on_done: Callable) -> None:
+        """Fresh G14 query; on_done receives the check_emergency_stop() dict."""
+        self.submit(check_emergency_stop, on_done=on_done)
+
+    def start_steps(self, executor: StepExecutor, on_done: Callable = None,
+                    on_error: Callable = None) -> None:
+        self.submit(executor.start, on_done=on_done, on_error=on_error)
+
+    def next_step(self, executor: StepExecutor, on_done: Callable,
+                  on_error: Callable = None) -> None:
+        """Run executor.execute_next_step(); on_done receives its result dict."""
+        self.submit(executor.execute_next_step, on_done=on_done, on_error=on_error)
+
+    # ---------- Worker ----------
+
+    def _run(self) -> None:
+        while True:
+            task = self._tasks.get()
+            if task is None:
+                break
+            fn, args, on_done, on_error = task
+            self._busy.set()
+            try:
+                result = fn(*args)
+            except Exception as e:
+                print(f"Execution error: {e}")
+                if on_error is not None:
+                    self.post(on_error, e)
+            else:
+                if on_done is not None:
+                    self.post(on_done, result)
+            finally:
+                self._busy.clear()
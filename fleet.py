@@ -0,0 +1,505 @@
+# fleet.py
+#
+# Several arms behind one order queue. The FleetDispatcher keeps a RobotWorker
+# (with its own small queue) per serial port in config ROBOT_PORTS, hands each
+# cup of the next order to the arm predicted to be free first, and moves a
+# faulted arm's unfinished cups onto the healthy ones.
+#
+#   python fleet.py --emulate 3 --orders mango:2,orange:1,mango:3
+#   python fleet.py --check            # fault recovery self-check on emulators
+
+import argparse
+import math
+import sys
+import tempfile
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from config import ROBOT_PORTS, SCHEDULING_POLICY
+from drink_catalog import estimate_order
+from order_queue import OrderQueue, Order, PENDING, COMPLETED
+from robot_worker import RobotWorker, POLL_TIMEOUT
+from scheduling import make_policy
+from timing_store import Z90, use_timing_store
+
+OK, FAULTED = "ok", "faulted"
+
+
+@dataclass
+class RobotHealth:
+    """What the dispatcher knows about one arm."""
+    state: str = OK
+    faults: int = 0
+    last_error: Optional[str] = None
+    cups_made: int = 0
+    last_ok: Optional[float] = None     # monotonic time of the last finished cup
+
+
+@dataclass
+class FleetRobot:
+    name: str
+    port: str
+    queue: OrderQueue                   # Cups assigned to this arm, not started yet
+    worker: RobotWorker
+    health: RobotHealth = field(default_factory=RobotHealth)
+
+    @property
+    def healthy(self) -> bool:
+        return self.health.state == OK
+
+    def free_in(self) -> float:
+        """Predicted seconds until this arm has made everything assigned to it."""
+        return self.worker.eta()
+
+
+@dataclass
+class _Job:
+    """A customer order being made across the fleet."""
+    order: Order
+    started: bool = False
+    cups_started: int = 0
+    cups_done: int = 0
+    waiting: int = 0                    # Cups with no healthy arm to go to
+
+
+class FleetDispatcher:
+    """
+    One customer OrderQueue served by one RobotWorker per port.
+
+    The dispatcher takes the queue policy's next order whenever a healthy
+    arm has nothing assigned beyond what it is making, and gives each cup
+    to the arm with the earliest predicted free time (RobotWorker.eta();
+    the cups of one order that land on the same arm go as one order there,
+    so tray mode still applies). An arm whose drink fails is marked faulted:
+    its unfinished and assigned cups are handed to the other arms, and it
+    takes no work until start() is called again (the operator checked it).
+
+    Offers the RobotWorker interface the kiosk and order server use
+    (start / pause / stop, running, busy, eta_range, progress, listeners),
+    with events for the customer order: order_started, drink_started,
+    drink_done, order_done, robot_failed ('error' set, 'robot' the name)
+    and idle. Cups are numbered in the order they start across arms.
+    """
+
+    def __init__(self, queue: OrderQueue, ports: List[str] = None,
+                 make_worker: Callable[[OrderQueue, str, str], RobotWorker] = None):
+        self.queue = queue
+        make_worker = make_worker or (lambda q, port, name: RobotWorker(q, port=port, name=name))
+        self.robots: List[FleetRobot] = []
+        for number, port in enumerate(ports or ROBOT_PORTS, start=1):
+            name = f"robot{number}"
+            robot_queue = OrderQueue(estimate=estimate_order)
+            robot = FleetRobot(name, port, robot_queue, make_worker(robot_queue, port, name))
+            robot.worker.add_listener(lambda info, r=robot: self._on_robot_event(r, info))
+            self.robots.append(robot)
+
+        self._lock = threading.RLock()
+        self._wake = threading.Event()
+        self._jobs: Dict[int, _Job] = {}                    # Customer order id -> job
+        self._assigned: Dict[Tuple[str, int], int] = {}     # (robot, its order id) -> customer id
+        self._cups: Dict[Tuple[str, int], List[int]] = {}     # Same key -> [started, done]
+        self._listeners: List[Callable[[dict], None]] = []
+        self._running = False
+        self._paused = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.session_drinks = 0
+        self.last_error: Optional[str] = None
+
+    # ---------- Lifecycle ----------
+
+    def start(self) -> "FleetDispatcher":
+        """Start (or resume) all arms; faulted arms are put back in service."""
+        with self._lock:
+            for robot in self.robots:
+                robot.health.state = OK
+                robot.worker.start()
+            self._dispatch_waiting()
+        self._paused.clear()
+        if not self._running:
+            self._running = True
+            self._thread = threading.Thread(target=self._run, name="fleet-dispatch", daemon=True)
+            self._thread.start()
+        self._wake.set()
+        return self
+
+    def pause(self) -> None:
+        """Stop handing out orders; arms finish what they were given."""
+        self._paused.set()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        for robot in self.robots:
+            robot.worker.stop(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._running and not self._paused.is_set()
+
+    @property
+    def busy(self) -> bool:
+        return any(r.worker.busy for r in self.robots)
+
+    def health(self) -> Dict[str, dict]:
+        """Per-arm health and load, e.g. for a status page."""
+        return {r.name: {'port': r.port, 'state': r.health.state, 'faults': r.health.faults,
+                         'last_error': r.health.last_error, 'cups_made': r.health.cups_made,
+                         'busy': r.worker.busy, 'assigned': r.queue.pending_drinks,
+                         'free_in': r.free_in()}
+                for r in self.robots}
+
+    # ---------- Listeners ----------
+
+    def add_listener(self, listener: Callable[[dict], None]) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[dict], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, event: str, order: Order = None, drink: int = 0, error: str = None,
+              robot: str = None) -> None:
+        info = {'event': event, 'order': order, 'drink': drink, 'error': error, 'robot': robot}
+        for listener in list(self._listeners):
+            try:
+                listener(info)
+            except Exception as e:
+                print(f"Fleet listener error: {e}")
+
+    # ---------- Progress ----------
+
+    @property
+    def current(self) -> Optional[Order]:
+        """A customer order in progress (the oldest one)."""
+        with self._lock:
+            job = self._current_job()
+            return job.order if job is not None else None
+
+    @property
+    def current_drink(self) -> int:
+        """Cups started of current (0 if it finished meanwhile)."""
+        with self._lock:
+            job = self._current_job()
+            return job.cups_started if job is not None else 0
+
+    def _current_job(self) -> Optional[_Job]:
+        """Oldest started job (caller holds self._lock)."""
+        started = [job for job in self._jobs.values() if job.started]
+        return min(started, key=lambda job: job.order.order_id, default=None)
+
+    @property
+    def drinks_made(self) -> int:
+        return sum(r.health.cups_made for r in self.robots)
+
+    def current_remaining(self, per_drink: float = None) -> float:
+        """Seconds until every arm has finished what it was given."""
+        return max((r.free_in() for r in self.robots if r.healthy), default=0.0)
+
+    def _free_times(self) -> List[float]:
+        return [r.free_in() for r in self.robots if r.healthy]
+
+    def eta(self) -> float:
+        """Seconds until everything queued now is made, spreading waiting cups greedily."""
+        return self.eta_range()[0]
+
+    def eta_range(self) -> Tuple[float, float]:
+        """
+        (p50, p90) of eta(). Waiting orders are dealt out cup by cup to the
+        earliest free arm; the spread assumes the arms work in parallel, so
+        the variance of the queue is shared between them.
+        """
+        free = self._free_times()
+        if not free:
+            return 0.0, 0.0
+        for order in self.queue.orders:
+            if order.status != PENDING or order.quantity <= 0:
+                continue
+            per_drink = order.estimate / order.quantity
+            for _ in range(order.quantity):
+                index = free.index(min(free))
+                free[index] += per_drink
+        variance = self.queue.pending_variance + sum(r.queue.pending_variance
+                                                     for r in self.robots if r.healthy)
+        p50 = max(free)
+        return p50, p50 + Z90 * math.sqrt(max(0.0, variance) / len(free))
+
+    def progress(self) -> float:
+        """Percent of the drinks in this session (since the fleet was idle) that are made."""
+        with self._lock:
+            in_progress = sum(job.order.quantity - job.cups_done for job in self._jobs.values())
+        total = self.session_drinks + in_progress + self.queue.pending_drinks
+        return 100.0 * self.session_drinks / total if total else 0.0
+
+    # ---------- Dispatching ----------
+
+    def _has_room(self) -> bool:
+        """A healthy arm has nothing queued beyond its current order."""
+        return any(r.healthy and r.worker.running and r.queue.get_pending_count() == 0
+                   for r in self.robots)
+
+    def _run(self) -> None:
+        idle_sent = True
+        while self._running:
+            self._wake.wait(POLL_TIMEOUT)
+            self._wake.clear()
+            if self._paused.is_set() or not self._has_room():
+                continue
+            order = self.queue.take_next()
+            if order is not None:
+                idle_sent = False
+                with self._lock:
+                    self._jobs[order.order_id] = _Job(order)
+                    self._assign(order, order.quantity)
+                self._wake.set()  # Another arm may still have room
+            elif not idle_sent and self._fleet_idle():
+                self.session_drinks = 0
+                self._emit('idle')
+                idle_sent = True
+
+    def _fleet_idle(self) -> bool:
+        with self._lock:
+            return self.queue.is_idle() and not self._jobs
+
+    def _assign(self, order: Order, cups: int) -> None:
+        """Deal cups of order to the earliest free healthy arms (call with _lock held)."""
+        healthy = [r for r in self.robots if r.healthy]
+        if not healthy:
+            self._jobs[order.order_id].waiting += cups
+            print(f"Fleet: no healthy robot for {cups} cup(s) of order #{order.order_id}; "
+                  f"waiting for start()")
+            return
+        per_drink = order.estimate / order.quantity if order.quantity else 0.0
+        free = [r.free_in() for r in healthy]
+        counts = [0] * len(healthy)
+        for _ in range(cups):
+            index = free.index(min(free))
+            free[index] += per_drink
+            counts[index] += 1
+        for robot, count in zip(healthy, counts):
+            if count:
+                part = robot.queue.add_order(order.flavor, count)
+                self._assigned[(robot.name, part.order_id)] = order.order_id
+                self._cups[(robot.name, part.order_id)] = [0, 0]
+
+    def _dispatch_waiting(self) -> None:
+        """Assign cups that found no healthy arm earlier (call with _lock held)."""
+        for job in self._jobs.values():
+            if job.waiting:
+                cups, job.waiting = job.waiting, 0
+                self._assign(job.order, cups)
+
+    # ---------- Robot events (worker threads) ----------
+
+    def _on_robot_event(self, robot: FleetRobot, info: dict) -> None:
+        event, part = info['event'], info['order']
+        with self._lock:
+            key = (robot.name, part.order_id) if part is not None else None
+            job = self._jobs.get(self._assigned.get(key)) if key else None
+
+            if event == 'order_started' and job is not None and not job.started:
+                job.started = True
+                self._emit('order_started', job.order)
+            elif event == 'drink_started' and job is not None:
+                self._cups[key][0] += 1
+                job.cups_started += 1
+                self._emit('drink_started', job.order, job.cups_started, robot=robot.name)
+            elif event == 'drink_done' and job is not None:
+                self._cups[key][1] += 1
+                job.cups_done += 1
+                robot.health.cups_made += 1
+                robot.health.last_ok = time.monotonic()
+                self.session_drinks += 1
+                self._emit('drink_done', job.order, job.cups_done, robot=robot.name)
+                if job.cups_done >= job.order.quantity:
+                    del self._jobs[job.order.order_id]
+                    self.queue.complete(job.order)
+                    self._emit('order_done', job.order, job.order.quantity)
+            elif event == 'order_done' and key is not None:
+                self._assigned.pop(key, None)
+                self._cups.pop(key, None)
+            elif event == 'order_failed' and key is not None:
+                self._fault(robot, part, info['error'])
+        self._wake.set()
+
+    def _fault(self, robot: FleetRobot, failed: Order, error: str) -> None:
+        """Take robot out of service and hand its unfinished cups to the others (_lock held)."""
+        robot.health.state = FAULTED
+        robot.health.faults += 1
+        robot.health.last_error = error
+        self.last_error = f"{robot.name}: {error}"
+
+        # The failed order's unfinished cups, then everything assigned but not started
+        moved = []
+        key = (robot.name, failed.order_id)
+        started, done = self._cups.pop(key, [0, 0])
+        moved.append((self._assigned.pop(key, None), failed.quantity - done))
+        job = self._jobs.get(moved[0][0])
+        if job is not None:
+            job.cups_started -= started - done  # The spoilt cup is started again elsewhere
+        pending = [o for o in robot.queue.orders if o.status == PENDING]
+        robot.queue.clear_pending()
+        for part in pending:
+            key = (robot.name, part.order_id)
+            moved.append((self._assigned.pop(key, None), part.quantity))
+            self._cups.pop(key, None)
+
+        cups = 0
+        for order_id, count in moved:
+            job = self._jobs.get(order_id)
+            if job is not None and count > 0:
+                self._assign(job.order, count)
+                cups += count
+        print(f"Fleet: {robot.name} ({robot.port}) faulted: {error}; "
+              f"moved {cups} cup(s) to other robots")
+        job = self._jobs.get(moved[0][0])
+        self._emit('robot_failed', job.order if job else None,
+                   error=f"{robot.name}: {error}", robot=robot.name)
+
+
+def make_station_robot(queue: OrderQueue, ports: List[str] = None):
+    """The kiosk's robot: a RobotWorker for one port, a FleetDispatcher for several."""
+    if ports is None:
+        if len(ROBOT_PORTS) == 1:
+            return RobotWorker(queue)  # Default port, as before fleets
+        ports = ROBOT_PORTS
+    if len(ports) == 1:
+        return RobotWorker(queue, port=ports[0])
+    return FleetDispatcher(queue, ports)
+
+
+def _scratch_timings() -> None:
+    """Emulated arms must not teach the station's learned times (config TIMING_FILE)."""
+    path = Path(tempfile.mkdtemp(prefix="zkbot-timings-")) / "timings.json"
+    use_timing_store(path)
+    print(f"Emulator timings go to {path}")
+
+
+def check_fault_recovery(robots: int = 3, orders: str = "mango:3,orange:2", fault: str = "robot2",
+                         time_scale: float = 0.2, timeout: float = 600.0) -> List[str]:
+    """
+    Run orders on emulated arms, E-stop the fault arm after its first cup,
+    and check that the others finish every cup. Returns the problems found
+    (empty when recovery worked).
+    """
+    from emulator import start_emulators
+    _scratch_timings()
+    emulators = start_emulators(robots, time_scale=time_scale)
+    queue = OrderQueue(estimate=estimate_order, policy=make_policy(SCHEDULING_POLICY))
+    fleet = FleetDispatcher(queue, [emu.port for emu in emulators])
+    faulted_at = []
+    done = threading.Event()
+
+    def on_event(info):
+        if info['event'] == 'drink_done' and info.get('robot') == fault and not faulted_at:
+            faulted_at.append(time.monotonic())
+            emulators[int(fault.replace("robot", "")) - 1].estop = True
+        elif info['event'] == 'idle':
+            done.set()
+
+    fleet.add_listener(on_event)
+    placed = []
+    for item in orders.split(","):
+        flavor, _, quantity = item.partition(":")
+        placed.append(queue.add_order(flavor, int(quantity or 1)))
+    fleet.start()
+    try:
+        finished = done.wait(timeout)
+        health = fleet.health()
+    finally:
+        fleet.stop()
+        for emu in emulators:
+            emu.close()
+
+    problems = []
+    if not finished:
+        problems.append(f"orders not done within {timeout:.0f}s")
+    if not faulted_at:
+        problems.append(f"{fault} never finished a cup, so no fault was injected")
+    elif health[fault]['state'] != FAULTED:
+        problems.append(f"{fault} is {health[fault]['state']} after its E-stop")
+    for order in placed:
+        order = queue.find_order(order.order_id) or order
+        if order.status != COMPLETED:
+            problems.append(f"order #{order.order_id} {order.status}")
+    cups = sum(h['cups_made'] for h in health.values())
+    wanted = sum(order.quantity for order in placed)
+    if cups != wanted:
+        problems.append(f"{cups} cups made, {wanted} ordered")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run orders on several arms")
+    parser.add_argument("--ports", help="Comma-separated serial ports (default: config ROBOT_PORTS)")
+    parser.add_argument("--emulate", type=int, default=0, help="Use N emulated controllers")
+    parser.add_argument("--time-scale", type=float, default=0.2,
+                        help="Emulated motion time multiplier")
+    parser.add_argument("--orders", default="mango:2,orange:1,mango:3",
+                        help="flavor:quantity,... to make")
+    parser.add_argument("--fault", help="Robot name to fault after its first cup, e.g. robot2")
+    parser.add_argument("--check", action="store_true",
+                        help="Self-check fault recovery on emulators (exit status 1 on failure)")
+    args = parser.parse_args()
+
+    if args.check:
+        problems = check_fault_recovery(max(2, args.emulate or 3), time_scale=args.time_scale)
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        print("Fault recovery check " + ("failed" if problems else "passed"))
+        sys.exit(1 if problems else 0)
+
+    if args.emulate:
+        from emulator import start_emulators
+        _scratch_timings()
+        emulators = start_emulators(args.emulate, time_scale=args.time_scale)
+        ports = [emu.port for emu in emulators]
+    else:
+        emulators = []
+        ports = args.ports.split(",") if args.ports else ROBOT_PORTS
+
+    queue = OrderQueue(estimate=estimate_order, policy=make_policy(SCHEDULING_POLICY))
+    fleet = FleetDispatcher(queue, ports)
+    done = threading.Event()
+
+    def report(info):
+        line = f"[{time.strftime('%H:%M:%S')}] {info['event']}"
+        if info.get('robot'):
+            line += f" on {info['robot']}"
+        if info['order'] is not None:
+            line += f" {info['order']}"
+        if info['drink']:
+            line += f" cup {info['drink']}"
+        if info['error']:
+            line += f" ({info['error']})"
+        print(line)
+        if args.fault and emulators and info['event'] == 'drink_done' and info.get('robot') == args.fault:
+            emulators[int(args.fault.replace("robot", "")) - 1].estop = True
+        if info['event'] == 'idle':
+            done.set()
+
+    fleet.add_listener(report)
+    for item in args.orders.split(","):
+        flavor, _, quantity = item.partition(":")
+        queue.add_order(flavor, int(quantity or 1))
+    started = time.monotonic()
+    print(f"{len(ports)} robots, {queue.pending_drinks} cups, ETA ~{fleet.eta():.0f}s")
+    fleet.start()
+    try:
+        done.wait()
+    except KeyboardInterrupt:
+        pass
+    print(f"Done in {time.monotonic() - started:.1f}s")
+    for name, health in fleet.health().items():
+        print(f"  {name}: {health['state']}, {health['cups_made']} cups, {health['faults']} faults")
+    fleet.stop()
+    for emu in emulators:
+        emu.close()
+
+
+if __name__ == "__main__":
+    main()
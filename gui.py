@@ -2,6 +2,7 @@
 #
 # All previous upgrades + Order Queue System
 
+import copy
 import os
 import tkinter as tk
 from tkinter import ttk, filedialog, messagebox, Canvas, Scrollbar
@@ -10,10 +11,15 @@ import threading
 import time
 
 from models import Step, Program
-from serial_comm import run_program, query_position, check_emergency_stop, StepExecutor
+from serial_comm import StepExecutor, close_all_connections
+from telemetry import get_telemetry, STALE_AFTER
+from ui_events import UIEventQueue, UIStateBus
+from execution import ExecutionController
 from config import PROGRAMS_DIR, SPEED_OVERRIDE_PERCENT, JUICE_FLAVORS, MAX_ORDER_QUANTITY
 from order_queue import OrderQueue, estimate_program_time, format_time
 from jog_control import JogControlWindow
+from optimizer import optimize_program
+from step_tree import StepTreeView
 
 
 class MainWindow(tk.Frame):
@@ -49,7 +55,13 @@ class MainWindow(tk.Frame):
         self.current_order_juice = 0  # Current juice number in order
         self.program_lock = threading.Lock()  # Thread safety for program access
         
+        # Serial work runs on the execution worker; results come back
+        # through the event queue, drained on the Tk thread by one pump
+        self.ui_events = UIEventQueue(self).start()
+        self.execution = ExecutionController(self.ui_events.post)
+        
         self._build_widgets()
+        self._bind_ui_state()
     def _build_widgets(self):
         self.columnconfigure(0, weight=3)
         self.columnconfigure(1, weight=2)
@@ -61,13 +73,8 @@ class MainWindow(tk.Frame):
         left_frame.rowconfigure(0, weight=1)
         left_frame.columnconfigure(0, weight=1)
         
-        columns = ("cmd", "x", "y", "z", "f", "delay", "do0")
-        self.tree = ttk.Treeview(left_frame, columns=columns, show="headings", height=25)
-        headings = {"cmd": "Cmd", "x": "X", "y": "Y", "z": "Z", "f": "F", "delay": "Delay", "do0": "DO0"}
-        for col, text in headings.items():
-            self.tree.heading(col, text=text)
-            self.tree.column(col, width=70, anchor="center")
-
+        # Virtualised: only the visible rows exist as Treeview items
+        self.tree = StepTreeView(left_frame, height=25)
         self.tree.grid(row=0, column=0, sticky="nsew")
         self.tree.bind("<<TreeviewSelect>>", self.on_select_step)
         
@@ -79,11 +86,6 @@ class MainWindow(tk.Frame):
         self.tree.bind("<Control-Down>", lambda e: self.on_move_down())
         self.tree.bind("<Control-a>", lambda e: self.on_select_all())
         self.tree.bind("<Control-Shift-Delete>", lambda e: self.on_clear_all())
-        
-        # Scrollbar for tree
-        tree_scroll = ttk.Scrollbar(left_frame, orient="vertical", command=self.tree.yview)
-        tree_scroll.grid(row=0, column=1, sticky="ns")
-        self.tree.configure(yscrollcommand=tree_scroll.set)
 
         # --- RIGHT: Scrollable control panel ---
         right_frame = tk.Frame(self)
@@ -457,6 +459,8 @@ class MainWindow(tk.Frame):
         self.f_var = tk.StringVar()
         self.delay_var = tk.StringVar()
         self.do0_var = tk.StringVar()
+        self.mandatory_var = tk.BooleanVar(value=False)
+        self.safe_var = tk.BooleanVar(value=False)
 
         tk.Label(editor, text="Cmd:", font=("Arial", 8)).grid(row=0, column=0, sticky="e", padx=2, pady=1)
         ttk.Combobox(editor, textvariable=self.cmd_var, values=("G00", "G01"), 
@@ -486,10 +490,15 @@ class MainWindow(tk.Frame):
         ttk.Entry(editor, textvariable=self.do0_var, width=12, font=("Arial", 8)).grid(
             row=6, column=1, sticky="ew", padx=2, pady=1)
 
+        flags = tk.Frame(editor)
+        flags.grid(row=7, column=0, columnspan=2, sticky="w", padx=2, pady=1)
+        ttk.Checkbutton(flags, text="Mandatory waypoint", variable=self.mandatory_var).pack(side="left")
+        ttk.Checkbutton(flags, text="Safe (rapid OK)", variable=self.safe_var).pack(side="left", padx=4)
+
         editor.columnconfigure(1, weight=1)
 
         btn_frame1 = tk.Frame(editor)
-        btn_frame1.grid(row=7, column=0, columnspan=2, pady=3, sticky="ew", padx=2)
+        btn_frame1.grid(row=8, column=0, columnspan=2, pady=3, sticky="ew", padx=2)
 
         for i, (text, cmd) in enumerate([("Add", self.on_add_step), 
                                          ("Insert", self.on_insert_step),
@@ -499,7 +508,7 @@ class MainWindow(tk.Frame):
             btn_frame1.columnconfigure(i, weight=1)
 
         btn_frame2 = tk.Frame(editor)
-        btn_frame2.grid(row=8, column=0, columnspan=2, pady=3, sticky="ew", padx=2)
+        btn_frame2.grid(row=9, column=0, columnspan=2, pady=3, sticky="ew", padx=2)
 
         self.copy_btn = ttk.Button(btn_frame2, text="📋 Copy", command=self.on_copy_step)
         self.copy_btn.grid(row=0, column=0, padx=1, sticky="ew")
@@ -515,7 +524,7 @@ class MainWindow(tk.Frame):
         btn_frame2.columnconfigure(2, weight=1)
 
         btn_frame3 = tk.Frame(editor)
-        btn_frame3.grid(row=9, column=0, columnspan=2, pady=3, sticky="ew", padx=2)
+        btn_frame3.grid(row=10, column=0, columnspan=2, pady=3, sticky="ew", padx=2)
 
         self.move_up_btn = ttk.Button(btn_frame3, text="⬆ Up", command=self.on_move_up)
         self.move_up_btn.grid(row=0, column=0, padx=1, sticky="ew")
@@ -538,7 +547,7 @@ class MainWindow(tk.Frame):
             wraplength=200,
             justify="left"
         )
-        self.clipboard_label.grid(row=10, column=0, columnspan=2, pady=2, sticky="w", padx=5)
+        self.clipboard_label.grid(row=11, column=0, columnspan=2, pady=2, sticky="w", padx=5)
 
     def _build_program_panel(self, parent):
         """Build program management panel."""
@@ -561,9 +570,12 @@ class MainWindow(tk.Frame):
             row=0, column=0, padx=1, sticky="ew")
         ttk.Button(prog_btns2, text="Clear All", command=self.on_clear_all).grid(
             row=0, column=1, padx=1, sticky="ew")
+        ttk.Button(prog_btns2, text="Optimize", command=self.on_optimize_program).grid(
+            row=0, column=2, padx=1, sticky="ew")
 
         prog_btns2.columnconfigure(0, weight=1)
         prog_btns2.columnconfigure(1, weight=1)
+        prog_btns2.columnconfigure(2, weight=1)
 
         self.step_count_label = tk.Label(
             prog_frame,
@@ -581,6 +593,10 @@ class MainWindow(tk.Frame):
         self.run_btn = ttk.Button(run_frame, text="▶ Run Program", command=self.on_run_program)
         self.run_btn.pack(fill="x", padx=3, pady=2)
 
+        self.stop_run_btn = ttk.Button(run_frame, text="⏹ Stop", command=self.on_stop_program,
+                                       state="disabled")
+        self.stop_run_btn.pack(fill="x", padx=3, pady=2)
+
         self.status_var = tk.StringVar(value="Ready")
         tk.Label(run_frame, textvariable=self.status_var, font=("Arial", 7),
                 wraplength=250, fg="#7f8c8d").pack(padx=3, pady=2)
@@ -610,7 +626,8 @@ class MainWindow(tk.Frame):
         # Create copy of current program for this order
         order_program = Program(f"{flavor}_order")
         order_program.steps = [Step(cmd=s.cmd, x=s.x, y=s.y, z=s.z, f=s.f, 
-                                    delay=s.delay, do0=s.do0) 
+                                    delay=s.delay, do0=s.do0, dwell=s.dwell,
+                                    mandatory=s.mandatory, safe=s.safe) 
                                for s in self.program.steps]
         
         order = self.order_queue.add_order(flavor, quantity, order_program)
@@ -650,7 +667,7 @@ class MainWindow(tk.Frame):
     
     def on_start_queue(self):
         """Start processing the order queue."""
-        if self.order_queue.get_total_count() == 0:
+        if self.order_queue.get_pending_count() == 0:
             messagebox.showinfo("Empty Queue", "Add orders to queue first!")
             return
         
@@ -658,9 +675,13 @@ class MainWindow(tk.Frame):
             messagebox.showinfo("Already Running", "Queue is already processing!")
             return
         
-        # Check E-stop
-        estop_result = check_emergency_stop()
+        # Check E-stop in the background, start once the answer is back
+        self.start_queue_btn.config(state="disabled")
+        self.execution.check_estop(on_done=self._start_queue_after_estop)
+    
+    def _start_queue_after_estop(self, estop_result):
         if estop_result['is_pressed'] is True:
+            self.start_queue_btn.config(state="normal")
             messagebox.showerror("E-Stop Active", "Release E-stop first!")
             return
         
@@ -698,26 +719,47 @@ class MainWindow(tk.Frame):
             self.update_total_queue_time()
             self.status_var.set("Queue cleared")
     
+    def _bind_ui_state(self):
+        """Fields the queue thread publishes; applied at a fixed rate on the Tk thread."""
+        self.ui_state = UIStateBus(self)
+        self.ui_state.bind("queue", lambda _: (self.refresh_queue_display(),
+                                               self.update_total_queue_time()))
+        self.ui_state.bind("current", self.current_order_var.set)
+        self.ui_state.bind("progress", self._show_queue_progress)
+        self.ui_state.bind("remaining", lambda t: self.time_remaining_var.set(
+            f"Time Remaining: {format_time(t)}"))
+        self.ui_state.bind("finished", self._on_queue_finished)
+        self.ui_state.start()
+    
+    def _show_queue_progress(self, percent):
+        self.progress_var.set(percent)
+        self.progress_text_var.set(f"Progress: {percent:.0f}%")
+    
+    def _on_queue_finished(self, error):
+        """Queue ran dry (error None) or failed; stopping by hand resets the buttons itself."""
+        self.start_queue_btn.config(state="normal")
+        self.stop_queue_btn.config(state="disabled")
+        self.add_queue_btn.config(state="normal")
+        if error:
+            messagebox.showerror("Execution Error", error)
+        else:
+            self.status_var.set("✓ Queue complete!")
+            messagebox.showinfo("Queue Complete", "All orders processed!")
+    
     def process_queue(self):
-        """Process orders in FIFO order (runs in separate thread)."""
+        """Process orders in FIFO order (queue thread: publishes to ui_state only)."""
+        ui = self.ui_state
         while self.queue_processing:
-            # Get next pending order
-            order = self.order_queue.get_next_pending()
+            # Take next pending order (marks it Processing)
+            order = self.order_queue.take_next()
             
             if order is None:
                 # No more orders
                 self.queue_processing = False
-                self.after(0, lambda: self.start_queue_btn.config(state="normal"))
-                self.after(0, lambda: self.stop_queue_btn.config(state="disabled"))
-                self.after(0, lambda: self.add_queue_btn.config(state="normal"))
-                self.after(0, lambda: self.status_var.set("✓ Queue complete!"))
-                self.after(0, lambda: messagebox.showinfo("Queue Complete", 
-                                                          "All orders processed!"))
+                ui.set("finished", None)
                 break
             
-            # Mark as processing
-            order.status = "Processing"
-            self.after(0, self.refresh_queue_display)
+            ui.set("queue")
             
             # Process each juice in the order
             for juice_num in range(1, order.quantity + 1):
@@ -725,53 +767,42 @@ class MainWindow(tk.Frame):
                     break
                 
                 self.current_order_juice = juice_num
-                
-                # Update UI
-                self.after(0, lambda o=order, j=juice_num: 
-                          self.current_order_var.set(f"Current: {o} ({j}/{o.quantity})"))
-                
-                # Calculate progress (thread-safe)
-                with self.program_lock:
-                    total_steps = len(order.program.steps)
+                ui.set("current", f"Current: {order} ({juice_num}/{order.quantity})")
                 
                 try:
-                    # Execute program with progress tracking (thread-safe)
+                    # Snapshot the program (thread-safe)
                     with self.program_lock:
                         steps_list = list(order.program.steps)
+                    total_steps = len(steps_list)
+                    avg_step_time = estimate_program_time(order.program) / total_steps
                     
                     for step_idx, step in enumerate(steps_list):
                         if not self.queue_processing:
                             break
                         
-                        # Update progress
-                        progress = ((juice_num - 1) * total_steps + step_idx + 1) / (order.quantity * total_steps) * 100
-                        self.after(0, lambda p=progress: self.progress_var.set(p))
-                        self.after(0, lambda p=progress: self.progress_text_var.set(f"Progress: {p:.0f}%"))
+                        done_steps = (juice_num - 1) * total_steps + step_idx + 1
+                        remaining_steps = order.quantity * total_steps - done_steps
+                        ui.update(progress=done_steps / (order.quantity * total_steps) * 100,
+                                  remaining=remaining_steps * avg_step_time)
                         
                         # Simulate execution with delay (replace with actual run_program later)
                         time.sleep(step.delay)
-                        
-                        # Estimate time remaining
-                        remaining_steps = (order.quantity - juice_num) * total_steps + (total_steps - step_idx - 1)
-                        avg_step_time = estimate_program_time(order.program) / total_steps
-                        remaining_time = remaining_steps * avg_step_time
-                        self.after(0, lambda t=remaining_time: 
-                                  self.time_remaining_var.set(f"Time Remaining: {format_time(t)}"))
                 
                 except Exception as e:
-                    self.after(0, lambda err=str(e): messagebox.showerror("Execution Error", err))
                     self.queue_processing = False
+                    ui.set("finished", str(e))
                     break
             
-            # Mark order as completed
+            # Completed orders go to the history ring; a stopped one goes back to the front
             if self.queue_processing:
-                order.status = "Completed"
-                self.after(0, self.refresh_queue_display)
-                self.after(0, self.update_total_queue_time)
+                self.order_queue.complete(order)
+            else:
+                self.order_queue.requeue(order)
+            ui.set("queue")
         
         # Reset progress
-        self.after(0, lambda: self.progress_var.set(0))
-        self.after(0, lambda: self.current_order_var.set("Current: None"))
+        ui.update(progress=0, current="Current: None")
+    
     # ---------- Speed Override Methods (Upgrade #4) ----------
     
     def set_speed_preset(self, percent):
@@ -798,38 +829,45 @@ class MainWindow(tk.Frame):
         if not self.program.steps:
             messagebox.showinfo("Debug", "Program empty")
             return
-        try:
-            self.step_executor = StepExecutor(self.program)
-            self.step_executor.speed_override = self.get_speed_multiplier()
-            self.step_executor.start()
-            self.debug_running = True
-            self.next_step_btn.config(state="normal")
-            self.stop_debug_btn.config(state="normal")
-            self.run_btn.config(state="disabled")
-            self.debug_step_var.set(f"0 / {len(self.program.steps)}")
-            self.highlight_tree_row(0)
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        self.step_executor = StepExecutor(self.program)
+        self.step_executor.speed_override = self.get_speed_multiplier()
+        self.run_btn.config(state="disabled")
+        self.execution.start_steps(self.step_executor, on_done=self._on_steps_started,
+                                   on_error=self._on_step_error)
+    
+    def _on_steps_started(self, _result=None):
+        self.debug_running = True
+        self.next_step_btn.config(state="normal")
+        self.stop_debug_btn.config(state="normal")
+        self.debug_step_var.set(f"0 / {len(self.program.steps)}")
+        self.highlight_tree_row(0)
     
     def execute_next_step(self):
         if not self.step_executor:
             return
-        try:
-            self.step_executor.speed_override = self.get_speed_multiplier()
-            result = self.step_executor.execute_next_step()
-            self.debug_step_var.set(f"{result['step_index'] + 1} / {result['total_steps']}")
-            self.debug_status_var.set(result['status'][:20])
-            self.highlight_tree_row(result['step_index'])
-            if result['completed']:
-                self.stop_debug_execution()
-                messagebox.showinfo("Done", "Complete!")
-            if result['error']:
-                messagebox.showerror("Error", result['error'])
-                self.stop_debug_execution()
-        except Exception as e:
-            messagebox.showerror("Error", str(e))
+        self.step_executor.speed_override = self.get_speed_multiplier()
+        self.next_step_btn.config(state="disabled")  # One step in flight at a time
+        self.execution.next_step(self.step_executor, on_done=self._on_step_result,
+                                 on_error=self._on_step_error)
+    
+    def _on_step_result(self, result):
+        if not self.debug_running:
+            return  # Stopped while the step was running
+        self.next_step_btn.config(state="normal")
+        self.debug_step_var.set(f"{result['step_index'] + 1} / {result['total_steps']}")
+        self.debug_status_var.set(result['status'][:20])
+        self.highlight_tree_row(result['step_index'])
+        if result['completed']:
+            self.stop_debug_execution()
+            messagebox.showinfo("Done", "Complete!")
+        if result['error']:
+            messagebox.showerror("Error", result['error'])
             self.stop_debug_execution()
     
+    def _on_step_error(self, error):
+        messagebox.showerror("Error", str(error))
+        self.stop_debug_execution()
+    
     def stop_debug_execution(self):
         if self.step_executor:
             self.step_executor.stop()
@@ -841,22 +879,23 @@ class MainWindow(tk.Frame):
         self.clear_tree_highlight()
     
     def highlight_tree_row(self, index):
-        self.clear_tree_highlight()
         if 0 <= index < len(self.program.steps):
             self.tree.selection_set(str(index))
             self.tree.see(str(index))
-            self.tree.item(str(index), tags=('current',))
-            self.tree.tag_configure('current', background='#3498db', foreground='white')
+            self.tree.set_current(index)
+        else:
+            self.clear_tree_highlight()
     
     def clear_tree_highlight(self):
-        for item in self.tree.get_children():
-            self.tree.item(item, tags=())
+        self.tree.set_current(None)
 
     # ---------- E-Stop Methods (Upgrade #2) ----------
     
     def check_estop_status(self):
         try:
-            result = check_emergency_stop()
+            result = get_telemetry().estop(max_age=STALE_AFTER)
+            if result is None:
+                result = {'is_pressed': None, 'status': 'No data', 'raw_response': ''}
             if result['is_pressed'] is None:
                 self.estop_icon.config(fg="orange")
                 self.estop_status_text.config(text="Unknown")
@@ -902,8 +941,9 @@ class MainWindow(tk.Frame):
         if not self.monitor_active:
             return
         try:
-            pos_data = query_position()
-            if pos_data['x'] is not None:
+            # Read the telemetry cache; the poller thread does the serial work
+            pos_data = get_telemetry().position(max_age=STALE_AFTER)
+            if pos_data is not None:
                 self.pos_x_var.set(f"{pos_data['x']:.1f}")
                 self.pos_y_var.set(f"{pos_data['y']:.1f}")
                 self.pos_z_var.set(f"{pos_data['z']:.1f}")
@@ -911,9 +951,9 @@ class MainWindow(tk.Frame):
                 self.pos_x_var.set("---")
                 self.pos_y_var.set("---")
                 self.pos_z_var.set("---")
-        except:
-            pass
-        self.monitor_job = self.after(500, self.update_position)
+        except Exception as e:
+            print(f"Position display error: {e}")
+        self.monitor_job = self.after(200, self.update_position)
     # ---------- Copy/Paste/Duplicate Methods (Upgrade #5) ----------
     
     def on_copy_step(self):
@@ -927,7 +967,8 @@ class MainWindow(tk.Frame):
         
         self.clipboard_step = Step(
             cmd=step.cmd, x=step.x, y=step.y, z=step.z,
-            f=step.f, delay=step.delay, do0=step.do0
+            f=step.f, delay=step.delay, do0=step.do0, dwell=step.dwell,
+            mandatory=step.mandatory, safe=step.safe
         )
         
         self.paste_btn.config(state="normal")
@@ -951,7 +992,8 @@ class MainWindow(tk.Frame):
             cmd=self.clipboard_step.cmd, x=self.clipboard_step.x, 
             y=self.clipboard_step.y, z=self.clipboard_step.z,
             f=self.clipboard_step.f, delay=self.clipboard_step.delay, 
-            do0=self.clipboard_step.do0
+            do0=self.clipboard_step.do0, dwell=self.clipboard_step.dwell,
+            mandatory=self.clipboard_step.mandatory, safe=self.clipboard_step.safe
         )
         
         sel = self.tree.selection()
@@ -978,7 +1020,8 @@ class MainWindow(tk.Frame):
         
         new_step = Step(
             cmd=step.cmd, x=step.x, y=step.y, z=step.z,
-            f=step.f, delay=step.delay, do0=step.do0
+            f=step.f, delay=step.delay, do0=step.do0, dwell=step.dwell,
+            mandatory=step.mandatory, safe=step.safe
         )
         
         self.program.steps.insert(index + 1, new_step)
@@ -1046,8 +1089,7 @@ class MainWindow(tk.Frame):
             self.status_var.set("No steps to select")
             return
         
-        all_items = self.tree.get_children()
-        self.tree.selection_set(all_items)
+        self.tree.select_all()
         
         self.status_var.set(f"✓ Selected all {len(self.program.steps)} steps")
     
@@ -1069,6 +1111,32 @@ class MainWindow(tk.Frame):
             self.status_var.set(f"✓ Cleared {count} steps")
         else:
             self.status_var.set("Cancelled")
+
+    def on_optimize_program(self):
+        """Show the optimiser's report; Apply replaces the steps in memory only (Save writes)."""
+        result = optimize_program(self.program)
+        if not result.changes:
+            messagebox.showinfo("Optimize", result.report())
+            return
+
+        win = tk.Toplevel(self.master)
+        win.title(f"Optimize {self.program.name}")
+        text = tk.Text(win, width=80, height=24, font=("Courier", 9))
+        text.insert("1.0", result.report())
+        text.config(state="disabled")
+        text.pack(fill="both", expand=True, padx=5, pady=5)
+
+        def apply():
+            self.program.steps = result.program.steps
+            self._refresh_tree()
+            self.status_var.set(f"✓ Optimized: {len(result.original.steps)} -> "
+                                f"{len(result.program.steps)} steps (not saved)")
+            win.destroy()
+
+        buttons = tk.Frame(win)
+        buttons.pack(pady=5)
+        ttk.Button(buttons, text="Apply", command=apply).pack(side="left", padx=5)
+        ttk.Button(buttons, text="Cancel", command=win.destroy).pack(side="left", padx=5)
     # ---------- Helper Methods ----------
 
     def _read_step_from_fields(self) -> Optional[Step]:
@@ -1089,17 +1157,16 @@ class MainWindow(tk.Frame):
                 f=float(self.f_var.get()) if self.f_var.get().strip() else 20.0,
                 delay=float(self.delay_var.get()) if self.delay_var.get().strip() else 0.5,
                 do0=parse_float(self.do0_var.get()),
+                mandatory=True if self.mandatory_var.get() else None,
+                safe=True if self.safe_var.get() else None,
             )
         except ValueError as e:
             messagebox.showerror("Invalid", str(e))
             return None
 
     def _refresh_tree(self):
-        for item in self.tree.get_children():
-            self.tree.delete(item)
-        for idx, s in enumerate(self.program.steps):
-            self.tree.insert("", "end", iid=str(idx),
-                values=(s.cmd, s.x, s.y, s.z, s.f, s.delay, s.do0))
+        # Diff against the rows on screen; only changed rows are touched
+        self.tree.refresh(self.program.steps)
         
         count = len(self.program.steps)
         self.step_count_label.config(text=f"Total: {count} step{'s' if count != 1 else ''}")
@@ -1132,6 +1199,8 @@ class MainWindow(tk.Frame):
         if not sel:
             messagebox.showinfo("Update", "Select step first")
             return
+        # The editor has no dwell field; keep the one authored in the JSON
+        step.dwell = self.program.steps[int(sel[0])].dwell
         self.program.steps[int(sel[0])] = step
         self._refresh_tree()
 
@@ -1153,6 +1222,8 @@ class MainWindow(tk.Frame):
         self.f_var.set(str(s.f))
         self.delay_var.set(str(s.delay))
         self.do0_var.set("" if s.do0 is None else str(s.do0))
+        self.mandatory_var.set(bool(s.mandatory))
+        self.safe_var.set(bool(s.safe))
 
     # ---------- Program Management Callbacks ----------
 
@@ -1199,28 +1270,38 @@ class MainWindow(tk.Frame):
             self.start_step_execution()
             return
         
-        estop_result = check_emergency_stop()
-        if estop_result['is_pressed'] is True:
-            messagebox.showerror("E-Stop", "Release E-stop first")
+        if self.execution.busy:
+            messagebox.showinfo("Run", "Robot is busy")
             return
         
-        try:
-            was_monitoring = self.monitor_active
-            if was_monitoring:
-                self.stop_monitor()
-            
-            speed_mult = self.get_speed_multiplier()
-            self.status_var.set(f"Running at {self.speed_override.get():.0f}%...")
-            self.master.update_idletasks()
-            
-            run_program(self.program, speed_mult)
-            self.status_var.set("Finished")
-            
-            if was_monitoring:
-                self.start_monitor()
-        except Exception as e:
-            messagebox.showerror("Run failed", str(e))
-            self.status_var.set("Error")
+        # Runs on the execution worker (E-stop check first); the window
+        # stays responsive and Stop stays clickable
+        self.run_btn.config(state="disabled")
+        self.stop_run_btn.config(state="normal")
+        self.status_var.set(f"Running at {self.speed_override.get():.0f}%...")
+        get_telemetry().poke()
+        # A snapshot: steps stay editable while the worker compiles and runs them
+        self.execution.run_program(copy.deepcopy(self.program), self.get_speed_multiplier(),
+                                   on_step=self.highlight_tree_row,
+                                   on_done=self._on_program_done,
+                                   on_error=self._on_program_error)
+    
+    def on_stop_program(self):
+        self.execution.cancel()
+        self.status_var.set("Stopping...")
+    
+    def _on_program_done(self, completed):
+        self.run_btn.config(state="normal")
+        self.stop_run_btn.config(state="disabled")
+        self.clear_tree_highlight()
+        self.status_var.set("Finished" if completed else "Stopped")
+    
+    def _on_program_error(self, error):
+        self.run_btn.config(state="normal")
+        self.stop_run_btn.config(state="disabled")
+        self.clear_tree_highlight()
+        self.status_var.set("Error")
+        messagebox.showerror("Run failed", str(error))
 
 
 def main(root=None):
@@ -1228,6 +1309,8 @@ def main(root=None):
         root = tk.Tk()
     app = MainWindow(root)
     root.mainloop()
+    app.execution.shutdown()
+    close_all_connections()
 
 
 if __name__ == "__main__":
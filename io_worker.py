@@ -0,0 +1,326 @@
+# io_worker.py
+#
+# Prioritised serial I/O: one worker thread drains stop, motion and telemetry
+# lanes in that order, so a stop press never queues behind position polls.
+
+import threading
+import time
+from collections import deque, OrderedDict
+from typing import Optional, Union, Dict
+
+from config import BAUD
+from serial_comm import (get_connection, read_reply, parse_reply_status, reply_timeout,
+                         Reply, ESTOP_QUERY, POSITION_QUERY)
+
+# Lanes, highest priority first
+STOP, MOTION, TELEMETRY = 0, 1, 2
+LANE_NAMES = {STOP: "stop", MOTION: "motion", TELEMETRY: "telemetry"}
+
+STOP_FRAME = "0xff0xfe0x020xfd0xfc"
+
+# Longest a reply wait blocks before the worker re-checks the stop lane
+READ_SLICE = 0.02
+
+# Telemetry older than this is dropped instead of sent (seconds)
+TELEMETRY_MAX_AGE = 1.0
+
+# Most telemetry requests kept waiting while the link is busy
+TELEMETRY_LIMIT = 4
+
+
+class IOJob:
+    """
+    One frame queued on the I/O worker.
+    Call wait() to block for its Reply (None if no reply was expected).
+    status: 'queued', 'sent', 'done', 'dropped' or 'failed'
+    """
+
+    def __init__(self, frame: Union[str, bytes], lane: int, expect_reply: bool, key: str = None):
+        self.frame = frame
+        self.lane = lane
+        self.expect_reply = expect_reply
+        self.key = key
+        self.status = "queued"
+        self.reply: Optional[Reply] = None
+        self.error: Optional[str] = None
+        self.submitted_at = time.perf_counter()
+        self.written_at: Optional[float] = None
+        self._done = threading.Event()
+
+    @property
+    def data(self) -> bytes:
+        return self.frame.encode("utf-8") if isinstance(self.frame, str) else self.frame
+
+    def finish(self, status: str, reply: Reply = None, error: str = None):
+        self.status = status
+        self.reply = reply
+        self.error = error
+        self._done.set()
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> Optional[Reply]:
+        self._done.wait(timeout)
+        return self.reply
+
+
+class SerialIOWorker:
+    """
+    Single thread that owns all traffic submitted to it for one port.
+
+    Each loop iteration takes the oldest job from the highest-priority
+    non-empty lane. While it waits for a reply it reads in READ_SLICE
+    chunks and writes any queued no-reply stop frame in between.
+
+    stop_now() does not queue at all: it writes the stop frame from the
+    calling thread with SerialConnection.write_urgent(), which skips the
+    connection lock that run_compiled / stream_frames / StepExecutor hold
+    while they talk to the port. The stop then waits at most for the one
+    frame being written (write_lock), and that wait is measured.
+
+    Telemetry is coalesced by key (a second position poll while one is
+    queued returns the queued job), limited to TELEMETRY_LIMIT entries and
+    dropped once older than TELEMETRY_MAX_AGE.
+    """
+
+    def __init__(self, port: str = None):
+        self.conn = get_connection(port)
+        self._cond = threading.Condition()
+        self._stop_lane = deque()
+        self._motion_lane = deque()
+        self._telemetry_lane = OrderedDict()  # key -> IOJob
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+        # Statistics
+        self.sent = {STOP: 0, MOTION: 0, TELEMETRY: 0}
+        self.dropped = 0
+        self.coalesced = 0
+        self.last_stop_latency: Optional[float] = None
+        self.max_stop_latency = 0.0
+        self.last_stop_lock_wait: Optional[float] = None   # Part spent waiting for write_lock
+        self.max_stop_lock_wait = 0.0
+        self.max_frame_bytes = 0
+
+    # ---------- Lifecycle ----------
+
+    def start(self) -> "SerialIOWorker":
+        with self._cond:
+            if self._running:
+                return self
+            self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"io-{self.conn.port}", daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self, timeout: float = 1.0) -> None:
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    # ---------- Submission ----------
+
+    def submit(self, frame: Union[str, bytes], lane: int = MOTION,
+               expect_reply: bool = True, key: str = None) -> IOJob:
+        """Queue a frame on a lane and return its IOJob."""
+        job = IOJob(frame, lane, expect_reply, key)
+        with self._cond:
+            if lane == STOP:
+                self._stop_lane.append(job)
+            elif lane == MOTION:
+                self._motion_lane.append(job)
+            else:
+                key = key or repr(frame)
+                queued = self._telemetry_lane.get(key)
+                if queued is not None:
+                    self.coalesced += 1
+                    return queued
+                if len(self._telemetry_lane) >= TELEMETRY_LIMIT:
+                    _, oldest = self._telemetry_lane.popitem(last=False)
+                    self._drop(oldest)
+                self._telemetry_lane[key] = job
+            self._cond.notify()
+        return job
+
+    def stop_now(self, flush_motion: bool = True) -> IOJob:
+        """
+        Write the manual stop frame now, from the calling thread, ahead of
+        everything queued and between the frames of any caller holding the
+        connection. Motion frames still waiting are dropped so nothing
+        queued here moves after the stop.
+        """
+        if flush_motion:
+            with self._cond:
+                while self._motion_lane:
+                    self._drop(self._motion_lane.popleft())
+        job = IOJob(STOP_FRAME, STOP, expect_reply=False)
+        try:
+            lock_wait = self.conn.write_urgent(job.data)
+        except Exception as e:
+            job.finish("failed", error=str(e))
+            print(f"Stop frame not sent on {self.conn.port}: {e}")
+            return job
+        job.written_at = time.perf_counter()
+        self.sent[STOP] += 1
+        self._record_stop(job, lock_wait)
+        job.finish("done")
+        return job
+
+    def estop_query(self) -> IOJob:
+        """Queue a G14 e-stop query on the stop lane."""
+        return self.submit(ESTOP_QUERY, STOP)
+
+    def position_query(self) -> IOJob:
+        """Queue a (coalesced) position poll on the telemetry lane."""
+        return self.submit(POSITION_QUERY, TELEMETRY, key="position")
+
+    # ---------- Statistics ----------
+
+    def stop_latency_bound(self) -> float:
+        """
+        Worst-case seconds from stop_now() to the stop frame on the wire: one
+        frame of any caller finishing under write_lock, then the stop frame.
+        A longer write_lock wait seen in practice (e.g. a driver blocking on
+        a full output buffer) raises the bound to what was measured.
+        """
+        byte_time = 10.0 / BAUD  # 8N1: start + 8 data + stop bits
+        longest = max(self.max_frame_bytes, self.conn.max_write_bytes)
+        lock_wait = max(longest * byte_time, self.max_stop_lock_wait)
+        return lock_wait + len(STOP_FRAME) * byte_time
+
+    def stats(self) -> dict:
+        """
+        Returns: {
+            'sent': dict,                 # Frames written per lane name
+            'dropped': int,               # Stale telemetry or flushed motion
+            'coalesced': int,             # Telemetry merged into a queued job
+            'queued': dict,               # Jobs waiting per lane name
+            'last_stop_latency': float,   # Seconds, most recent stop (incl. lock wait)
+            'max_stop_latency': float,    # Seconds, worst observed
+            'last_stop_lock_wait': float, # Seconds of that spent waiting for write_lock
+            'max_stop_lock_wait': float,  # Seconds, worst observed
+            'stop_latency_bound': float   # Seconds, worst case by construction
+        }
+        """
+        with self._cond:
+            queued = {"stop": len(self._stop_lane), "motion": len(self._motion_lane),
+                      "telemetry": len(self._telemetry_lane)}
+        return {
+            'sent': {LANE_NAMES[lane]: n for lane, n in self.sent.items()},
+            'dropped': self.dropped,
+            'coalesced': self.coalesced,
+            'queued': queued,
+            'last_stop_latency': self.last_stop_latency,
+            'max_stop_latency': self.max_stop_latency,
+            'last_stop_lock_wait': self.last_stop_lock_wait,
+            'max_stop_lock_wait': self.max_stop_lock_wait,
+            'stop_latency_bound': self.stop_latency_bound(),
+        }
+
+    # ---------- Worker ----------
+
+    def _drop(self, job: IOJob) -> None:
+        self.dropped += 1
+        job.finish("dropped")
+
+    def _next_job(self) -> Optional[IOJob]:
+        """Pop the next job by priority (caller holds self._cond)."""
+        if self._stop_lane:
+            return self._stop_lane.popleft()
+        if self._motion_lane:
+            return self._motion_lane.popleft()
+        now = time.perf_counter()
+        while self._telemetry_lane:
+            _, job = self._telemetry_lane.popitem(last=False)
+            if now - job.submitted_at <= TELEMETRY_MAX_AGE:
+                return job
+            self._drop(job)
+        return None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None and self._running:
+                    self._cond.wait()
+                    job = self._next_job()
+                if not self._running:
+                    if job is not None:
+                        job.finish("failed", error="Worker shut down")
+                    break
+            try:
+                with self.conn as ser:
+                    self._execute(ser, job)
+            except Exception as e:
+                job.finish("failed", error=str(e))
+                print(f"I/O worker error on {self.conn.port}: {e}")
+
+    def _write(self, ser, job: IOJob) -> None:
+        data = job.data
+        ser.write(data)
+        job.written_at = time.perf_counter()
+        job.status = "sent"
+        self.sent[job.lane] += 1
+        self.max_frame_bytes = max(self.max_frame_bytes, len(data))
+        if job.lane == STOP and job.frame == STOP_FRAME:
+            self._record_stop(job, 0.0)
+
+    def _record_stop(self, job: IOJob, lock_wait: float) -> None:
+        latency = job.written_at - job.submitted_at
+        self.last_stop_latency = latency
+        self.max_stop_latency = max(self.max_stop_latency, latency)
+        self.last_stop_lock_wait = lock_wait
+        self.max_stop_lock_wait = max(self.max_stop_lock_wait, lock_wait)
+
+    def _write_pending_stops(self, ser) -> None:
+        """Write queued stop frames that expect no reply (called mid reply-wait)."""
+        while True:
+            with self._cond:
+                if not self._stop_lane or self._stop_lane[0].expect_reply:
+                    return
+                job = self._stop_lane.popleft()
+            self._write(ser, job)
+            job.finish("done")
+
+    def _execute(self, ser, job: IOJob) -> None:
+        if job.expect_reply:
+            ser.reset_input_buffer()
+        self._write(ser, job)
+        if not job.expect_reply:
+            job.finish("done")
+            return
+
+        label = job.frame if isinstance(job.frame, str) else "0xff"
+        deadline = job.written_at + reply_timeout(label)
+        raw = b""
+        status = None
+        while status is None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                status = "timeout"
+                break
+            chunk, status = read_reply(ser, min(READ_SLICE, remaining))
+            raw += chunk
+            if status == "timeout":
+                status = parse_reply_status(raw)  # None unless a line completed
+                self._write_pending_stops(ser)
+        job.finish("done", Reply(raw=raw, status=status,
+                                 rtt=time.perf_counter() - job.written_at))
+
+
+_workers: Dict[str, SerialIOWorker] = {}
+_workers_lock = threading.Lock()
+
+
+def get_io_worker(port: str = None) -> SerialIOWorker:
+    """Return the running I/O worker for a port, starting it on first use."""
+    conn = get_connection(port)
+    with _workers_lock:
+        worker = _workers.get(conn.port)
+        if worker is None:
+            worker = SerialIOWorker(conn.port).start()
+            _workers[conn.port] = worker
+        return worker
@@ -5,7 +5,8 @@ Jog Control Window for Manual Robot Movement
 import tkinter as tk
 from tkinter import ttk, messagebox
 from config import *
-from serial_comm import send_command, query_position, check_estop
+from serial_comm import send_command, check_estop
+from telemetry import get_telemetry, STALE_AFTER
 from config import *
 import time
 from steps import MoveStep
@@ -62,8 +63,8 @@ class JogControlWindow(tk.Toplevel):
         # Keyboard
         self.bind("<KeyPress>", self.on_key_press)
         
-        # Start monitoring
-        # self.start_position_monitor()
+        # Start monitoring (reads the telemetry cache, cheap)
+        self.start_position_monitor()
                                   
         
         # Close handler
@@ -387,14 +388,15 @@ class JogControlWindow(tk.Toplevel):
             return
         
         try:
-            pos = query_position()
-            if pos['x'] is not None:
+            # Shared telemetry cache - no serial traffic from the Tk thread
+            pos = get_telemetry().position(max_age=STALE_AFTER)
+            if pos is not None:
                 self.current_pos = pos
                 self.update_position_display()
-        except:
-            pass
+        except Exception as e:
+            print(f"Position display error: {e}")
         
-        self.monitor_job = self.after(500, self.update_position_loop)
+        self.monitor_job = self.after(200, self.update_position_loop)
     
     def update_position_display(self):
         """Update position labels."""
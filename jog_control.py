@@ -5,7 +5,9 @@ Jog Control Window for Manual Robot Movement
 import tkinter as tk
 from tkinter import ttk, messagebox
 from config import *
-from serial_comm import query_position, check_estop
+from serial_comm import check_estop
+from io_worker import get_io_worker, MOTION
+from telemetry import get_telemetry, STALE_AFTER
 from config import *
 import time
 import threading
@@ -69,8 +71,8 @@ class JogControlWindow(tk.Toplevel):
         # Keyboard
         self.bind("<KeyPress>", self.on_key_press)
         
-        # Start monitoring
-        # self.start_position_monitor()
+        # Start monitoring (reads the telemetry cache, cheap)
+        self.start_position_monitor()
                                   
         
         # Close handler
@@ -296,64 +298,39 @@ class JogControlWindow(tk.Toplevel):
         self.speed_label.config(text=str(speed))
     
     def send_protocol(self, cmd: str, show_errors=True):
-        """Send protocol command to serial port with error handling."""
-        import time
+        """Send protocol command over the shared serial connection with error handling."""
+        from serial_comm import get_connection, list_available_ports
+        import serial
         
         max_retries = 3
         retry_delay = 0.01  # 10ms between retries
+        conn = get_connection()
         
         for attempt in range(max_retries):
             try:
-                from serial_comm import open_port, list_available_ports
-                
-                ser = open_port()
-                if ser is None or not ser.is_open:
-                    if show_errors and attempt == max_retries - 1:
-                        messagebox.showerror(
-                            "Serial Error",
-                            "Failed to open serial port.\n\n"
-                            "Troubleshooting:\n"
-                            "1. Check if robot is connected via USB\n"
-                            "2. Close any other applications using the port\n"
-                            "3. Check Device Manager for COM port\n"
-                            "4. Update/reinstall USB drivers"
-                        )
-                    return None
-                
-                ser.write(cmd.encode('utf-8'))
-                time.sleep(0.01)  # Short wait for response
-                response = ser.read(100) if ser.in_waiting > 0 else None
-                ser.close()
+                with conn as ser:
+                    ser.write(cmd.encode('utf-8'))
+                    time.sleep(0.01)  # Short wait for response
+                    response = ser.read(100) if ser.in_waiting > 0 else None
                 return response
             
-            except PermissionError as e:
-                # Port temporarily locked - retry silently
+            except serial.SerialException as e:
+                # Port temporarily unavailable - the connection reconnects on retry
                 if attempt < max_retries - 1:
                     time.sleep(retry_delay)
                     continue
-                else:
-                    # Only show error on final retry if enabled
-                    if show_errors:
-                        messagebox.showerror(
-                            "Port Access Denied",
-                            f"Cannot access COM3 - Port is in use.\n\n"
-                            f"Solution:\n"
-                            f"• Close Serial Monitor in Arduino IDE\n"
-                            f"• Close other terminal applications\n"
-                            f"• Restart the application"
-                        )
-                    return None
-            
-            except FileNotFoundError:
-                available = list_available_ports()
-                if show_errors and attempt == max_retries - 1:
+                
+                # Only show error on final retry if enabled
+                if show_errors:
+                    available = list_available_ports()
                     messagebox.showerror(
-                        "Port Not Found",
-                        f"COM3 not found.\n\n"
+                        "Serial Error",
+                        f"Cannot talk to {conn.port}.\n\n"
+                        f"{e}\n\n"
                         f"Available ports: {available if available else 'None'}\n\n"
                         f"Check:\n"
                         f"• USB cable connection\n"
-                        f"• Device Manager\n"
+                        f"• Close Serial Monitor / other terminal applications\n"
                         f"• Run diagnose_serial.py"
                     )
                 return None
@@ -377,6 +354,7 @@ class JogControlWindow(tk.Toplevel):
         self.is_moving = True
         self.move_axis = axis
         self.move_direction = direction
+        get_telemetry().poke()  # Fast position updates while jogging
         
         # Start continuous movement in a separate thread
         self.move_thread = threading.Thread(target=self.continuous_move_loop, daemon=True)
@@ -390,11 +368,11 @@ class JogControlWindow(tk.Toplevel):
         """Stop all movement."""
         self.is_moving = False
         
-        # Send stop command to robot
+        # Send stop command to robot on the I/O worker's stop lane
         try:
-            self.send_protocol("0xff0xfe0x020xfd0xfc")  # Stop command
-        except:
-            pass
+            get_io_worker().stop_now()
+        except Exception as e:
+            print(f"Stop error: {e}")
         
         # Wait for thread to finish
         if self.move_thread and self.move_thread.is_alive():
@@ -420,10 +398,13 @@ class JogControlWindow(tk.Toplevel):
             cmd = cmd_map[(self.move_axis, self.move_direction)]
             print(f"🎮 Continuous jog {self.move_axis}{self.move_direction} F{f_value}")
             
-            # Send movement command repeatedly while button is held
-            # Use show_errors=False to suppress error dialogs during rapid sends
+            # Send movement command repeatedly while button is held.
+            # Skip a tick if the previous frame is still queued so jogs never pile up.
+            worker = get_io_worker()
+            job = None
             while self.is_moving:
-                self.send_protocol(cmd, show_errors=False)
+                if job is None or job.done():
+                    job = worker.submit(cmd, MOTION, expect_reply=False)
                 time.sleep(0.05)  # Update every 50ms for smooth movement
         
         except Exception as e:
@@ -537,14 +518,15 @@ class JogControlWindow(tk.Toplevel):
             return
         
         try:
-            pos = query_position()
-            if pos['x'] is not None:
+            # Shared telemetry cache - no serial traffic from the Tk thread
+            pos = get_telemetry().position(max_age=STALE_AFTER)
+            if pos is not None:
                 self.current_pos = pos
                 self.update_position_display()
-        except:
-            pass
+        except Exception as e:
+            print(f"Position display error: {e}")
         
-        self.monitor_job = self.after(500, self.update_position_loop)
+        self.monitor_job = self.after(200, self.update_position_loop)
     
     def update_position_display(self):
         """Update position labels."""
@@ -0,0 +1,27 @@
+# kinematics.py
+#
+# Motion model shared by the emulator and the program time estimator:
+# straight-line segments with a trapezoidal (accelerate / cruise / brake) profile.
+
+import math
+
+from config import FEED_MM_PER_S, ACCEL_MM_PER_S2
+
+
+def feed_speed(f: float, speed_override: float = 1.0) -> float:
+    """Cruise speed in mm/s for a step's F at a speed override (clamped like build_move)."""
+    effective = max(1, min(500, int(f * speed_override)))
+    return effective * FEED_MM_PER_S
+
+
+def move_duration(distance: float, speed: float, cmd: str = "G01") -> float:
+    """
+    Seconds to travel distance (mm) from rest to rest at cruise speed (mm/s).
+    Short moves never reach cruise speed and follow a triangular profile.
+    """
+    if distance <= 0 or speed <= 0:
+        return 0.0
+    accel = ACCEL_MM_PER_S2.get(cmd, ACCEL_MM_PER_S2["G01"])
+    if distance >= speed * speed / accel:
+        return distance / speed + speed / accel
+    return 2.0 * math.sqrt(distance / accel)
@@ -16,6 +16,9 @@ class Step:
     - f: feedrate in mm/min
     - delay: seconds to wait after this step
     - do0: 4th axis angle (gripper servo, 0-180 degrees)
+    - dwell: minimum seconds to hold after arriving (arrival wait mode, e.g. pours)
+    - mandatory: safety waypoint the sequence planner must never skip
+    - safe: segment is clear of obstacles, so the optimiser may make it a rapid (G00)
     """
     cmd: str = "G01"
     x: Optional[float] = None
@@ -24,6 +27,9 @@ class Step:
     f: float = 20.0
     delay: float = 0.5
     do0: Optional[float] = None
+    dwell: Optional[float] = None
+    mandatory: Optional[bool] = None
+    safe: Optional[bool] = None
 
     def to_dict(self):
         return {k: v for k, v in asdict(self).items() if v is not None or k in ("x", "y", "z", "do0")}
@@ -49,10 +55,13 @@ class Program:
             json.dump(self.to_dict(), f, indent=2)
 
     @classmethod
-    def load(cls, path: str):
-        with open(path, "r", encoding="utf-8") as f:
-            data = json.load(f)
+    def from_dict(cls, data: dict):
         prog = cls(name=data.get("name", "unnamed"))
         for step_dict in data.get("steps", []):
             prog.steps.append(Step(**step_dict))
         return prog
+
+    @classmethod
+    def load(cls, path: str):
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
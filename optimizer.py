@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Peephole optimiser for taught programs.
+
+One pass over a Program that keeps what the arm does and drops what it
+repeats:
+  - gripper re-sends (DO0 already at that angle) are cleared
+  - moves to where the arm already is (zero-length / duplicate poses) lose
+    their axes and become pure waits (that, like the move, hold only their
+    dwell in arrival mode)
+  - consecutive pure waits fold into one step; empty ones are removed
+  - G01 becomes G00 on steps tagged "safe": true
+Mandatory steps are never changed. The input Program is not modified.
+
+    python optimizer.py "programs/gripper test.json"             # report only
+    python optimizer.py programs/juices/mango.json -o mango.json  # save a copy
+    python optimizer.py programs/juices/mango.json --write        # overwrite
+"""
+
+import argparse
+import copy
+import difflib
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple
+
+from estimator import estimate_program
+from models import Program, Step
+
+
+@dataclass
+class Change:
+    """One rewrite; steps are 1-based numbers in the original program."""
+    kind: str           # 'gripper' | 'zero-move' | 'fold' | 'remove' | 'rapid'
+    steps: Tuple[int, ...]
+    detail: str
+
+    def __str__(self):
+        where = (f"step {self.steps[0]}" if len(self.steps) == 1
+                 else f"steps {self.steps[0]}-{self.steps[-1]}")
+        return f"{where}: {self.detail}"
+
+
+@dataclass
+class OptimizeResult:
+    original: Program
+    program: Program
+    changes: List[Change] = field(default_factory=list)
+    saved_seconds: float = 0.0      # Model estimate, original minus optimised
+
+    def diff(self) -> List[str]:
+        """Unified diff of the step rows."""
+        return list(difflib.unified_diff(
+            [format_step(s) for s in self.original.steps],
+            [format_step(s) for s in self.program.steps],
+            fromfile=f"{self.original.name} (original)",
+            tofile=f"{self.program.name} (optimised)", lineterm=""))
+
+    def report(self) -> str:
+        if not self.changes:
+            return f"{self.original.name}: nothing to optimise ({len(self.original.steps)} steps)"
+        lines = [f"{self.original.name}: {len(self.original.steps)} -> "
+                 f"{len(self.program.steps)} steps, ~{self.saved_seconds:.1f}s faster"]
+        lines += [f"  {c}" for c in self.changes]
+        lines += [""] + self.diff()
+        return "\n".join(lines)
+
+
+def format_step(step: Step) -> str:
+    words = [step.cmd]
+    for name in ("x", "y", "z"):
+        value = getattr(step, name)
+        if value is not None:
+            words.append(f"{name.upper()}{value:g}")
+    words.append(f"F{step.f:g}")
+    if step.do0 is not None:
+        words.append(f"DO0={step.do0:g}")
+    words.append(f"delay={step.delay:g}")
+    if step.dwell is not None:
+        words.append(f"dwell={step.dwell:g}")
+    if step.mandatory:
+        words.append("mandatory")
+    if step.safe:
+        words.append("safe")
+    return " ".join(words)
+
+
+def _is_wait(step: Step) -> bool:
+    """A step that only waits (no move, no gripper)."""
+    return (step.x is None and step.y is None and step.z is None and step.do0 is None
+            and not step.mandatory)
+
+
+def _arrival_wait(step: Step) -> float:
+    """What a pure wait holds in arrival mode (see finish_step)."""
+    return step.dwell if step.dwell is not None else step.delay
+
+
+def optimize_program(prog: Program) -> OptimizeResult:
+    """Return an optimised copy of prog and the list of changes made."""
+    result = OptimizeResult(original=prog, program=Program(name=prog.name))
+    out = result.program.steps
+    origins: List[Tuple[int, ...]] = []         # Original step numbers behind each out step
+    pose: List[Optional[float]] = [None, None, None]
+    gripper: Optional[float] = None
+
+    for number, original in enumerate(prog.steps, start=1):
+        step = copy.copy(original)
+        target = [p if v is None else v for v, p in zip((step.x, step.y, step.z), pose)]
+
+        if not step.mandatory:
+            if step.do0 is not None and step.do0 == gripper:
+                result.changes.append(Change("gripper", (number,), f"gripper re-send DO0={step.do0:g}"))
+                step.do0 = None
+            moves = any(v is not None for v in (step.x, step.y, step.z))
+            if moves and None not in pose and target == pose:
+                result.changes.append(Change("zero-move", (number,), "move to the current pose"))
+                step.x = step.y = step.z = None
+                step.dwell = step.dwell or 0.0  # Arrival mode: was at once on target, then the dwell
+            if step.cmd == "G01" and step.safe and any(v is not None for v in (step.x, step.y, step.z)):
+                result.changes.append(Change("rapid", (number,), "G01 -> G00 (safe segment)"))
+                step.cmd = "G00"
+
+        if step.do0 is not None:
+            gripper = step.do0
+        pose = target
+
+        if _is_wait(step) and out and _is_wait(out[-1]):
+            previous = out[-1]
+            result.changes.append(Change("fold", origins[-1] + (number,),
+                                         f"waits {previous.delay:g}+{step.delay:g}s folded"))
+            if step.dwell is not None or previous.dwell is not None:
+                previous.dwell = _arrival_wait(previous) + _arrival_wait(step)
+            previous.delay += step.delay
+            origins[-1] += (number,)
+            continue
+        out.append(step)
+        origins.append((number,))
+
+    # Waits of nothing at all
+    for index in reversed(range(len(out))):
+        step = out[index]
+        if _is_wait(step) and step.delay <= 0 and not step.dwell:
+            result.changes.append(Change("remove", origins[index], "empty step removed"))
+            del out[index]
+
+    if result.changes:
+        result.saved_seconds = max(0.0, estimate_program(prog) - estimate_program(result.program))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Peephole optimiser for taught programs")
+    parser.add_argument("program", help="Program JSON file")
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("-o", "--output", help="Save the optimised program here")
+    target.add_argument("--write", action="store_true", help="Overwrite the input file")
+    args = parser.parse_args()
+
+    result = optimize_program(Program.load(args.program))
+    print(result.report())
+    path = args.program if args.write else args.output
+    if path and result.changes:
+        result.program.save(path)
+        print(f"\nSaved: {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,219 @@
+# order_client.py
+#
+# Thin-client side of order_server.py. RemoteOrderQueue and RemoteRobot offer
+# the parts of OrderQueue / RobotWorker the kiosk screens use, backed by the
+# server's HTTP API and its event stream, so app.py runs unchanged against a
+# shared headless robot.
+
+import json
+import threading
+import time
+import urllib.error
+import urllib.request
+from typing import Callable, List, Optional, Tuple
+
+from order_queue import Order
+
+# Seconds per HTTP request before the server counts as unreachable
+REQUEST_TIMEOUT = 3.0
+
+# Seconds between reconnect attempts of the event stream
+RECONNECT_DELAY = 2.0
+
+
+class OrderServerError(Exception):
+    """The order server refused a request or could not be reached."""
+
+
+class OrderClient:
+    """JSON requests against an order server base URL."""
+
+    def __init__(self, url: str, timeout: float = REQUEST_TIMEOUT):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method: str, path: str, body: dict = None):
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self.url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+                return json.loads(resp.read() or b"null")
+        except urllib.error.HTTPError as e:
+            try:
+                message = json.loads(e.read()).get('error', e.reason)
+            except ValueError:
+                message = e.reason
+            raise OrderServerError(f"{method} {path}: {message}") from None
+        except (urllib.error.URLError, OSError) as e:
+            raise OrderServerError(f"Order server {self.url} unreachable: {e}") from None
+
+    def events(self, stop: threading.Event):
+        """Yield event dicts from /events until stop is set or the stream ends."""
+        with urllib.request.urlopen(self.url + "/events", timeout=self.timeout + 2) as resp:
+            for raw in resp:
+                if stop.is_set():
+                    return
+                line = raw.decode("utf-8").rstrip("\r\n")
+                if line.startswith("data: "):
+                    yield json.loads(line[6:])
+
+
+class RemoteOrderQueue:
+    """OrderQueue calls the kiosk makes, sent to the server."""
+
+    def __init__(self, client: OrderClient, robot: "RemoteRobot"):
+        self.client = client
+        self.robot = robot
+
+    def add_order(self, flavor: str, quantity: int, program=None) -> Order:
+        if program is not None:
+            raise OrderServerError("Custom programs cannot be sent to the order server")
+        return Order.from_dict(self.client.request("POST", "/orders",
+                                                   {'flavor': flavor, 'quantity': quantity}))
+
+    @property
+    def orders(self) -> List[Order]:
+        snapshot = self.client.request("GET", "/queue")
+        self.robot._update_status(snapshot)
+        return [Order.from_dict(o) for o in snapshot['orders']]
+
+    def get_order(self, order_id: int) -> Optional[Order]:
+        try:
+            return Order.from_dict(self.client.request("GET", f"/orders/{order_id}"))
+        except OrderServerError:
+            return None
+
+    def get_pending_count(self) -> int:
+        return self.robot.status.get('pending', 0)
+
+    def clear_pending(self) -> int:
+        return self.client.request("DELETE", "/queue")['cleared']
+
+
+class RemoteRobot:
+    """
+    RobotWorker stand-in: state comes from the server's status events and
+    worker events are passed to listeners (on the stream thread) in the same
+    {'event', 'order', 'drink', 'error'} form as RobotWorker's.
+    """
+
+    def __init__(self, client: OrderClient):
+        self.client = client
+        self.status: dict = {}
+        self._status_at = 0.0
+        self._listeners: List[Callable[[dict], None]] = []
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._refreshing = threading.Lock()
+
+    def connect(self) -> "RemoteRobot":
+        """Start following the server's event stream."""
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._follow, name="order-events", daemon=True)
+            self._thread.start()
+        return self
+
+    # ---------- RobotWorker interface ----------
+
+    def start(self) -> "RemoteRobot":
+        self._update_status(self.client.request("POST", "/robot/start"))
+        return self
+
+    def pause(self) -> None:
+        self._update_status(self.client.request("POST", "/robot/pause"))
+
+    def stop(self, timeout: float = 1.0) -> None:
+        """Stop following the server (the server's robot keeps running)."""
+        self._stop.set()
+
+    @property
+    def running(self) -> bool:
+        return self._fresh().get('running', False)
+
+    @property
+    def busy(self) -> bool:
+        return self._fresh().get('busy', False)
+
+    def current_remaining(self, per_drink: float = None) -> float:
+        status = self._fresh()
+        left = status.get('current_remaining', 0.0)
+        # Count down between status events, like RobotWorker does
+        return max(0.0, left - (time.monotonic() - self._status_at)) if status.get('busy') else 0.0
+
+    def eta_range(self) -> Tuple[float, float]:
+        status = self._fresh()
+        return status.get('eta_p50', 0.0), status.get('eta_p90', 0.0)
+
+    def eta(self) -> float:
+        return self.eta_range()[0]
+
+    def progress(self) -> float:
+        return self._fresh().get('progress', 0.0)
+
+    def add_listener(self, listener: Callable[[dict], None]) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[dict], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    # ---------- Internals ----------
+
+    def _update_status(self, status: dict) -> None:
+        self.status = {k: v for k, v in status.items() if k != 'orders'}
+        self._status_at = time.monotonic()
+
+    def _fresh(self) -> dict:
+        """
+        Latest status, without blocking (kiosks read it on the Tk thread): if
+        the event stream has gone quiet, a fetch is started in the background.
+        """
+        if (time.monotonic() - self._status_at > 2 * RECONNECT_DELAY
+                and self._refreshing.acquire(blocking=False)):
+            threading.Thread(target=self._refresh, name="order-status", daemon=True).start()
+        return self.status
+
+    def _refresh(self) -> None:
+        try:
+            self.orders_snapshot()
+        except OrderServerError as e:
+            print(e)
+            self._status_at = time.monotonic()  # Do not retry on every call
+        finally:
+            self._refreshing.release()
+
+    def orders_snapshot(self) -> dict:
+        snapshot = self.client.request("GET", "/queue")
+        self._update_status(snapshot)
+        return snapshot
+
+    def _follow(self) -> None:
+        while not self._stop.is_set():
+            try:
+                for event in self.client.events(self._stop):
+                    self._update_status(event.pop('status', self.status))
+                    if event['event'] == 'status':
+                        continue  # Heartbeat: only refreshes the numbers above
+                    if event['event'] in ('order_added', 'queue_cleared', 'running', 'paused'):
+                        event = {'event': 'queue', 'order': None, 'drink': 0, 'error': None}
+                    else:
+                        order = event.get('order')
+                        event['order'] = Order.from_dict(order) if order else None
+                    for listener in list(self._listeners):
+                        try:
+                            listener(event)
+                        except Exception as e:
+                            print(f"Remote listener error: {e}")
+            except (OSError, ValueError) as e:
+                if not self._stop.is_set():
+                    print(f"Order server event stream lost ({e}); reconnecting")
+            self._stop.wait(RECONNECT_DELAY)
+
+
+def connect(url: str) -> Tuple[RemoteOrderQueue, RemoteRobot]:
+    """(queue, robot) pair for a kiosk backed by the order server at url."""
+    client = OrderClient(url)
+    robot = RemoteRobot(client)
+    robot.orders_snapshot()  # Fail early if the server is not up
+    return RemoteOrderQueue(client, robot), robot.connect()
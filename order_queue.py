@@ -1,10 +1,20 @@
 # order_queue.py
 # Order Queue Management for Juice Kiosk
 
+import threading
+import time
+from collections import deque
+from itertools import islice
 from dataclasses import dataclass
-from typing import List, Optional
+from typing import Callable, Deque, Dict, List, Optional, Tuple, Union
 from models import Program
-import time
+from estimator import program_eta
+from scheduling import SchedulingPolicy, FIFO
+
+PENDING, PROCESSING, COMPLETED, FAILED = "Pending", "Processing", "Completed", "Failed"
+
+# Completed orders kept for display; older ones fall off the ring
+HISTORY_SIZE = 50
 
 
 @dataclass
@@ -13,91 +23,239 @@ class Order:
     order_id: int
     flavor: str
     quantity: int
-    program: Program
-    status: str = "Pending"  # Pending, Processing, Completed
+    program: Optional[Program] = None  # None: built from the flavor when made (kiosk)
+    status: str = PENDING  # Pending, Processing, Completed, Failed
+    estimate: float = 0.0  # Seconds for the whole order (OrderQueue estimate hook)
+    variance: float = 0.0  # Spread of that estimate (seconds^2, 0 = unknown)
+    error: Optional[str] = None
+    skips: int = 0         # Later orders taken before this one (scheduling policy)
     
     def __str__(self):
         return f"#{self.order_id} {self.flavor} x{self.quantity}"
 
+    def to_dict(self) -> dict:
+        """JSON-ready fields (the attached Program is left out)."""
+        return {'id': self.order_id, 'flavor': self.flavor, 'quantity': self.quantity,
+                'status': self.status, 'estimate': self.estimate, 'variance': self.variance,
+                'error': self.error, 'skips': self.skips}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Order":
+        return cls(order_id=data['id'], flavor=data['flavor'], quantity=data['quantity'],
+                   status=data.get('status', PENDING), estimate=data.get('estimate', 0.0),
+                   variance=data.get('variance', 0.0), error=data.get('error'),
+                   skips=data.get('skips', 0))
+
 
 class OrderQueue:
-    """Manages FIFO order queue."""
+    """
+    Thread-safe order queue (producer UI, consumer worker).
+
+    Pending orders live in a deque, active orders (pending + processing) in
+    an id -> order dict, and counts are kept up to date on every change, so
+    every operation is O(1). Completed orders move to a bounded history ring.
+    Status changes go through take_next() / complete() / fail() / requeue().
+
+    estimate(order) -> seconds, or (seconds, variance), is called once per
+    order on add; the sums over pending orders are kept in pending_seconds
+    and pending_variance for O(1) queue ETAs.
+
+    policy (scheduling.py, default FIFO) picks which pending order is taken
+    next; FIFO takes the head in O(1), other policies scan the pending deque.
+    """
     
-    def __init__(self):
-        self.orders: List[Order] = []
+    def __init__(self, history_size: int = HISTORY_SIZE,
+                 estimate: Callable[[Order], Union[float, Tuple[float, float]]] = None,
+                 policy: SchedulingPolicy = None):
+        self._lock = threading.RLock()
+        self._changed = threading.Condition(self._lock)
+        self._pending: Deque[Order] = deque()
+        self._active: Dict[int, Order] = {}
+        self._processing: Dict[int, Order] = {}
+        self.history: Deque[Order] = deque(maxlen=history_size)
         self.next_id = 1
+        self.estimate = estimate
+        self.policy = policy or FIFO()
+        self.last_flavor: Optional[str] = None  # Flavour of the order taken last
+        self.pending_drinks = 0     # Sum of quantities still pending
+        self.pending_seconds = 0.0  # Sum of estimates still pending
+        self.pending_variance = 0.0  # Sum of their variances
+        self.completed_count = 0    # Orders completed since start (not capped)
         self.is_processing = False
-        
-    def add_order(self, flavor: str, quantity: int, program: Program) -> Order:
+    
+    @property
+    def orders(self) -> List[Order]:
+        """Snapshot for display: recent completed, processing, then pending in serving order."""
+        with self._lock:
+            return (list(self.history) + list(self._processing.values())
+                    + self.policy.plan(self._pending, self.last_flavor))
+    
+    def add_order(self, flavor: str, quantity: int, program: Program = None) -> Order:
         """Add new order to queue."""
-        order = Order(
-            order_id=self.next_id,
-            flavor=flavor,
-            quantity=quantity,
-            program=program
-        )
-        self.orders.append(order)
-        self.next_id += 1
-        return order
+        order = Order(order_id=0, flavor=flavor, quantity=quantity, program=program)
+        if self.estimate is not None:
+            estimate = self.estimate(order)  # Outside the lock: may load programs
+            if isinstance(estimate, tuple):
+                order.estimate, order.variance = estimate
+            else:
+                order.estimate = estimate
+        with self._lock:
+            order.order_id = self.next_id
+            self.next_id += 1
+            self._pending.append(order)
+            self._active[order.order_id] = order
+            self._add_pending_totals(order, 1)
+            self._changed.notify_all()
+            return order
+    
+    def get_order(self, order_id: int) -> Optional[Order]:
+        """Active order by id (None once completed or cleared)."""
+        with self._lock:
+            return self._active.get(order_id)
+    
+    def find_order(self, order_id: int) -> Optional[Order]:
+        """Active order by id, else a finished one still in the history ring."""
+        with self._lock:
+            order = self._active.get(order_id)
+            if order is None:
+                order = next((o for o in self.history if o.order_id == order_id), None)
+            return order
     
     def get_current_order(self) -> Optional[Order]:
         """Get the order currently being processed."""
-        for order in self.orders:
-            if order.status == "Processing":
-                return order
-        return None
+        with self._lock:
+            return next(iter(self._processing.values()), None)
     
     def get_next_pending(self) -> Optional[Order]:
-        """Get next pending order (FIFO)."""
-        for order in self.orders:
-            if order.status == "Pending":
-                return order
-        return None
+        """Peek at the order the policy would take next, without taking it."""
+        with self._lock:
+            if not self._pending:
+                return None
+            return self._pending[self.policy.select(self._pending, self.last_flavor)]
+    
+    def take_next(self) -> Optional[Order]:
+        """Take the policy's next pending order and mark it Processing (None if empty)."""
+        with self._lock:
+            if not self._pending:
+                return None
+            index = self.policy.select(self._pending, self.last_flavor)
+            if index == 0:
+                order = self._pending.popleft()
+            else:
+                order = self._pending[index]
+                del self._pending[index]
+                for ahead in islice(self._pending, index):
+                    ahead.skips += 1
+            self.last_flavor = order.flavor
+            self._add_pending_totals(order, -1)
+            order.status = PROCESSING
+            self._processing[order.order_id] = order
+            self._changed.notify_all()
+            return order
+    
+    def wait_next(self, timeout: float = None) -> Optional[Order]:
+        """Like take_next(), but block up to timeout seconds for an order."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._changed:
+            while not self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._changed.wait(remaining)
+            return self.take_next()
+    
+    def complete(self, order: Order) -> None:
+        """Mark a processing order Completed and move it to the history ring."""
+        with self._lock:
+            if self._processing.pop(order.order_id, None) is None:
+                return
+            del self._active[order.order_id]
+            order.status = COMPLETED
+            self.history.append(order)
+            self.completed_count += 1
+            self._changed.notify_all()
+    
+    def fail(self, order: Order, error: str) -> None:
+        """Mark a processing order Failed and move it to the history ring."""
+        with self._lock:
+            if self._processing.pop(order.order_id, None) is None:
+                return
+            del self._active[order.order_id]
+            order.status = FAILED
+            order.error = error
+            self.history.append(order)
+            self._changed.notify_all()
+    
+    def requeue(self, order: Order) -> None:
+        """Put a processing order back at the front (e.g. queue stopped mid-order)."""
+        with self._lock:
+            if self._processing.pop(order.order_id, None) is None:
+                return
+            order.status = PENDING
+            self._pending.appendleft(order)
+            self._add_pending_totals(order, 1)
+            self._changed.notify_all()
     
     def remove_completed(self):
-        """Remove completed orders from queue."""
-        self.orders = [o for o in self.orders if o.status != "Completed"]
+        """Drop the completed-order history."""
+        with self._lock:
+            self.history.clear()
     
     def clear_all(self):
         """Clear all orders."""
-        self.orders.clear()
+        with self._lock:
+            self._pending.clear()
+            self._active.clear()
+            self._processing.clear()
+            self.history.clear()
+            self.pending_drinks = 0
+            self.pending_seconds = self.pending_variance = 0.0
+            self._changed.notify_all()
+    
+    def clear_pending(self) -> int:
+        """Drop orders not yet started (the one in progress keeps running)."""
+        with self._lock:
+            count = len(self._pending)
+            for order in self._pending:
+                del self._active[order.order_id]
+            self._pending.clear()
+            self.pending_drinks = 0
+            self.pending_seconds = self.pending_variance = 0.0
+            self._changed.notify_all()
+            return count
+    
+    def is_idle(self) -> bool:
+        """Nothing pending and nothing processing."""
+        return not self._active
+    
+    def _add_pending_totals(self, order: Order, sign: int) -> None:
+        self.pending_drinks += sign * order.quantity
+        self.pending_seconds += sign * order.estimate
+        self.pending_variance += sign * order.variance
+        if not self._pending:
+            # No float drift when empty
+            self.pending_drinks, self.pending_seconds, self.pending_variance = 0, 0.0, 0.0
     
     def get_pending_count(self) -> int:
         """Count pending orders."""
-        return sum(1 for o in self.orders if o.status == "Pending")
+        return len(self._pending)
+    
+    def get_active_count(self) -> int:
+        """Pending plus processing orders."""
+        return len(self._active)
     
     def get_total_count(self) -> int:
-        """Total orders in queue."""
-        return len(self.orders)
+        """Orders shown in the queue (active plus completed history)."""
+        with self._lock:
+            return len(self._active) + len(self.history)
 
 
-def estimate_program_time(program: Program) -> float:
+def estimate_program_time(program: Program, speed_override: float = 1.0) -> float:
     """
-    Estimate program execution time in seconds.
-    Based on delays + estimated move times.
+    Estimate program execution time in seconds: the median of its measured
+    runs, or the kinematics model until it has run (see estimator.program_eta).
     """
-    if not program.steps:
-        return 0.0
-    
-    total_time = 0.0
-    
-    for step in program.steps:
-        # Add delay time
-        total_time += step.delay
-        
-        # Estimate move time based on feedrate
-        # Assume average move distance of 100mm
-        # Time = Distance / Speed (converted to seconds)
-        if step.f and step.f > 0:
-            # F is in mm/min, convert to seconds
-            # Assuming 100mm average move
-            move_time = (100 / step.f) * 60  # seconds
-            total_time += move_time
-        else:
-            # Default 2 seconds if no feedrate
-            total_time += 2.0
-    
-    return total_time
+    return program_eta(program, speed_override)['p50']
 
 
 def format_time(seconds: float) -> str:
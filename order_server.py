@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Headless order service: owns the robot link, the OrderQueue and the
+RobotWorker (a FleetDispatcher with several ROBOT_PORTS), and serves them
+over HTTP/JSON on localhost so any number of kiosks / tablets (app.py with
+ORDER_SERVER_URL set) can share the arms.
+
+    POST   /orders          {"flavor": "mango", "quantity": 2} -> 201 order
+    GET    /orders/<id>     one order (pending, in progress or recent)
+    GET    /queue           status + all orders in serving order
+    DELETE /queue           drop orders not yet started
+    POST   /robot/start     start / resume taking orders
+    POST   /robot/pause     stop after the current order
+    GET    /events          Server-Sent Events: worker events + status heartbeat
+
+    python order_server.py                 # robot on config PORT
+    python order_server.py --start --port 8765
+"""
+
+import argparse
+import json
+import queue
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Set
+
+from config import (ORDER_SERVER_HOST, ORDER_SERVER_PORT, MAX_ORDER_QUANTITY,
+                    SCHEDULING_POLICY)
+from drink_catalog import estimate_order, get_catalog
+from order_queue import OrderQueue
+from fleet import FleetDispatcher, make_station_robot
+from robot_worker import RobotWorker
+from scheduling import make_policy
+from serial_comm import close_all_connections
+
+# Seconds between status events on an otherwise quiet event stream
+STATUS_INTERVAL = 1.0
+
+# Events buffered per stream client; a client this far behind is dropped
+CLIENT_BUFFER = 256
+
+# Largest request body accepted (orders are a few dozen bytes)
+MAX_BODY = 4096
+
+# What a flavor may look like before it is looked up in programs/juices
+FLAVOR_RE = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+class OrderService:
+    """
+    The queue and worker behind the HTTP API, plus fan-out of worker events
+    to event-stream subscribers. Usable without HTTP (tests, other front ends).
+    """
+
+    def __init__(self, order_queue: OrderQueue = None, robot: RobotWorker = None):
+        self.queue = order_queue or OrderQueue(estimate=estimate_order,
+                                               policy=make_policy(SCHEDULING_POLICY))
+        self.robot = robot or make_station_robot(self.queue)  # One arm, or a fleet
+        self._subscribers: Set["queue.Queue"] = set()
+        self._lock = threading.Lock()
+        self.robot.add_listener(self._on_robot_event)
+
+    # ---------- Commands ----------
+
+    def add_order(self, flavor, quantity) -> dict:
+        if not isinstance(flavor, str) or not FLAVOR_RE.fullmatch(flavor.strip()):
+            raise ValueError("flavor must be a recipe name (letters, digits, _ or -)")
+        flavor = flavor.strip()
+        if flavor not in get_catalog().keys():
+            raise ValueError(f"unknown flavor {flavor!r} "
+                             f"(available: {', '.join(get_catalog().keys())})")
+        if (isinstance(quantity, bool) or not isinstance(quantity, int)
+                or not 1 <= quantity <= MAX_ORDER_QUANTITY):
+            raise ValueError(f"quantity must be an integer from 1 to {MAX_ORDER_QUANTITY}")
+        order = self.queue.add_order(flavor, quantity)
+        self.publish({'event': 'order_added', 'order': order.to_dict()})
+        return order.to_dict()
+
+    def clear_pending(self) -> int:
+        count = self.queue.clear_pending()
+        self.publish({'event': 'queue_cleared', 'count': count})
+        return count
+
+    def start(self) -> None:
+        self.robot.start()
+        self.publish({'event': 'running'})
+
+    def pause(self) -> None:
+        self.robot.pause()
+        self.publish({'event': 'paused'})
+
+    # ---------- Queries ----------
+
+    def order(self, order_id: int) -> Optional[dict]:
+        order = self.queue.find_order(order_id)
+        return order.to_dict() if order is not None else None
+
+    def status(self) -> dict:
+        """Everything a kiosk shows besides the order list."""
+        robot = self.robot
+        p50, p90 = robot.eta_range()
+        current = robot.current
+        return {
+            'running': robot.running,
+            'busy': robot.busy,
+            'current': current.to_dict() if current is not None else None,
+            'current_drink': robot.current_drink if current is not None else 0,
+            'current_remaining': robot.current_remaining(),
+            'eta_p50': p50,
+            'eta_p90': p90,
+            'progress': robot.progress(),
+            'pending': self.queue.get_pending_count(),
+            'drinks_made': robot.drinks_made,
+            'last_error': robot.last_error,
+            'robots': robot.health() if isinstance(robot, FleetDispatcher) else None,
+        }
+
+    def snapshot(self) -> dict:
+        return dict(self.status(), orders=[o.to_dict() for o in self.queue.orders])
+
+    # ---------- Event stream ----------
+
+    def subscribe(self) -> "queue.Queue":
+        events = queue.Queue(maxsize=CLIENT_BUFFER)
+        with self._lock:
+            self._subscribers.add(events)
+        return events
+
+    def unsubscribe(self, events: "queue.Queue") -> None:
+        with self._lock:
+            self._subscribers.discard(events)
+
+    def publish(self, event: dict) -> None:
+        """Queue event for every subscriber (never blocks the robot thread)."""
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for events in subscribers:
+            try:
+                events.put_nowait(event)
+            except queue.Full:
+                self.unsubscribe(events)  # Stalled client; it reconnects and re-reads /queue
+
+    def _on_robot_event(self, info: dict) -> None:
+        """Robot worker thread: forward as JSON-ready data."""
+        order = info['order']
+        self.publish({'event': info['event'], 'order': order.to_dict() if order else None,
+                      'drink': info['drink'], 'error': info['error']})
+
+
+class OrderRequestHandler(BaseHTTPRequestHandler):
+    server_version = "ZKBotOrders/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> OrderService:
+        return self.server.service
+
+    def log_message(self, format, *args):
+        pass  # Kiosks poll; keep the console for robot output
+
+    # ---------- Responses ----------
+
+    def _send_json(self, status: int, body) -> None:
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Cache-Control", "no-store")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _error(self, status: int, message: str) -> None:
+        self._send_json(status, {'error': message})
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        if length < 0:
+            raise ValueError("negative Content-Length")
+        if length > MAX_BODY:
+            raise ValueError("request body too large")
+        data = json.loads(self.rfile.read(length) or b"{}")
+        if not isinstance(data, dict):
+            raise ValueError("expected a JSON object")
+        return data
+
+    # ---------- Routes ----------
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        match = re.fullmatch(r"/orders/(\d+)", path)
+        if match:
+            order = self.service.order(int(match.group(1)))
+            if order is None:
+                self._error(404, f"no order {match.group(1)}")
+            else:
+                self._send_json(200, order)
+        elif path == "/queue":
+            self._send_json(200, self.service.snapshot())
+        elif path == "/events":
+            self._stream_events()
+        else:
+            self._error(404, f"unknown path {path}")
+
+    def do_POST(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        try:
+            body = self._read_json()
+        except ValueError as e:
+            self._error(400, f"bad request: {e}")
+            return
+        if path == "/orders":
+            try:
+                order = self.service.add_order(body.get('flavor'), body.get('quantity', 1))
+            except ValueError as e:
+                self._error(400, str(e))
+                return
+            self._send_json(201, order)
+        elif path == "/robot/start":
+            self.service.start()
+            self._send_json(200, self.service.status())
+        elif path == "/robot/pause":
+            self.service.pause()
+            self._send_json(200, self.service.status())
+        else:
+            self._error(404, f"unknown path {path}")
+
+    def do_DELETE(self):
+        path = self.path.split("?", 1)[0].rstrip("/")
+        if path == "/queue":
+            self._send_json(200, {'cleared': self.service.clear_pending()})
+        else:
+            self._error(404, f"unknown path {path}")
+
+    def _stream_events(self) -> None:
+        """
+        Server-Sent Events until the client goes away: each worker event as
+        'data: {...}', and a 'status' event whenever nothing happened for
+        STATUS_INTERVAL (also the keep-alive).
+        """
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-store")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+        events = self.service.subscribe()
+        try:
+            self._write_event({'event': 'status', 'status': self.service.status()})
+            while not self.server.stopping.is_set():
+                try:
+                    event = events.get(timeout=STATUS_INTERVAL)
+                except queue.Empty:
+                    event = {'event': 'status'}
+                self._write_event(dict(event, status=self.service.status()))
+        except (BrokenPipeError, ConnectionResetError, OSError):
+            pass  # Client disconnected
+        finally:
+            self.service.unsubscribe(events)
+
+    def _write_event(self, event: dict) -> None:
+        self.wfile.write(f"event: {event['event']}\ndata: {json.dumps(event)}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+class OrderServer(ThreadingHTTPServer):
+    """HTTP front of an OrderService (one thread per connection)."""
+    daemon_threads = True
+
+    def __init__(self, service: OrderService = None, host: str = ORDER_SERVER_HOST,
+                 port: int = ORDER_SERVER_PORT):
+        super().__init__((host, port), OrderRequestHandler)
+        self.service = service or OrderService()
+        self.stopping = threading.Event()
+
+    @property
+    def url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OrderServer":
+        """Serve on a background thread."""
+        threading.Thread(target=self.serve_forever, name="order-server", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        self.stopping.set()  # Ends open event streams
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Headless ZKBot order service")
+    parser.add_argument("--host", default=ORDER_SERVER_HOST)
+    parser.add_argument("--port", type=int, default=ORDER_SERVER_PORT)
+    parser.add_argument("--start", action="store_true", help="Start taking orders right away")
+    args = parser.parse_args()
+
+    server = OrderServer(host=args.host, port=args.port)
+    if args.start:
+        server.service.start()
+    print(f"Order server on {server.url} (robot {'running' if args.start else 'paused'})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stopping.set()
+        server.server_close()
+        server.service.robot.stop()
+        close_all_connections()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,279 @@
+# program_compiler.py
+#
+# Ahead-of-time compilation of Programs into ready-to-write byte frames,
+# so the execution loop only writes, waits for acks and sleeps.
+
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, fields
+from operator import attrgetter
+from typing import Callable, Optional, Tuple
+
+from config import MODAL_ELISION, WAIT_MODE, ACK_ON_COMPLETE
+from models import Step, Program
+from serial_comm import (get_connection, format_move, build_do0, reply_timeout, transact,
+                         wait_for_arrival)
+from timing_store import get_timing_store, timing_key, program_signature
+
+# Compiled programs kept in the (program, speed override) cache
+COMPILE_CACHE_SIZE = 32
+
+
+@dataclass(frozen=True)
+class CompiledFrame:
+    """One encoded frame and the ack timeout for its command type."""
+    data: bytes
+    timeout: float
+
+
+@dataclass(frozen=True)
+class CompiledStep:
+    """
+    Frames for one Step (gripper first, then move) and the delay after it.
+    target is the absolute (x, y, z) the step moves to, None for steps that
+    do not move; axes never commanded so far in the program are None.
+    """
+    frames: Tuple[CompiledFrame, ...]
+    delay: float
+    target: Optional[Tuple[Optional[float], ...]] = None
+    dwell: Optional[float] = None
+
+
+@dataclass(frozen=True)
+class CompiledProgram:
+    """Immutable, pre-encoded form of a Program at one speed override."""
+    name: str
+    speed_override: float
+    steps: Tuple[CompiledStep, ...]
+
+    @property
+    def frame_count(self) -> int:
+        return sum(len(s.frames) for s in self.steps)
+
+    @property
+    def total_bytes(self) -> int:
+        return sum(len(f.data) for s in self.steps for f in s.frames)
+
+
+# ========== Modal Output Elision ==========
+
+@dataclass
+class ControllerMirror:
+    """
+    Host-side copy of what the controller was last told: target pose,
+    feedrate and gripper angle. None means unknown (always emit the word).
+    """
+    x: Optional[float] = None
+    y: Optional[float] = None
+    z: Optional[float] = None
+    f: Optional[int] = None
+    do0: Optional[int] = None
+
+
+def format_number(value: float) -> str:
+    """Shortest form of a coordinate: -151.0 -> '-151', 12.50 -> '12.5'."""
+    text = f"{value:.3f}".rstrip("0").rstrip(".")
+    return "0" if text in ("-0", "") else text
+
+
+def modal_do0(step: Step, mirror: ControllerMirror) -> Optional[str]:
+    """G06 gripper frame, or None if the angle is unset or unchanged."""
+    if step.do0 is None:
+        return None
+    angle = max(0, min(180, int(step.do0)))  # Clamp to servo range 0-180
+    if angle == mirror.do0:
+        return None
+    mirror.do0 = angle
+    return f"0x550xAA G06 D7 S1 A{angle} 0xAA0x55"
+
+
+def modal_move(step: Step, speed_override: float, mirror: ControllerMirror) -> Optional[str]:
+    """
+    G00/G01 frame carrying only the axis and F words that differ from the
+    mirror. Returns None for a move to where the arm already is.
+    """
+    words = []
+    for axis in ("x", "y", "z"):
+        value = getattr(step, axis)
+        if value is not None and value != getattr(mirror, axis):
+            words.append(f"{axis.upper()}{format_number(value)}")
+            setattr(mirror, axis, value)
+    if not words:
+        return None
+
+    effective_speed = max(1, min(500, int(step.f * speed_override)))
+    if effective_speed != mirror.f:
+        words.append(f"F{effective_speed}")
+        mirror.f = effective_speed
+
+    cmd = step.cmd if step.cmd in ("G00", "G01") else "G01"
+    return f"0x550xAA {cmd} {' '.join(words)} 0xAA0x55"
+
+
+def _frame(cmd: str) -> CompiledFrame:
+    return CompiledFrame(data=cmd.encode("utf-8"), timeout=reply_timeout(cmd))
+
+
+def compile_step(step: Step, speed_override: float = 1.0,
+                 mirror: ControllerMirror = None, target: tuple = None) -> CompiledStep:
+    """
+    Encode one Step's gripper and move frames.
+    With a mirror, redundant frames and words are elided and the mirror updated.
+    target defaults to the step's own axes (see step_targets for absolute ones).
+    """
+    if mirror is None:
+        cmds = (build_do0(step), format_move(step, speed_override))
+    else:
+        cmds = (modal_do0(step, mirror), modal_move(step, speed_override, mirror))
+    frames = tuple(_frame(cmd) for cmd in cmds if cmd)
+    if target is None and any(v is not None for v in (step.x, step.y, step.z)):
+        target = (step.x, step.y, step.z)
+    return CompiledStep(frames=frames, delay=step.delay, target=target, dwell=step.dwell)
+
+
+def step_targets(steps) -> list:
+    """
+    Absolute (x, y, z) each step ends at, carrying unset axes forward from
+    earlier steps; None for steps without a move.
+    """
+    pose = [None, None, None]
+    targets = []
+    for step in steps:
+        values = (step.x, step.y, step.z)
+        if all(v is None for v in values):
+            targets.append(None)
+            continue
+        pose = [v if v is not None else p for v, p in zip(values, pose)]
+        targets.append(tuple(pose))
+    return targets
+
+
+# Plain tuple of every Step field (astuple would deep-copy each step)
+_step_fields = attrgetter(*(f.name for f in fields(Step)))
+
+
+def program_key(prog: Program) -> tuple:
+    """Hashable snapshot of a Program's content, used as the cache key."""
+    return (prog.name, tuple(map(_step_fields, prog.steps)))
+
+
+_cache: "OrderedDict[tuple, CompiledProgram]" = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def compile_program(prog: Program, speed_override: float = 1.0,
+                    modal: bool = MODAL_ELISION) -> CompiledProgram:
+    """
+    Compile a Program, reusing the cached result for the same content and override.
+    Editing the Program changes its key, so stale entries are never returned.
+
+    With modal=True the controller state is mirrored from the start of the
+    program (initially unknown, so the first frames are complete) and
+    repeated gripper angles, unchanged axes and unchanged F are left out.
+    """
+    key = (program_key(prog), speed_override, modal)
+    with _cache_lock:
+        compiled = _cache.get(key)
+        if compiled is not None:
+            _cache.move_to_end(key)
+            return compiled
+
+    mirror = ControllerMirror() if modal else None
+    targets = step_targets(prog.steps)
+    compiled = CompiledProgram(
+        name=prog.name,
+        speed_override=speed_override,
+        steps=tuple(compile_step(s, speed_override, mirror, t)
+                    for s, t in zip(prog.steps, targets)),
+    )
+    with _cache_lock:
+        _cache[key] = compiled
+        while len(_cache) > COMPILE_CACHE_SIZE:
+            _cache.popitem(last=False)
+    return compiled
+
+
+def clear_compile_cache() -> None:
+    with _cache_lock:
+        _cache.clear()
+
+
+def _pause(seconds: float, stop_event: threading.Event = None) -> None:
+    """Sleep, waking early if stop_event is set."""
+    if stop_event is None:
+        time.sleep(seconds)
+    else:
+        stop_event.wait(seconds)
+
+
+def finish_step(conn, step: CompiledStep, sent_at: float, wait_mode: str,
+                stop_event: threading.Event = None) -> bool:
+    """
+    Wait out one step after its frames were acked.
+
+    "delay": sleep the authored delay.
+    "arrival": return once the arm is at step.target (immediately when the
+    controller acks on completion), never later than the delay after the
+    frames were sent, then hold step.dwell. Steps without a move wait their
+    dwell if set, otherwise the full delay (nothing to detect for the gripper).
+
+    Returns True if the step ended before its delay ran out.
+    """
+    if wait_mode != "arrival":
+        _pause(step.delay, stop_event)
+        return False
+
+    if step.target is None:
+        _pause(step.dwell if step.dwell is not None else step.delay, stop_event)
+        return step.dwell is not None and step.dwell < step.delay
+
+    remaining = max(0.0, step.delay - (time.perf_counter() - sent_at))
+    arrived = ACK_ON_COMPLETE or wait_for_arrival(conn, step.target, remaining,
+                                                  stop_event=stop_event)[0]
+    if step.dwell:
+        _pause(step.dwell, stop_event)
+    return arrived
+
+
+def run_compiled(compiled: CompiledProgram, port: str = None, wait_mode: str = None,
+                 stop_event: threading.Event = None,
+                 on_step: Callable[[int], None] = None) -> bool:
+    """
+    Execute a CompiledProgram: write each frame, wait for its ack, then wait
+    out the step (see finish_step; wait_mode defaults to config WAIT_MODE).
+    Blocking call - wrap in thread for GUI use.
+
+    on_step(index) is called (on this thread) before each step is sent.
+    Setting stop_event ends the run before the next step; waits are cut short.
+    Returns True if every step ran, False if stopped.
+    Raises RuntimeError if the controller answers 'error'.
+    """
+    wait_mode = wait_mode or WAIT_MODE
+    conn = get_connection(port)
+    start = time.perf_counter()
+    early = 0
+    step_seconds = []
+    for index, step in enumerate(compiled.steps):
+        if stop_event is not None and stop_event.is_set():
+            print(f"Program {compiled.name}: stopped before step {index + 1}")
+            return False
+        if on_step is not None:
+            on_step(index)
+        sent_at = time.perf_counter()
+        # Hold the port only while talking, so monitors can poll during delays
+        with conn as ser:
+            for frame in step.frames:
+                reply = transact(ser, frame.data, frame.timeout)
+                if reply.status == "error":
+                    raise RuntimeError(f"Controller rejected command: {frame.data.decode()}")
+        early += finish_step(conn, step, sent_at, wait_mode, stop_event)
+        step_seconds.append(time.perf_counter() - sent_at)
+    elapsed = time.perf_counter() - start
+    print(f"Program {compiled.name}: {compiled.frame_count} frames "
+          f"in {elapsed:.2f}s ({wait_mode} mode, "
+          f"{early}/{len(compiled.steps)} steps ended early)")
+    get_timing_store().record_run(
+        timing_key(compiled.name, compiled.speed_override, wait_mode),
+        program_signature(compiled), elapsed, step_seconds)
+    return True
@@ -0,0 +1,210 @@
+# robot_worker.py
+#
+# Consumer side of the live order queue: one thread per robot takes the next
+# order the moment the robot is free, while customers keep adding orders.
+
+import math
+import threading
+import time
+from typing import Callable, List, Optional, Tuple
+
+from config import TRAY_MODE
+from drink_runner import make_drink, make_tray as make_drink_tray
+from sequence_planner import SequencePlanner
+from order_queue import OrderQueue, Order
+from timing_store import Z90
+
+# How long wait_next blocks before the worker re-checks for pause / stop
+POLL_TIMEOUT = 0.5
+
+
+class RobotWorker:
+    """
+    Makes drinks for an OrderQueue on a background thread.
+
+    make(flavor) makes one drink (default: drink_runner.make_drink on port).
+    make_tray(flavor, quantity, on_cup) makes a multi-cup order in one go,
+    calling on_cup(n) as cup n starts (default: drink_runner.make_tray when
+    config TRAY_MODE is on and make is not given).
+    Listeners are called on the worker thread with an event dict:
+        {'event': 'order_started' | 'drink_started' | 'drink_done' |
+                  'order_done' | 'order_failed' | 'idle',
+         'order': Order or None, 'drink': int, 'error': str or None}
+    GUI listeners should only publish to a UIStateBus from there.
+
+    A failed drink fails its order and pauses the worker, since the robot
+    usually needs attention before the next order.
+    """
+
+    def __init__(self, queue: OrderQueue, make: Callable[[str], None] = None, port: str = None,
+                 name: str = "robot", make_tray: Callable = None):
+        self.queue = queue
+        self.port = port
+        self.name = name
+        self.planner = SequencePlanner()
+        self.make = make or (lambda flavor: make_drink(flavor, port=port, planner=self.planner))
+        if make_tray is None and make is None and TRAY_MODE:
+            make_tray = lambda flavor, quantity, on_cup: make_drink_tray(
+                flavor, quantity, port=port, planner=self.planner, on_cup=on_cup)
+        self.make_tray = make_tray
+        self._listeners: List[Callable[[dict], None]] = []
+        self._running = False
+        self._paused = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+        # Current work (read from other threads for progress / ETA)
+        self.current: Optional[Order] = None
+        self.current_drink = 0              # Drink number in progress (1-based)
+        self.current_done = 0               # Drinks of the current order finished
+        self.drink_started_at: Optional[float] = None
+
+        # Drinks made since the queue was last idle (progress bar baseline)
+        self.session_drinks = 0
+        self.drinks_made = 0
+        self.last_error: Optional[str] = None
+
+    # ---------- Lifecycle ----------
+
+    def start(self) -> "RobotWorker":
+        """Start (or resume) taking orders."""
+        self.planner.reset()  # The arm may have been moved while stopped
+        self._paused.clear()
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"worker-{self.name}", daemon=True)
+        self._thread.start()
+        return self
+
+    def pause(self) -> None:
+        """Finish the current order, then stop taking new ones."""
+        self._paused.set()
+
+    def stop(self, timeout: float = 1.0) -> None:
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._running and not self._paused.is_set()
+
+    @property
+    def busy(self) -> bool:
+        return self.current is not None
+
+    # ---------- Listeners ----------
+
+    def add_listener(self, listener: Callable[[dict], None]) -> None:
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[dict], None]) -> None:
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _emit(self, event: str, order: Order = None, drink: int = 0, error: str = None) -> None:
+        info = {'event': event, 'order': order, 'drink': drink, 'error': error}
+        for listener in list(self._listeners):
+            try:
+                listener(info)
+            except Exception as e:
+                print(f"Worker listener error: {e}")
+
+    # ---------- Progress ----------
+
+    def current_remaining(self, per_drink: float = None) -> float:
+        """Estimated seconds left on the order in progress."""
+        order = self.current
+        if order is None or order.quantity <= 0:
+            return 0.0
+        per_drink = order.estimate / order.quantity if per_drink is None else per_drink
+        left = (order.quantity - self.current_done) * per_drink
+        if self.drink_started_at is not None:
+            left -= min(per_drink, time.monotonic() - self.drink_started_at)
+        return max(0.0, left)
+
+    def eta(self) -> float:
+        """Seconds until everything queued now is made."""
+        return self.current_remaining() + self.queue.pending_seconds
+
+    def eta_range(self) -> Tuple[float, float]:
+        """(p50, p90) of eta(), treating drink times as independent."""
+        order = self.current
+        variance = self.queue.pending_variance
+        if order is not None and order.quantity > 0:
+            variance += order.variance * (order.quantity - self.current_done) / order.quantity
+        p50 = self.eta()
+        return p50, p50 + Z90 * math.sqrt(max(0.0, variance))
+
+    def progress(self) -> float:
+        """Percent of the drinks in this session (since the queue was idle) that are made."""
+        order = self.current
+        in_progress = (order.quantity - self.current_done) if order is not None else 0
+        total = self.session_drinks + in_progress + self.queue.pending_drinks
+        return 100.0 * self.session_drinks / total if total else 0.0
+
+    # ---------- Worker ----------
+
+    def _run(self) -> None:
+        idle_sent = True
+        while self._running:
+            if self._paused.is_set():
+                time.sleep(POLL_TIMEOUT)
+                continue
+            order = self.queue.wait_next(POLL_TIMEOUT)
+            if order is None:
+                if not idle_sent and self.queue.is_idle():
+                    self.session_drinks = 0
+                    self.planner.reset()  # Jogging / testing may move the arm while idle
+                    self._emit('idle')
+                    idle_sent = True
+                continue
+            idle_sent = False
+            self._process(order)
+
+    def _process(self, order: Order) -> None:
+        self.current_done = 0
+        self.current = order
+        self._emit('order_started', order)
+        try:
+            if order.quantity > 1 and self.make_tray is not None:
+                self.make_tray(order.flavor, order.quantity,
+                               lambda cup: self._cup_started(order, cup))
+                for drink in range(self.current_done + 1, order.quantity + 1):
+                    self._drink_done(order, drink)
+            else:
+                for drink in range(1, order.quantity + 1):
+                    self._drink_started(order, drink)
+                    self.make(order.flavor)
+                    self._drink_done(order, drink)
+        except Exception as e:
+            self.last_error = str(e)
+            self.current = None
+            self.queue.fail(order, str(e))
+            self.planner.reset()
+            self._paused.set()
+            self._emit('order_failed', order, self.current_drink, str(e))
+            return
+        finally:
+            self.drink_started_at = None
+        self.current = None
+        self.queue.complete(order)
+        self._emit('order_done', order, order.quantity)
+
+    def _drink_started(self, order: Order, drink: int) -> None:
+        self.current_drink = drink
+        self.drink_started_at = time.monotonic()
+        self._emit('drink_started', order, drink)
+
+    def _drink_done(self, order: Order, drink: int) -> None:
+        self.drink_started_at = None
+        self.current_done += 1
+        self.session_drinks += 1
+        self.drinks_made += 1
+        self._emit('drink_done', order, drink)
+
+    def _cup_started(self, order: Order, cup: int) -> None:
+        """Tray progress: starting cup n means the cups before it are done."""
+        for drink in range(self.current_done + 1, cup):
+            self._drink_done(order, drink)
+        self._drink_started(order, cup)
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Order scheduling policies for OrderQueue, plus a what-if simulator.
+
+    fifo     - first come, first served
+    sjf      - shortest job (lowest estimate) first
+    grouping - keep making the flavour just made while such orders wait
+
+A policy only chooses which pending order is taken next. With max_skip=K
+an order can be overtaken by at most K later orders; after that it is
+served before anything behind it, so no order slips more than K places
+past its FIFO position.
+
+    python scheduling.py --orders 500 --rate 90 --switch 5 --max-skip 3
+"""
+
+import argparse
+import copy
+import random
+from abc import ABC, abstractmethod
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from config import SCHEDULING_MAX_SKIP
+from drink_catalog import DEFAULT_DRINK_SECONDS, get_catalog
+
+# Default bound on overtakes for the non-FIFO policies
+MAX_SKIP = SCHEDULING_MAX_SKIP
+
+
+class SchedulingPolicy(ABC):
+    """Picks the index of the pending order to take next."""
+    name = "policy"
+
+    def __init__(self, max_skip: Optional[int] = MAX_SKIP):
+        self.max_skip = max_skip
+
+    @abstractmethod
+    def select(self, pending: Sequence, last_flavor: Optional[str]) -> int:
+        """Index into pending (within candidates()) of the order to serve next."""
+
+    def candidates(self, pending: Sequence) -> int:
+        """How many leading orders may be chosen without breaking max_skip."""
+        if self.max_skip is None:
+            return len(pending)
+        for index, order in enumerate(pending):
+            if order.skips >= self.max_skip:
+                return index + 1
+        return len(pending)
+
+    def plan(self, pending: Sequence, last_flavor: Optional[str]) -> List:
+        """The order pending orders will be served in if nothing else arrives."""
+        remaining = [copy.copy(o) for o in pending]
+        originals = {o.order_id: o for o in pending}
+        served = []
+        while remaining:
+            index = self.select(remaining, last_flavor)
+            order = remaining.pop(index)
+            for ahead in remaining[:index]:
+                ahead.skips += 1
+            last_flavor = order.flavor
+            served.append(originals[order.order_id])
+        return served
+
+    def __repr__(self):
+        return f"{self.name}(max_skip={self.max_skip})"
+
+
+class FIFO(SchedulingPolicy):
+    name = "fifo"
+
+    def __init__(self):
+        super().__init__(max_skip=0)
+
+    def select(self, pending, last_flavor):
+        return 0
+
+    def plan(self, pending, last_flavor):
+        return list(pending)
+
+
+class ShortestJobFirst(SchedulingPolicy):
+    """Lowest Order.estimate first (ties: earliest)."""
+    name = "sjf"
+
+    def select(self, pending, last_flavor):
+        count = self.candidates(pending)
+        return min(range(count), key=lambda i: pending[i].estimate)
+
+
+class FlavorGrouping(SchedulingPolicy):
+    """Earliest order of the flavour just made, else the oldest order."""
+    name = "grouping"
+
+    def select(self, pending, last_flavor):
+        count = self.candidates(pending)
+        for index in range(count):
+            if pending[index].flavor == last_flavor:
+                return index
+        return 0
+
+
+POLICIES = {"fifo": FIFO, "sjf": ShortestJobFirst, "grouping": FlavorGrouping}
+
+
+def make_policy(name: str, max_skip: Optional[int] = MAX_SKIP) -> SchedulingPolicy:
+    """Policy by name ('fifo', 'sjf', 'grouping')."""
+    if name not in POLICIES:
+        raise ValueError(f"Unknown scheduling policy: {name} (choose from {', '.join(POLICIES)})")
+    return FIFO() if name == "fifo" else POLICIES[name](max_skip)
+
+
+# ========== Simulation ==========
+
+def random_trace(orders: int, rate_per_hour: float, flavors: Sequence[str],
+                 max_quantity: int = 3, seed: int = 1) -> List[Tuple[float, str, int]]:
+    """Poisson arrivals: [(arrival seconds, flavor, quantity), ...]."""
+    rng = random.Random(seed)
+    t, trace = 0.0, []
+    for _ in range(orders):
+        t += rng.expovariate(rate_per_hour / 3600.0)
+        trace.append((t, rng.choice(flavors), rng.randint(1, max_quantity)))
+    return trace
+
+
+def drink_seconds(flavor: str) -> float:
+    """Per-drink time from the recipe (learned, else path estimate, else DEFAULT_DRINK_SECONDS)."""
+    try:
+        return get_catalog().eta(flavor)['p50']
+    except FileNotFoundError:
+        return float(DEFAULT_DRINK_SECONDS)
+
+
+def simulate(policy: SchedulingPolicy, trace: Sequence[Tuple[float, str, int]],
+             per_drink: Callable[[str], float] = drink_seconds,
+             switch_seconds: float = 0.0) -> dict:
+    """
+    Serve trace with one robot on a virtual clock, through a real OrderQueue
+    (capacity_sim.simulate_station with a single arm).
+
+    switch_seconds is added whenever the flavour differs from the previous
+    order (recipe change-over).
+    Returns: {
+        'mean_wait': float, 'p95_wait': float, 'max_wait': float,  # Seconds queued
+        'switches': int,        # Flavour changes
+        'makespan': float,      # Seconds until the last order is done
+        'max_skips': int,       # Most times one order was overtaken
+    }
+    """
+    from capacity_sim import simulate_station  # capacity_sim imports this module
+    summary = simulate_station(trace, policy, 1, per_drink, switch_seconds).summary()
+    return {
+        'mean_wait': summary['mean_wait'],
+        'p95_wait': summary['p95_wait'],
+        'max_wait': summary['max_wait'],
+        'switches': summary['switches'],
+        'makespan': summary['hours'] * 3600.0,
+        'max_skips': summary['max_skips'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare order scheduling policies")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--rate", type=float, default=90.0, help="Orders per hour")
+    parser.add_argument("--flavors", default="mango,orange")
+    parser.add_argument("--switch", type=float, default=0.0,
+                        help="Extra seconds when the flavour changes")
+    parser.add_argument("--max-skip", type=int, default=MAX_SKIP)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    trace = random_trace(args.orders, args.rate, args.flavors.split(","), seed=args.seed)
+    print(f"{args.orders} orders at {args.rate:g}/h, switch {args.switch:g}s\n")
+    print(f"{'policy':<10}{'mean wait':>11}{'p95 wait':>10}{'max wait':>10}"
+          f"{'switches':>10}{'max skips':>11}")
+    for name in POLICIES:
+        result = simulate(make_policy(name, args.max_skip), trace, switch_seconds=args.switch)
+        print(f"{name:<10}{result['mean_wait']:>10.1f}s{result['p95_wait']:>9.1f}s"
+              f"{result['max_wait']:>9.1f}s{result['switches']:>10}{result['max_skips']:>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+# sequence_planner.py
+#
+# Back-to-back drink stitching. Every drink starts with the orgin.json head
+# (home, open gripper, home) because the arm could be anywhere; between two
+# cups of a session the arm's pose and gripper are known, so head steps that
+# change nothing observable are skipped before the next pick_cup.
+
+from dataclasses import dataclass, field
+from typing import List, Optional, Sequence, Tuple
+
+from drink_catalog import DrinkCatalog, get_catalog
+from estimator import estimate_program
+from models import Program, Step
+
+Pose = Tuple[Optional[float], Optional[float], Optional[float]]
+
+
+@dataclass(frozen=True)
+class ArmState:
+    """Commanded pose and gripper angle; None means unknown."""
+    pose: Pose = (None, None, None)
+    gripper: Optional[float] = None
+
+
+def step_target(step: Step, pose: Pose) -> Pose:
+    """Pose after a step (None axes keep their value)."""
+    return tuple(p if v is None else v for v, p in zip((step.x, step.y, step.z), pose))
+
+
+def end_state(steps: Sequence[Step], start: ArmState = ArmState()) -> ArmState:
+    pose, gripper = start.pose, start.gripper
+    for step in steps:
+        pose = step_target(step, pose)
+        if step.do0 is not None:
+            gripper = step.do0
+    return ArmState(pose, gripper)
+
+
+def observable(steps: Sequence[Step], start: ArmState) -> list:
+    """
+    What a program does that must survive stitching: each gripper change with
+    the pose it happens at (the gripper frame is sent before the move), each
+    mandatory waypoint, and the final pose and gripper.
+    """
+    pose, gripper = start.pose, start.gripper
+    events = []
+    for step in steps:
+        if step.do0 is not None and step.do0 != gripper:
+            events.append(("grip", pose, step.do0))
+            gripper = step.do0
+        pose = step_target(step, pose)
+        if step.mandatory:
+            events.append(("via", pose))
+    events.append(("end", pose, gripper))
+    return events
+
+
+def stitch(steps: Sequence[Step], start: ArmState, removable: Sequence[int]) -> List[int]:
+    """
+    Indices of steps to keep. Each removable, non-mandatory step is dropped
+    if the program's observable() behaviour from start stays the same,
+    repeating until nothing more can go.
+    """
+    kept = list(range(len(steps)))
+    baseline = observable(steps, start)
+    changed = True
+    while changed:
+        changed = False
+        for index in removable:
+            if index not in kept or steps[index].mandatory:
+                continue
+            trial = [i for i in kept if i != index]
+            if observable([steps[i] for i in trial], start) == baseline:
+                kept = trial
+                changed = True
+    return kept
+
+
+@dataclass
+class Plan:
+    """One cup as it will be run."""
+    program: Program
+    start: ArmState = ArmState()                      # Arm state the plan assumes
+    skipped: List[int] = field(default_factory=list)  # Indices into the full drink(s)
+    saved_seconds: float = 0.0                        # Model estimate vs full drinks
+    cup_starts: List[int] = field(default_factory=lambda: [0])  # First step of each cup
+
+
+class SequencePlanner:
+    """
+    Plans the cups of one session. After finished(), the next plan() knows
+    where the arm stopped and skips the redundant part of the homing head;
+    call reset() whenever the arm may have moved in between (idle, pause,
+    error, jogging), so the next cup runs its full head again.
+    """
+
+    def __init__(self, catalog: DrinkCatalog = None):
+        self.catalog = catalog or get_catalog()
+        self.state: Optional[ArmState] = None
+        self.cups = 0
+        self.saved_total = 0.0
+
+    def reset(self) -> None:
+        self.state = None
+
+    def plan(self, juice_key: str) -> Plan:
+        """
+        Program for the next cup. The arm state is forgotten until finished(),
+        so a cup that fails part-way makes the following one run in full.
+        """
+        full = self.catalog.program(juice_key)
+        state, self.state = self.state, None
+        if state is None:
+            return Plan(full)
+
+        head = range(self.catalog.head_length(juice_key))
+        kept = stitch(full.steps, state, head)
+        if len(kept) == len(full.steps):
+            return Plan(full, state)
+
+        program = Program(name=f"{full.name}/stitched", steps=[full.steps[i] for i in kept])
+        start = tuple(0.0 if v is None else v for v in state.pose)
+        saved = estimate_program(full, start=start) - estimate_program(program, start=start)
+        skipped = [i for i in range(len(full.steps)) if i not in kept]
+        return Plan(program, state, skipped, max(0.0, saved))
+
+    def plan_tray(self, juice_key: str, quantity: int) -> Plan:
+        """
+        One fused program for quantity cups of a drink. Every cup after the
+        first skips what the stitching rules allow of its homing head and of
+        the previous cup's final retract; saved_seconds compares against
+        quantity independent full drinks.
+        """
+        full = self.catalog.program(juice_key)
+        if quantity <= 1:
+            return self.plan(juice_key)
+        count, head = len(full.steps), self.catalog.head_length(juice_key)
+        state, self.state = self.state, None
+
+        # The retract: trailing steps that all go to the drink's final pose
+        final = end_state(full.steps).pose
+        tail, pose = 0, (None, None, None)
+        for step in reversed(full.steps[head:]):
+            if step.do0 is not None or step.mandatory or step_target(step, pose) != final:
+                break
+            tail += 1
+
+        steps = list(full.steps) * quantity
+        removable = list(range(head)) if state is not None else []
+        for cup in range(1, quantity):
+            base = cup * count
+            removable += range(base, base + head)           # Next cup's head first,
+            removable += range(base - tail, base)           # then this cup's retract
+        kept = stitch(steps, state or ArmState(), removable)
+
+        # A tray after another cup skips its first head too; keep its learned time apart
+        name = f"tray_{juice_key}x{quantity}" + ("/stitched" if state is not None else "")
+        program = Program(name=name, steps=[steps[i] for i in kept])
+        cup_starts = [next(n for n, i in enumerate(kept) if i >= cup * count)
+                      for cup in range(quantity)]
+        start = tuple(0.0 if v is None else v for v in (state or ArmState()).pose)
+        saved = quantity * estimate_program(full, start=start) - estimate_program(program, start=start)
+        skipped = [i for i in range(len(steps)) if i not in set(kept)]
+        return Plan(program, state or ArmState(), skipped, max(0.0, saved), cup_starts)
+
+    def finished(self, plan: Plan) -> None:
+        """Record that plan ran to the end."""
+        self.state = end_state(plan.program.steps, plan.start)
+        self.cups += len(plan.cup_starts)
+        self.saved_total += plan.saved_seconds
+        if plan.skipped:
+            print(f"Stitched {plan.program.name}: skipped steps "
+                  f"{', '.join(str(i + 1) for i in plan.skipped)}, saved ~{plan.saved_seconds:.1f}s "
+                  f"({self.saved_total / self.cups:.1f}s per cup this session)")
@@ -2,13 +2,18 @@
 #
 # Serial communication layer: open port, send commands, run programs.
 
+import re
 import time
-from typing import Optional, List
+import threading
+from dataclasses import dataclass
+from typing import Optional, List, Dict, Tuple
 import serial
 import serial.tools.list_ports
 
-from config import PORT, BAUD, BYTESIZE, PARITY, STOPBITS, TIMEOUT
+from config import (PORT, BAUD, BYTESIZE, PARITY, STOPBITS, TIMEOUT, REPLY_TIMEOUTS,
+                    ARRIVAL_TOLERANCE_MM, ARRIVAL_POLL_INTERVAL)
 from models import Step, Program
+from timing_store import get_timing_store, timing_key, program_signature
 
 
 def list_available_ports() -> List[str]:
@@ -65,24 +70,257 @@ def open_port(port: str = None) -> serial.Serial:
         raise
 
 
-def send_command(ser: serial.Serial, cmd_str: str) -> bytes:
-    """Send a G-code command and return the reply."""
+# ========== Shared Connection Manager ==========
+
+class SerialConnection:
+    """
+    One long-lived serial.Serial for a port, shared by every caller.
+
+    Use as a context manager to get exclusive access to the open port:
+
+        with get_connection() as ser:
+            send_command(ser, frame)
+
+    The port is opened lazily on first use and kept open afterwards.
+    If a serial error escapes the with-block the port is dropped and
+    reopened on the next use.
+
+    Every write on the port takes write_lock for that one frame only, so
+    write_urgent() (the stop frame) can go out between another caller's
+    frames without waiting for the connection lock, e.g. during a stream.
+    """
+
+    def __init__(self, port: str):
+        self.port = port
+        self.lock = threading.RLock()
+        self.write_lock = threading.Lock()
+        self.max_write_bytes = 0     # Longest frame written (bounds a write_lock wait)
+        self._ser: Optional[serial.Serial] = None
+        self._raw_write = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._ser is not None and self._ser.is_open
+
+    def open(self) -> serial.Serial:
+        """Return the open port, (re)connecting if needed."""
+        with self.lock:
+            if not self.is_open:
+                self._ser = open_port(self.port)
+                self._guard_writes(self._ser)
+            return self._ser
+
+    def _guard_writes(self, ser: serial.Serial) -> None:
+        """Route ser.write through write_lock, one frame at a time."""
+        raw_write = ser.write
+
+        def write(data):
+            with self.write_lock:
+                self.max_write_bytes = max(self.max_write_bytes, len(data))
+                return raw_write(data)
+
+        self._raw_write = raw_write
+        ser.write = write
+
+    def write_urgent(self, data: bytes) -> float:
+        """
+        Write data without taking the connection lock, between the frames of
+        whoever holds it. Returns the seconds spent waiting for write_lock.
+        """
+        start = time.perf_counter()
+        if not self.is_open:
+            with self as ser:  # Not open yet, so nobody is mid-stream
+                ser.write(data)
+            return time.perf_counter() - start
+        with self.write_lock:
+            waited = time.perf_counter() - start
+            self._raw_write(data)
+        return waited
+
+    def invalidate(self) -> None:
+        """Drop the current port so the next use reconnects."""
+        with self.lock:
+            if self._ser is not None:
+                try:
+                    self._ser.close()
+                except Exception:
+                    pass
+                self._ser = None
+                print(f"Connection to {self.port} dropped, will reconnect on next use.")
+
+    def close(self) -> None:
+        """Close the port (it is reopened on the next use)."""
+        with self.lock:
+            if self._ser is not None and self._ser.is_open:
+                self._ser.close()
+                print(f"Serial port {self.port} closed.")
+            self._ser = None
+
+    def __enter__(self) -> serial.Serial:
+        self.lock.acquire()
+        try:
+            return self.open()
+        except BaseException:
+            self.lock.release()
+            raise
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is not None and issubclass(exc_type, (serial.SerialException, OSError)):
+                self.invalidate()
+        finally:
+            self.lock.release()
+        return False
+
+
+_connections: Dict[str, SerialConnection] = {}
+_connections_lock = threading.Lock()
+
+
+def get_connection(port: str = None) -> SerialConnection:
+    """Return the process-wide shared connection for a port (default: config PORT)."""
+    if port is None:
+        port = PORT
+    with _connections_lock:
+        conn = _connections.get(port)
+        if conn is None:
+            conn = SerialConnection(port)
+            _connections[port] = conn
+        return conn
+
+
+def close_all_connections() -> None:
+    """Close every shared connection (call on application exit)."""
+    with _connections_lock:
+        conns = list(_connections.values())
+    for conn in conns:
+        conn.close()
+
+
+# ========== Acknowledged Replies ==========
+
+@dataclass
+class Reply:
+    """
+    Controller reply to one command.
+    - raw: bytes received (including the terminator)
+    - status: 'ok', 'error' or 'timeout'
+    - rtt: seconds from write to terminator (or to the timeout)
+    """
+    raw: bytes
+    status: str
+    rtt: float
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+_GCODE_RE = re.compile(r"\b(G\d\d)\b")
+
+
+def command_type(cmd_str: str) -> str:
+    """Return the REPLY_TIMEOUTS key for a frame: 'G00', 'G14', 'MANUAL', ..."""
+    if cmd_str.startswith("0xff"):
+        return "MANUAL"
+    match = _GCODE_RE.search(cmd_str)
+    return match.group(1) if match else "DEFAULT"
+
+
+def reply_timeout(cmd_str: str) -> float:
+    """Reply timeout in seconds for a frame."""
+    return REPLY_TIMEOUTS.get(command_type(cmd_str), REPLY_TIMEOUTS["DEFAULT"])
+
+
+def parse_reply_status(raw: bytes) -> Optional[str]:
+    """Return 'ok' / 'error' if raw ends with a complete reply line, else None."""
+    if not raw.endswith(b"\n"):
+        return None
+    tail = raw.rstrip().lower()
+    if tail.endswith(b"ok"):
+        return "ok"
+    if tail.endswith(b"error"):
+        return "error"
+    return None
+
+
+def read_reply(ser: serial.Serial, timeout: float) -> Tuple[bytes, str]:
+    """
+    Read reply lines until the controller's ok / error terminator arrives.
+    Returns (raw, status) where status is 'ok', 'error' or 'timeout'.
+    """
+    deadline = time.perf_counter() + timeout
+    old_timeout = ser.timeout
+    raw = b""
+    try:
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                return raw, "timeout"
+            ser.timeout = remaining
+            line = ser.read_until(b"\n")
+            if not line:
+                return raw, "timeout"
+            raw += line
+            status = parse_reply_status(raw)
+            if status:
+                return raw, status
+    finally:
+        ser.timeout = old_timeout
+
+
+def transact(ser: serial.Serial, data: bytes, timeout: float) -> Reply:
+    """Write pre-encoded frame bytes and wait for the ack (no logging)."""
+    ser.reset_input_buffer()  # drop stale bytes from earlier timed-out commands
+    start = time.perf_counter()
+    ser.write(data)
+    raw, status = read_reply(ser, timeout)
+    return Reply(raw=raw, status=status, rtt=time.perf_counter() - start)
+
+
+def exchange(ser: serial.Serial, cmd_str: str, timeout: float = None) -> Reply:
+    """
+    Send one frame and wait for its acknowledgement.
+    Returns as soon as the terminator arrives; timeout defaults to REPLY_TIMEOUTS.
+    """
     if not ser.is_open:
         raise RuntimeError("Serial port not open")
+    if timeout is None:
+        timeout = reply_timeout(cmd_str)
 
     data = cmd_str.encode("utf-8")
-    written = ser.write(data)
-    print(f"Sent: {cmd_str} | bytes: {written}")
+    reply = transact(ser, data, timeout)
 
-    time.sleep(0.5)  # controller processing time
-    reply = ser.read(100)
-    print(f"Reply: {reply}")
+    print(f"Sent: {cmd_str} | bytes: {len(data)} | reply: {reply.raw} "
+          f"({reply.status}, {reply.rtt * 1000:.1f} ms)")
     return reply
 
 
-def build_move(step: Step, speed_override: float = 1.0) -> Optional[str]:
+def send_command(ser: serial.Serial, cmd_str: str) -> bytes:
+    """Send a G-code command and return the reply."""
+    return exchange(ser, cmd_str).raw
+
+
+def send_step(ser: serial.Serial, step: Step, speed_override: float = 1.0) -> float:
+    """
+    Send the gripper and move frames for one step, waiting for each ack.
+    Returns the summed round-trip time in seconds.
+    Raises RuntimeError if the controller answers 'error'.
+    """
+    rtt = 0.0
+    for cmd in (build_do0(step), build_move(step, speed_override)):
+        if not cmd:
+            continue
+        reply = exchange(ser, cmd)
+        rtt += reply.rtt
+        if reply.status == "error":
+            raise RuntimeError(f"Controller rejected command: {cmd}")
+    return rtt
+
+
+def format_move(step: Step, speed_override: float = 1.0) -> Optional[str]:
     """
-    Build a G00/G01 XYZ move frame with speed override applied.
+    Format a G00/G01 XYZ move frame with speed override applied.
     Format: 0x550xAA G01 X... Y... Z... F... 0xAA0x55
     
     Args:
@@ -108,8 +346,14 @@ def build_move(step: Step, speed_override: float = 1.0) -> Optional[str]:
     parts.append(f"F{effective_speed}")  # No decimal
 
     gcode = " ".join(parts)
-    frame = f"0x550xAA {gcode} 0xAA0x55"
-    print(f"FRAME: {frame} (Override: {speed_override*100:.0f}%)")
+    return f"0x550xAA {gcode} 0xAA0x55"
+
+
+def build_move(step: Step, speed_override: float = 1.0) -> Optional[str]:
+    """Build a move frame (see format_move) and log it."""
+    frame = format_move(step, speed_override)
+    if frame:
+        print(f"FRAME: {frame} (Override: {speed_override*100:.0f}%)")
     return frame
 
 
@@ -128,7 +372,9 @@ def build_do0(step: Step) -> Optional[str]:
     return frame
 
 
-def run_program(prog: Program, speed_override: float = 1.0) -> None:
+def run_program(prog: Program, speed_override: float = 1.0, port: str = None,
+                wait_mode: str = None, stop_event: threading.Event = None,
+                on_step=None) -> bool:
     """
     Run all steps in a Program sequentially.
     Blocking call - wrap in thread for GUI use.
@@ -136,27 +382,36 @@ def run_program(prog: Program, speed_override: float = 1.0) -> None:
     Args:
         prog: Program to execute
         speed_override: Speed multiplier (0.1 to 2.0), default 1.0 = 100%
+        port: Serial port (default: config PORT)
+        wait_mode: "delay" or "arrival" (default: config WAIT_MODE)
+        stop_event: Set from another thread to stop before the next step
+        on_step: Called with each step index before it is sent (worker thread)
+
+    Returns:
+        bool: True if completed, False if stopped
     """
-    ser = open_port()
-    try:
-        for i, step in enumerate(prog.steps, start=1):
-            print(f"--- Step {i} ---")
+    # Imported here: program_compiler builds on this module's frame builders
+    from program_compiler import compile_program, run_compiled
 
-            # DO0 (gripper) first if set
-            do_cmd = build_do0(step)
-            if do_cmd:
-                send_command(ser, do_cmd)
+    # Frames are pre-encoded (and cached) so the loop only writes and waits
+    return run_compiled(compile_program(prog, speed_override), port, wait_mode,
+                        stop_event=stop_event, on_step=on_step)
 
-            # XYZ move with speed override
-            move_cmd = build_move(step, speed_override)
-            if move_cmd:
-                send_command(ser, move_cmd)
 
-            # delay before next step
-            time.sleep(step.delay)
-    finally:
-        ser.close()
-        print("Serial port closed.")
+POSITION_QUERY = bytes([0xff, 0xfe, 0x0c, 0xfd, 0xfc])
+
+
+def parse_position(response: str) -> Optional[dict]:
+    """Parse an "X,Y,Z,ok" position reply into {'x','y','z'}; None if malformed."""
+    if ',' in response and 'ok' in response.lower():
+        parts = [p.strip() for p in response.split(',')]
+        if len(parts) >= 3:
+            try:
+                x, y, z = float(parts[0]), float(parts[1]), float(parts[2])
+                return {'x': x, 'y': y, 'z': z}
+            except ValueError:
+                pass
+    return None
 
 
 def query_position() -> dict:
@@ -167,41 +422,121 @@ def query_position() -> dict:
         dict: {'x': 0.0, 'y': 0.0, 'z': 0.0} - safe defaults
     """
     try:
-        import serial
-        
-        ser = serial.Serial(
-            port=PORT,
-            baudrate=BAUD,
-            timeout=TIMEOUT
-        )
-        
-        # MANUAL mode position query: 0xff 0xfe 0x0c 0xfd 0xfc
-        cmd = bytes([0xff, 0xfe, 0x0c, 0xfd, 0xfc])
-        ser.write(cmd)
-        
-        # VERY short wait (don't hang)
-        ser.timeout = 0.1
-        response = ser.read(32).decode('utf-8', errors='ignore')  # Max 32 chars
+        with get_connection() as ser:
+            # MANUAL mode position query: 0xff 0xfe 0x0c 0xfd 0xfc
+            ser.write(POSITION_QUERY)
+
+            # VERY short wait (don't hang)
+            old_timeout = ser.timeout
+            ser.timeout = 0.1
+            try:
+                response = ser.read(32).decode('utf-8', errors='ignore')  # Max 32 chars
+            finally:
+                ser.timeout = old_timeout
         
-        ser.close()
-        
-        # Parse "X,Y,Z,ok"
-        if ',' in response and 'ok' in response.lower():
-            parts = [p.strip() for p in response.split(',')]
-            if len(parts) >= 3:
-                try:
-                    x, y, z = float(parts[0]), float(parts[1]), float(parts[2])
-                    return {'x': x, 'y': y, 'z': z}
-                except:
-                    pass
-        
-        return {'x': 0.0, 'y': 0.0, 'z': 0.0}
+        pos = parse_position(response)
+        return pos if pos is not None else {'x': 0.0, 'y': 0.0, 'z': 0.0}
         
     except:
         # NEVER crash or spam errors
         return {'x': 0.0, 'y': 0.0, 'z': 0.0}
 
 
+def read_position(ser: serial.Serial) -> Optional[dict]:
+    """
+    Position query on an already-held port.
+    Returns as soon as the reply line ends; None if nothing parseable came back.
+    """
+    reply = transact(ser, POSITION_QUERY, REPLY_TIMEOUTS["MANUAL"])
+    return parse_position(reply.raw.decode('utf-8', errors='ignore'))
+
+
+def has_arrived(pos: dict, target: Tuple[Optional[float], ...],
+                tolerance: float = ARRIVAL_TOLERANCE_MM) -> bool:
+    """True if every known axis of target is within tolerance of pos."""
+    return all(value is None or abs(pos[axis] - value) <= tolerance
+               for axis, value in zip(("x", "y", "z"), target))
+
+
+def wait_for_arrival(conn: "SerialConnection", target: Tuple[Optional[float], ...],
+                     max_wait: float, tolerance: float = ARRIVAL_TOLERANCE_MM,
+                     poll: float = ARRIVAL_POLL_INTERVAL,
+                     stop_event: threading.Event = None) -> Tuple[bool, float]:
+    """
+    Poll the position until the arm is within tolerance of target (None axes
+    are ignored), max_wait seconds pass or stop_event is set. The port is
+    only held per poll.
+
+    Returns: (arrived, seconds waited). A controller that never answers the
+    position query simply runs into max_wait, i.e. the fixed-delay behaviour.
+    """
+    start = time.perf_counter()
+    while True:
+        with conn as ser:
+            pos = read_position(ser)
+        waited = time.perf_counter() - start
+        if pos is not None and has_arrived(pos, target, tolerance):
+            return True, waited
+        if waited >= max_wait or (stop_event is not None and stop_event.is_set()):
+            return False, waited
+        time.sleep(min(poll, max_wait - waited))
+
+
+def wait_until_idle(conn: "SerialConnection", max_wait: float,
+                    target: Tuple[Optional[float], ...] = None,
+                    tolerance: float = ARRIVAL_TOLERANCE_MM,
+                    poll: float = ARRIVAL_POLL_INTERVAL) -> Tuple[bool, float]:
+    """
+    Poll the position until two consecutive readings agree within tolerance
+    (the planner has run dry) or max_wait seconds pass. With a target, the
+    arm must also be there, so a dwell halfway through does not count.
+
+    Returns: (idle, seconds waited)
+    """
+    start = time.perf_counter()
+    last = None
+    while True:
+        with conn as ser:
+            pos = read_position(ser)
+        waited = time.perf_counter() - start
+        if pos is not None and last is not None:
+            settled = has_arrived(pos, (last['x'], last['y'], last['z']), tolerance)
+            if settled and (target is None or has_arrived(pos, target, tolerance)):
+                return True, waited
+        last = pos
+        if waited >= max_wait:
+            return False, waited
+        time.sleep(min(poll, max_wait - waited))
+
+
+ESTOP_QUERY = "0x550xAA G14 0xAA0x55"
+
+
+def parse_estop(response: str) -> dict:
+    """Turn a G14 reply into the check_emergency_stop() result dict."""
+    response = response.strip().lower()
+    if "ok" in response:
+        # E-stop NOT pressed - system normal
+        return {
+            'is_pressed': False,
+            'status': 'normal',
+            'raw_response': response
+        }
+    elif "error" in response:
+        # E-stop IS pressed - emergency stop active
+        return {
+            'is_pressed': True,
+            'status': 'e_stop_active',
+            'raw_response': response
+        }
+    else:
+        # Unknown response
+        return {
+            'is_pressed': None,
+            'status': f'Unknown response: {response[:20]}',
+            'raw_response': response
+        }
+
 
 def check_emergency_stop(ser: serial.Serial = None) -> dict:
     """
@@ -219,14 +554,23 @@ def check_emergency_stop(ser: serial.Serial = None) -> dict:
     - Response if pressed: "error\\r\\n"
     - Response if normal: "ok\\r\\n"
     """
-    close_after = False
-    
+    if ser is None:
+        # Borrow the shared connection for the duration of the query
+        conn = get_connection()
+        try:
+            with conn as shared:
+                result = check_emergency_stop(shared)
+        except serial.SerialException as e:
+            return {
+                'is_pressed': None,
+                'status': 'Serial error',
+                'raw_response': str(e)
+            }
+        if result['status'] == 'Serial error':
+            conn.invalidate()
+        return result
+
     try:
-        # Open port if not provided
-        if ser is None:
-            ser = open_port()
-            close_after = True
-        
         if not ser.is_open:
             return {
                 'is_pressed': None,
@@ -234,39 +578,9 @@ def check_emergency_stop(ser: serial.Serial = None) -> dict:
                 'raw_response': ''
             }
         
-        # Send G14 emergency stop query command
-        cmd = "0x550xAA G14 0xAA0x55"
-        data = cmd.encode("utf-8")
-        ser.write(data)
-        
-        # Wait for response
-        time.sleep(0.3)
-        
-        # Read response
-        response = ser.read(100).decode("utf-8", errors="ignore").strip().lower()
-        
-        # Parse response
-        if "ok" in response:
-            # E-stop NOT pressed - system normal
-            return {
-                'is_pressed': False,
-                'status': 'normal',
-                'raw_response': response
-            }
-        elif "error" in response:
-            # E-stop IS pressed - emergency stop active
-            return {
-                'is_pressed': True,
-                'status': 'e_stop_active',
-                'raw_response': response
-            }
-        else:
-            # Unknown response
-            return {
-                'is_pressed': None,
-                'status': f'Unknown response: {response[:20]}',
-                'raw_response': response
-            }
+        # Send G14 emergency stop query command and wait for its ok / error line
+        reply = exchange(ser, ESTOP_QUERY)
+        return parse_estop(reply.raw.decode("utf-8", errors="ignore"))
     
     except serial.SerialException as e:
         return {
@@ -280,9 +594,6 @@ def check_emergency_stop(ser: serial.Serial = None) -> dict:
             'status': f'Error: {str(e)[:30]}',
             'raw_response': ''
         }
-    finally:
-        if close_after and ser and ser.is_open:
-            ser.close()
 # ========== NEW: Step-by-Step Execution (Upgrade #3) ==========
 
 class StepExecutor:
@@ -293,17 +604,21 @@ class StepExecutor:
     def __init__(self, program: Program):
         self.program = program
         self.current_step = 0
-        self.ser = None
+        self.conn = None
         self.is_running = False
         self.is_paused = False
-        self.speed_override = 1.0  # Speed override (default 100%)    
+        self.speed_override = 1.0  # Speed override (default 100%)
+        self._signed = None        # (program, step count, override) the signature is for
+        self._signature = None
+
     def start(self):
         """Open serial port and prepare for execution."""
-        if self.ser is None or not self.ser.is_open:
-            self.ser = open_port()
+        self.conn = get_connection()
+        self.conn.open()
         self.is_running = True
         self.is_paused = False
         self.current_step = 0
+        self._sign()
         
     def execute_next_step(self) -> dict:
         """
@@ -315,7 +630,8 @@ class StepExecutor:
             'completed': bool,           # True if program finished
             'step': Step or None,        # The step that was executed
             'status': str,               # Status message
-            'error': str or None         # Error message if failed
+            'error': str or None,        # Error message if failed
+            'rtt': float                 # Command round-trip in seconds (on success)
         }
         """
         if not self.is_running:
@@ -345,18 +661,14 @@ class StepExecutor:
             
             print(f"--- Executing Step {self.current_step + 1} / {len(self.program.steps)} ---")
             
-            # Execute DO0 (gripper) command first if set
-            do_cmd = build_do0(step)
-            if do_cmd:
-                send_command(self.ser, do_cmd)
-            
-            # Execute XYZ movement
-            move_cmd = build_move(step, self.speed_override if hasattr(self, 'speed_override') else 1.0)
-            if move_cmd:
-                send_command(self.ser, move_cmd)
+            # Execute DO0 (gripper) first if set, then the XYZ movement
+            started = time.perf_counter()
+            with self.conn as ser:
+                rtt = send_step(ser, step, self.speed_override)
             
             # Delay after step
             time.sleep(step.delay)
+            self._record_step(time.perf_counter() - started)
             
             # Prepare result
             result = {
@@ -365,7 +677,8 @@ class StepExecutor:
                 'completed': False,
                 'step': step,
                 'status': f'Executed step {self.current_step + 1}',
-                'error': None
+                'error': None,
+                'rtt': rtt                   # Round-trip of the step's commands (s)
             }
             
             # Move to next step
@@ -375,6 +688,7 @@ class StepExecutor:
             if self.current_step >= len(self.program.steps):
                 result['completed'] = True
                 result['status'] = 'Program completed'
+                get_timing_store().save()
             
             return result
             
@@ -388,19 +702,40 @@ class StepExecutor:
                 'error': str(e)
             }
     
+    def _sign(self) -> Optional[str]:
+        """
+        Signature of the program being stepped, computed once per start() /
+        reset() and again only if the program, its length or the override
+        changed (hashing every step after each step would be O(n^2)).
+        """
+        from program_compiler import compile_program  # Imports this module
+        signed = (id(self.program), len(self.program.steps), self.speed_override)
+        if signed != self._signed:
+            self._signature = program_signature(compile_program(self.program, self.speed_override))
+            self._signed = signed
+        return self._signature
+
+    def _record_step(self, seconds: float) -> None:
+        """Feed the measured step time (send + delay) to the learned ETAs."""
+        try:
+            get_timing_store().record_step(
+                timing_key(self.program.name, self.speed_override, "delay"),
+                self._sign(), self.current_step, seconds)
+        except Exception as e:
+            print(f"Timing not recorded: {e}")
+
     def reset(self):
         """Reset to first step without closing port."""
         self.current_step = 0
         self.is_paused = False
+        self._signed = None  # Steps may have been edited meanwhile
+        self._sign()
     
     def stop(self):
-        """Stop execution and close serial port."""
+        """Stop execution and release the shared connection (the port stays open)."""
         self.is_running = False
         self.is_paused = False
-        if self.ser and self.ser.is_open:
-            self.ser.close()
-            print("Serial port closed.")
-        self.ser = None
+        self.conn = None
     
     def get_status(self) -> dict:
         """Get current execution status."""
@@ -420,15 +755,11 @@ def check_estop() -> bool:
         bool: True if E-stop is NOT active (safe to move), False if active
     """
     try:
-        ser = open_port()
-        # Send G14 emergency stop query command
-        cmd = "0x550xAA G14 0xAA0x55\r\n"
-        ser.write(cmd.encode('utf-8'))
-        
-        # Wait for response
-        time.sleep(0.2)
-        response = ser.read(100).decode('utf-8', errors='ignore').strip().lower()
-        ser.close()
+        with get_connection() as ser:
+            # Send G14 emergency stop query command and wait for its ok / error line
+            cmd = "0x550xAA G14 0xAA0x55\r\n"
+            reply = exchange(ser, cmd)
+            response = reply.raw.decode('utf-8', errors='ignore').strip().lower()
         
         # Parse response
         if "ok" in response:
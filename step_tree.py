@@ -0,0 +1,221 @@
+# step_tree.py
+#
+# Virtualised, diff-based Treeview for program steps. Only the rows that fit
+# on screen exist as Tk items; edits and scrolling touch just the rows whose
+# values changed, so a several-thousand-step recorded path stays responsive.
+
+from tkinter import ttk
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+from models import Step
+
+COLUMNS = ("cmd", "x", "y", "z", "f", "delay", "do0")
+HEADINGS = {"cmd": "Cmd", "x": "X", "y": "Y", "z": "Z", "f": "F", "delay": "Delay", "do0": "DO0"}
+
+# Used until the Treeview is mapped and its real row height is known (pixels)
+DEFAULT_ROW_HEIGHT = 20
+
+
+def step_row(step: Step) -> tuple:
+    """Column values shown for one step."""
+    return (step.cmd, step.x, step.y, step.z, step.f, step.delay, step.do0)
+
+
+class StepTreeView(ttk.Frame):
+    """
+    Treeview plus scrollbar showing a list of Steps.
+
+    Item ids are the absolute step index as a string, so callers use the
+    usual selection() / selection_set() / see() calls with str(index).
+    Selection and the highlighted (current) step are kept as indices and
+    survive rows scrolling in and out of the materialised window.
+    """
+
+    def __init__(self, parent, height: int = 25):
+        super().__init__(parent)
+        self.rowconfigure(0, weight=1)
+        self.columnconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(self, columns=COLUMNS, show="headings", height=height,
+                                 selectmode="extended")
+        for col, text in HEADINGS.items():
+            self.tree.heading(col, text=text)
+            self.tree.column(col, width=70, anchor="center")
+        self.tree.tag_configure('current', background='#3498db', foreground='white')
+        self.tree.grid(row=0, column=0, sticky="nsew")
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.grid(row=0, column=1, sticky="ns")
+
+        self.steps: List[Step] = []
+        self.top = 0                        # First materialised step index
+        self.visible = height               # Rows that fit in the Treeview
+        self._rows: Dict[int, tuple] = {}   # Materialised index -> shown values
+        self._selected: Set[int] = set()
+        self._current: Optional[int] = None
+        self._select_handler: Optional[Callable] = None
+
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<Configure>", self._on_resize)
+        self.tree.bind("<MouseWheel>", self._on_mousewheel)
+        self.tree.bind("<Button-4>", lambda e: self._scroll_rows(-3))
+        self.tree.bind("<Button-5>", lambda e: self._scroll_rows(3))
+        self.tree.bind("<Up>", lambda e: self._move_cursor(-1))
+        self.tree.bind("<Down>", lambda e: self._move_cursor(1))
+        self.tree.bind("<Prior>", lambda e: self._scroll_rows(-self.visible))
+        self.tree.bind("<Next>", lambda e: self._scroll_rows(self.visible))
+
+    # ---------- Model ----------
+
+    def refresh(self, steps: List[Step] = None) -> int:
+        """
+        Show steps (or re-read the current list after an edit). Like a full
+        rebuild, this clears the selection; callers re-select afterwards.
+        Returns the number of Tk items inserted, updated or deleted.
+        """
+        if steps is not None:
+            self.steps = steps
+        self._selected.clear()
+        if self._current is not None and self._current >= len(self.steps):
+            self._current = None
+        return self._render()
+
+    def __len__(self) -> int:
+        return len(self.steps)
+
+    # ---------- Treeview-style API ----------
+
+    def bind(self, sequence=None, func=None, add=None):
+        """<<TreeviewSelect>> is routed through the selection sync; the rest go to the Treeview."""
+        if sequence == "<<TreeviewSelect>>":
+            self._select_handler = func
+            return None
+        return self.tree.bind(sequence, func, add)
+
+    def selection(self) -> Tuple[str, ...]:
+        return tuple(str(i) for i in sorted(self._selected))
+
+    def selection_set(self, items: Union[str, int, Iterable]) -> None:
+        if isinstance(items, (str, int)):
+            items = (items,)
+        self._selected = {int(i) for i in items if 0 <= int(i) < len(self.steps)}
+        self._apply_selection()
+
+    def select_all(self) -> None:
+        self._selected = set(range(len(self.steps)))
+        self._apply_selection()
+
+    def get_children(self) -> Tuple[str, ...]:
+        """All step ids (not only the materialised ones)."""
+        return tuple(str(i) for i in range(len(self.steps)))
+
+    def see(self, item: Union[str, int]) -> None:
+        index = int(item)
+        if index < self.top:
+            self.top = index
+        elif index >= self.top + self.visible:
+            self.top = index - self.visible + 1
+        else:
+            return
+        self._render()
+
+    def focus_set(self):
+        self.tree.focus_set()
+
+    # ---------- Highlight ----------
+
+    def set_current(self, index: Optional[int]) -> None:
+        """Highlight one step (None clears). Touches at most two Tk items."""
+        previous, self._current = self._current, index
+        if previous is not None and previous in self._rows:
+            self.tree.item(str(previous), tags=())
+        if index is not None and index in self._rows:
+            self.tree.item(str(index), tags=('current',))
+
+    # ---------- Rendering ----------
+
+    def _render(self) -> int:
+        count = len(self.steps)
+        self.top = max(0, min(self.top, count - self.visible))
+        wanted = range(self.top, min(count, self.top + self.visible))
+        changes = 0
+
+        for index in [i for i in self._rows if i not in wanted]:
+            self.tree.delete(str(index))
+            del self._rows[index]
+            changes += 1
+
+        for position, index in enumerate(wanted):
+            values = step_row(self.steps[index])
+            shown = self._rows.get(index)
+            if shown is None:
+                tags = ('current',) if index == self._current else ()
+                self.tree.insert("", position, iid=str(index), values=values, tags=tags)
+                changes += 1
+            elif shown != values:
+                self.tree.item(str(index), values=values)
+                changes += 1
+            self._rows[index] = values
+
+        self._apply_selection()
+        self._update_scrollbar()
+        return changes
+
+    def _apply_selection(self) -> None:
+        """Mirror the index selection onto the materialised rows."""
+        wanted = tuple(str(i) for i in sorted(self._selected) if i in self._rows)
+        if set(wanted) != set(self.tree.selection()):
+            self.tree.selection_set(wanted)
+
+    def _update_scrollbar(self) -> None:
+        count = len(self.steps)
+        if count <= self.visible:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self.top / count, (self.top + self.visible) / count)
+
+    # ---------- Events ----------
+
+    def _on_tree_select(self, event=None):
+        # Rows outside the window keep their state; visible rows follow Tk
+        on_screen = {int(i) for i in self.tree.selection()}
+        self._selected = {i for i in self._selected if i not in self._rows} | on_screen
+        if self._select_handler is not None:
+            self._select_handler(event)
+
+    def _on_resize(self, event):
+        style = ttk.Style(self)
+        row_height = style.lookup("Treeview", "rowheight") or DEFAULT_ROW_HEIGHT
+        heading = 25  # Column heading row
+        visible = max(1, (event.height - heading) // int(row_height))
+        if visible != self.visible:
+            self.visible = visible
+            self._render()
+
+    def _on_mousewheel(self, event):
+        self._scroll_rows(-3 if event.delta > 0 else 3)
+        return "break"  # Keep the right panel's bind_all scroll from firing too
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.top = int(float(amount) * len(self.steps))
+            self._render()
+        elif action == "scroll":
+            step = self.visible if unit == "pages" else 1
+            self._scroll_rows(int(amount) * step)
+
+    def _scroll_rows(self, rows: int):
+        self.top += rows
+        self._render()
+        return "break"
+
+    def _move_cursor(self, delta: int):
+        focus = self.tree.focus()
+        index = int(focus) if focus else (min(self._selected) if self._selected else 0)
+        index = max(0, min(len(self.steps) - 1, index + delta))
+        if not self.steps:
+            return "break"
+        self.see(index)
+        self.selection_set(index)
+        self.tree.focus(str(index))
+        return "break"
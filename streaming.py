@@ -0,0 +1,192 @@
+# streaming.py
+#
+# Pipelined program streaming: keep the controller's receive buffer topped up
+# so its planner always has the next move queued while the host waits for acks.
+
+import time
+from collections import deque
+from typing import List
+
+from config import CONTROLLER_RX_BUFFER, STREAM_ACK_TIMEOUT, WAIT_MODE, ACK_ON_COMPLETE
+from models import Program
+from program_compiler import CompiledProgram, compile_program
+from serial_comm import get_connection, read_reply, wait_until_idle
+from timing_store import get_timing_store, timing_key, program_signature
+
+
+def build_dwell(seconds: float) -> str:
+    """
+    Build a G04 dwell frame.
+    Format: 0x550xAA G04 P<milliseconds> 0xAA0x55
+    """
+    return f"0x550xAA G04 P{int(round(seconds * 1000))} 0xAA0x55"
+
+
+def compiled_frames(compiled: CompiledProgram, dwell: bool = True,
+                    wait_mode: str = None) -> List[str]:
+    """
+    Flatten a CompiledProgram into the frames sent by stream_compiled().
+
+    The synchronous loop waits out each step's delay on the host. While
+    streaming, the wait has to happen on the controller instead, so each
+    delay becomes a G04 dwell frame (dwell=False drops them). In "arrival"
+    mode the planner already runs moves back to back, so moves only send
+    their Step.dwell holds (see step_holds).
+    """
+    frames = []
+    for step, hold in zip(compiled.steps, step_holds(compiled, dwell, wait_mode)):
+        frames.extend(frame.data.decode("utf-8") for frame in step.frames)
+        if hold > 0:
+            frames.append(build_dwell(hold))
+    return frames
+
+
+def step_holds(compiled: CompiledProgram, dwell: bool = True, wait_mode: str = None) -> List[float]:
+    """
+    Seconds of G04 dwell compiled_frames() sends after each step: the same
+    waits as finish_step(), so a gripper step (no target) keeps its delay
+    in "arrival" mode unless it has a dwell.
+    """
+    if not dwell:
+        return [0.0] * len(compiled.steps)
+    if (wait_mode or WAIT_MODE) != "arrival":
+        return [step.delay for step in compiled.steps]
+    return [(step.dwell or 0) if step.target is not None
+            else (step.dwell if step.dwell is not None else step.delay)
+            for step in compiled.steps]
+
+
+def wait_until_done(compiled: CompiledProgram, started: float, port: str = None,
+                    dwell: bool = True, wait_mode: str = None) -> float:
+    """
+    Block until the controller has worked off a streamed program, in any
+    wait mode (acks only mean a frame was queued). The controller runs the
+    holds and moves one after another, so the last move cannot end before
+    started plus the holds ahead of it; from there the arm must settle on
+    the final target, then the trailing holds run out.
+
+    Returns the seconds waited.
+    """
+    now = time.perf_counter()
+    steps = compiled.steps
+    holds = step_holds(compiled, dwell, wait_mode)
+    moves = [i for i, step in enumerate(steps) if step.target is not None]
+    last = moves[-1] if moves else len(steps)
+    time.sleep(max(0.0, started + sum(holds[:last]) - time.perf_counter()))
+    if moves:
+        idle, _ = wait_until_idle(get_connection(port), STREAM_ACK_TIMEOUT,
+                                  target=steps[last].target)
+        if not idle:
+            print(f"{compiled.name}: arm still moving after {STREAM_ACK_TIMEOUT:.0f}s")
+        time.sleep(sum(holds[last:]))  # Final holds are still running on the controller
+    return time.perf_counter() - now
+
+
+def program_frames(prog: Program, speed_override: float = 1.0, dwell: bool = True,
+                   wait_mode: str = None) -> List[str]:
+    """Compile prog and flatten it (see compiled_frames)."""
+    return compiled_frames(compile_program(prog, speed_override), dwell, wait_mode)
+
+
+def stream_frames(frames: List[str], port: str = None,
+                  rx_buffer: int = CONTROLLER_RX_BUFFER,
+                  ack_timeout: float = STREAM_ACK_TIMEOUT) -> dict:
+    """
+    Stream frames using character-count flow control.
+
+    A frame is written as soon as the bytes of all un-acked frames plus the
+    new one fit in rx_buffer; every ok frees the oldest frame's bytes. The
+    shared connection is held for the whole stream so no other caller's
+    reply can be mistaken for an ack.
+
+    Returns: {
+        'frames': int,          # Frames sent
+        'bytes': int,           # Bytes sent
+        'elapsed': float,       # Seconds from first write to last ack
+        'max_in_flight': int    # Most frames queued on the controller at once
+    }
+    Raises RuntimeError on an 'error' reply or when acks stop arriving.
+    """
+    conn = get_connection(port)
+    in_flight = deque()   # (frame, length) of sent but un-acked frames
+    buffered = 0          # Characters currently held by the controller
+    max_in_flight = 0
+    total_bytes = 0
+
+    def wait_ack(ser):
+        nonlocal buffered
+        raw, status = read_reply(ser, ack_timeout)
+        frame, length = in_flight.popleft()
+        buffered -= length
+        if status == "error":
+            raise RuntimeError(f"Controller rejected command: {frame}")
+        if status == "timeout":
+            raise RuntimeError(f"No ack within {ack_timeout:.0f}s for: {frame}")
+
+    with conn as ser:
+        ser.reset_input_buffer()
+        start = time.perf_counter()
+
+        for frame in frames:
+            data = frame.encode("utf-8")
+            if len(data) > rx_buffer:
+                raise ValueError(f"Frame longer than controller buffer: {frame}")
+
+            # Block until the controller has room for this frame
+            while in_flight and buffered + len(data) > rx_buffer:
+                wait_ack(ser)
+
+            ser.write(data)
+            in_flight.append((frame, len(data)))
+            buffered += len(data)
+            total_bytes += len(data)
+            max_in_flight = max(max_in_flight, len(in_flight))
+
+        # Drain the remaining acks
+        while in_flight:
+            wait_ack(ser)
+
+        elapsed = time.perf_counter() - start
+
+    return {
+        'frames': len(frames),
+        'bytes': total_bytes,
+        'elapsed': elapsed,
+        'max_in_flight': max_in_flight,
+    }
+
+
+def stream_program(prog: Program, speed_override: float = 1.0, port: str = None,
+                   rx_buffer: int = CONTROLLER_RX_BUFFER, dwell: bool = True,
+                   wait_mode: str = None) -> dict:
+    """
+    Run a Program in pipelined mode (see stream_compiled for the returned stats).
+    Blocking call - wrap in thread for GUI use.
+    """
+    return stream_compiled(compile_program(prog, speed_override), port, rx_buffer, dwell,
+                           wait_mode)
+
+
+def stream_compiled(compiled: CompiledProgram, port: str = None,
+                    rx_buffer: int = CONTROLLER_RX_BUFFER, dwell: bool = True,
+                    wait_mode: str = None) -> dict:
+    """
+    Stream an already compiled program (see stream_frames for the returned stats).
+
+    Acks arrive when frames are queued, not when they finish, so the call
+    also waits until the controller is done (see wait_until_done); the
+    stats then carry 'idle_wait' (seconds spent waiting after the last ack).
+    """
+    wait_mode = wait_mode or WAIT_MODE
+    frames = compiled_frames(compiled, dwell=dwell, wait_mode=wait_mode)
+    start = time.perf_counter()
+    print(f"Streaming {compiled.name}: {len(frames)} frames, {rx_buffer}-char window")
+    stats = stream_frames(frames, port=port, rx_buffer=rx_buffer)
+    if not ACK_ON_COMPLETE:
+        stats['idle_wait'] = wait_until_done(compiled, start, port, dwell, wait_mode)
+    print(f"Streamed {stats['frames']} frames in {stats['elapsed']:.2f}s "
+          f"(max {stats['max_in_flight']} in flight), done after {time.perf_counter() - start:.2f}s")
+    get_timing_store().record_run(
+        timing_key(compiled.name, compiled.speed_override, wait_mode, streaming=True),
+        program_signature(compiled), time.perf_counter() - start)
+    return stats
@@ -0,0 +1,203 @@
+# telemetry.py
+#
+# Background telemetry: one poller per port publishes position and e-stop state
+# into a latest-value cache, so windows read memory instead of the serial port.
+
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+from io_worker import get_io_worker
+from serial_comm import parse_position, parse_estop
+
+# Poll interval while the arm is moving / standing still (seconds)
+FAST_INTERVAL = 0.1
+IDLE_INTERVAL = 1.0
+
+# How often the e-stop state is refreshed (seconds)
+ESTOP_INTERVAL = 1.0
+
+# Stay at the fast rate this long after the last detected motion or poke()
+FAST_HOLD = 2.0
+
+# Position change between polls that counts as moving (mm)
+MOTION_THRESHOLD = 0.05
+
+# Cached values older than this are treated as unknown by the windows (seconds)
+STALE_AFTER = 2.0
+
+# Reply wait for one telemetry job before it is abandoned (seconds)
+JOB_TIMEOUT = 1.0
+
+
+@dataclass(frozen=True)
+class Sample:
+    """One published value and when it was read (time.monotonic())."""
+    value: Any
+    timestamp: float
+
+    @property
+    def age(self) -> float:
+        return time.monotonic() - self.timestamp
+
+
+class TelemetryCache:
+    """
+    Thread-safe latest-value store keyed by name ('position', 'moving', 'estop').
+
+    Subscribers are called as callback(name, sample) on the poller thread;
+    Tk code should only record the value there and touch widgets from after().
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Sample] = {}
+        self._subscribers: Dict[int, Callable[[str, Sample], None]] = {}
+        self._next_token = 0
+
+    def publish(self, name: str, value: Any) -> Sample:
+        sample = Sample(value, time.monotonic())
+        with self._lock:
+            self._samples[name] = sample
+            subscribers = list(self._subscribers.values())
+        for callback in subscribers:
+            try:
+                callback(name, sample)
+            except Exception as e:
+                print(f"Telemetry subscriber error: {e}")
+        return sample
+
+    def get(self, name: str) -> Optional[Sample]:
+        with self._lock:
+            return self._samples.get(name)
+
+    def latest(self, name: str, max_age: float = None, default: Any = None) -> Any:
+        """Latest value, or default if never read or older than max_age seconds."""
+        sample = self.get(name)
+        if sample is None or (max_age is not None and sample.age > max_age):
+            return default
+        return sample.value
+
+    def snapshot(self) -> Dict[str, Sample]:
+        with self._lock:
+            return dict(self._samples)
+
+    def subscribe(self, callback: Callable[[str, Sample], None]) -> int:
+        """Register a callback for every publish; returns a token for unsubscribe()."""
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[self._next_token] = callback
+            return self._next_token
+
+    def unsubscribe(self, token: int) -> None:
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+
+class TelemetryService:
+    """
+    Poller thread for one port.
+
+    Position polls go through the I/O worker's telemetry lane (coalesced,
+    never ahead of stop or motion frames) at FAST_INTERVAL while the arm
+    moves and IDLE_INTERVAL once it has been still for FAST_HOLD seconds.
+    The e-stop state is refreshed every ESTOP_INTERVAL.
+    """
+
+    def __init__(self, port: str = None):
+        self.worker = get_io_worker(port)
+        self.cache = TelemetryCache()
+        self._running = False
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._fast_until = 0.0
+        self._last_estop = 0.0
+        self.polls = 0
+
+    # ---------- Lifecycle ----------
+
+    def start(self) -> "TelemetryService":
+        if self._running:
+            return self
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name=f"telemetry-{self.worker.conn.port}",
+                                        daemon=True)
+        self._thread.start()
+        return self
+
+    def shutdown(self, timeout: float = 1.0) -> None:
+        self._running = False
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def poke(self) -> None:
+        """Switch to the fast rate now (call when starting a jog or a program)."""
+        self._fast_until = time.monotonic() + FAST_HOLD
+        self._wake.set()
+
+    # ---------- Convenience readers ----------
+
+    def position(self, max_age: float = None) -> Optional[dict]:
+        return self.cache.latest("position", max_age)
+
+    def estop(self, max_age: float = None) -> Optional[dict]:
+        return self.cache.latest("estop", max_age)
+
+    def interval(self) -> float:
+        return FAST_INTERVAL if time.monotonic() < self._fast_until else IDLE_INTERVAL
+
+    # ---------- Poller ----------
+
+    def _poll_position(self) -> None:
+        reply = self.worker.position_query().wait(JOB_TIMEOUT)
+        pos = None
+        if reply is not None and reply.ok:
+            pos = parse_position(reply.raw.decode("utf-8", errors="ignore"))
+        if pos is None:
+            return
+
+        last = self.cache.latest("position")
+        moving = last is not None and any(
+            abs(pos[axis] - last[axis]) > MOTION_THRESHOLD for axis in ("x", "y", "z"))
+        if moving:
+            self._fast_until = time.monotonic() + FAST_HOLD
+        self.cache.publish("position", pos)
+        self.cache.publish("moving", moving)
+
+    def _poll_estop(self) -> None:
+        reply = self.worker.estop_query().wait(JOB_TIMEOUT)
+        if reply is None or reply.status == "timeout":
+            status = {'is_pressed': None, 'status': 'No reply', 'raw_response': ''}
+        else:
+            status = parse_estop(reply.raw.decode("utf-8", errors="ignore"))
+        self.cache.publish("estop", status)
+
+    def _run(self) -> None:
+        while self._running:
+            try:
+                self._poll_position()
+                if time.monotonic() - self._last_estop >= ESTOP_INTERVAL:
+                    self._last_estop = time.monotonic()
+                    self._poll_estop()
+                self.polls += 1
+            except Exception as e:
+                print(f"Telemetry error: {e}")
+            self._wake.wait(self.interval())
+            self._wake.clear()
+
+
+_services: Dict[str, TelemetryService] = {}
+_services_lock = threading.Lock()
+
+
+def get_telemetry(port: str = None) -> TelemetryService:
+    """Return the running telemetry service for a port, starting it on first use."""
+    worker = get_io_worker(port)
+    with _services_lock:
+        service = _services.get(worker.conn.port)
+        if service is None:
+            service = TelemetryService(worker.conn.port).start()
+            _services[worker.conn.port] = service
+        return service
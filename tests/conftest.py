@@ -0,0 +1,32 @@
+# tests/conftest.py
+#
+# Shared fixtures: an emulated controller on a pty and a scratch timing
+# store, so no test touches a real arm or the station's timings.json.
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from serial_comm import close_all_connections  # noqa: E402
+from timing_store import use_timing_store  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def scratch_timings(tmp_path):
+    return use_timing_store(tmp_path / "timings.json")
+
+
+@pytest.fixture
+def emulator():
+    """A running ControllerEmulator (POSIX only); its port is emulator.port."""
+    if not hasattr(os, "openpty"):
+        pytest.skip("The emulator needs os.openpty")
+    from emulator import ControllerEmulator
+    emu = ControllerEmulator(latency=0.001)
+    emu.start()
+    yield emu
+    close_all_connections()  # pty paths are reused by the next emulator
+    emu.close()
@@ -0,0 +1,48 @@
+import pytest
+
+from order_queue import OrderQueue
+from scheduling import make_policy
+
+
+def drain(queue: OrderQueue) -> list:
+    served = []
+    while True:
+        order = queue.take_next()
+        if order is None:
+            return served
+        served.append(order)
+        queue.complete(order)
+
+
+@pytest.mark.parametrize("max_skip", [0, 1, 3])
+def test_sjf_overtakes_at_most_max_skip(max_skip):
+    queue = OrderQueue(estimate=lambda o: 10.0 * o.quantity,
+                       policy=make_policy("sjf", max_skip))
+    big = queue.add_order("mango", 5)
+    for _ in range(8):
+        queue.add_order("orange", 1)
+
+    served = drain(queue)
+    assert served.index(big) == max_skip
+    assert all(order.skips <= max_skip for order in served)
+
+
+@pytest.mark.parametrize("max_skip", [0, 2])
+def test_grouping_overtakes_at_most_max_skip(max_skip):
+    queue = OrderQueue(policy=make_policy("grouping", max_skip))
+    for flavor in ["mango", "orange", "mango", "orange", "mango", "mango", "orange"]:
+        queue.add_order(flavor, 1)
+
+    served = drain(queue)
+    assert len(served) == 7
+    assert max(order.skips for order in served) <= max_skip
+    for position, order in enumerate(served):
+        assert position <= order.order_id - 1 + max_skip  # No more than max_skip places late
+
+
+def test_plan_matches_serving_order():
+    queue = OrderQueue(estimate=lambda o: 10.0 * o.quantity, policy=make_policy("sjf", 2))
+    for quantity in (4, 1, 3, 1, 2):
+        queue.add_order("mango", quantity)
+    planned = [o.order_id for o in queue.orders]
+    assert [o.order_id for o in drain(queue)] == planned
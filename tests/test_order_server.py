@@ -0,0 +1,78 @@
+import http.client
+import json
+
+import pytest
+
+from config import MAX_ORDER_QUANTITY
+from order_queue import OrderQueue
+from order_server import MAX_BODY, OrderServer, OrderService
+from robot_worker import RobotWorker
+
+
+@pytest.fixture
+def server():
+    queue = OrderQueue()
+    service = OrderService(queue, RobotWorker(queue, make=lambda flavor: None))  # Never started
+    server = OrderServer(service, host="127.0.0.1", port=0).start()
+    yield server
+    server.stop()
+
+
+def request(server, method, path, body=None, headers=None):
+    host, port = server.server_address[:2]
+    conn = http.client.HTTPConnection(host, port, timeout=5)
+    conn.putrequest(method, path)
+    data = json.dumps(body).encode("utf-8") if body is not None else b""
+    headers = dict({"Content-Type": "application/json", "Content-Length": str(len(data))},
+                   **(headers or {}))
+    for name, value in headers.items():
+        conn.putheader(name, value)
+    conn.endheaders()
+    if data and int(headers["Content-Length"]) >= 0:
+        conn.send(data)
+    response = conn.getresponse()
+    result = response.status, json.loads(response.read() or b"null")
+    conn.close()
+    return result
+
+
+def test_valid_order_is_queued(server):
+    status, order = request(server, "POST", "/orders", {"flavor": "mango", "quantity": 2})
+    assert status == 201
+    assert order['flavor'] == "mango" and order['quantity'] == 2
+    assert server.service.queue.get_pending_count() == 1
+
+
+@pytest.mark.parametrize("body", [
+    {"flavor": "grape"},                        # No recipe
+    {"flavor": "../orgin"},                     # Not a recipe name
+    {"flavor": 7},
+    {"flavor": "mango", "quantity": 0},
+    {"flavor": "mango", "quantity": MAX_ORDER_QUANTITY + 1},
+    {"flavor": "mango", "quantity": "2"},
+    {"flavor": "mango", "quantity": True},
+])
+def test_bad_orders_are_rejected(server, body):
+    status, reply = request(server, "POST", "/orders", body)
+    assert status == 400
+    assert reply['error']
+    assert server.service.queue.get_pending_count() == 0
+
+
+def test_negative_content_length_is_rejected(server):
+    status, reply = request(server, "POST", "/orders", {"flavor": "mango"},
+                            headers={"Content-Length": "-5"})
+    assert status == 400
+    assert "Content-Length" in reply['error']
+
+
+def test_oversized_body_is_rejected(server):
+    status, reply = request(server, "POST", "/orders", {"flavor": "mango"},
+                            headers={"Content-Length": str(MAX_BODY + 1)})
+    assert status == 400
+    assert "too large" in reply['error']
+
+
+def test_non_object_body_is_rejected(server):
+    status, _ = request(server, "POST", "/orders", ["mango"])
+    assert status == 400
@@ -0,0 +1,53 @@
+import copy
+
+from models import Program, Step
+from program_compiler import clear_compile_cache, compile_program, program_key
+
+
+def make_program() -> Program:
+    return Program(name="test_cache", steps=[
+        Step(x=10, y=20, z=30, f=100, delay=0.5),
+        Step(do0=40, delay=1.0),
+    ])
+
+
+def frames(compiled):
+    return [frame.data for step in compiled.steps for frame in step.frames]
+
+
+def test_same_content_hits_cache():
+    clear_compile_cache()
+    prog = make_program()
+    first = compile_program(prog)
+    assert compile_program(prog) is first
+    assert compile_program(copy.deepcopy(prog)) is first  # Keyed on content, not identity
+
+
+def test_edited_step_invalidates():
+    clear_compile_cache()
+    prog = make_program()
+    first = compile_program(prog)
+    prog.steps[0].x = 15
+    second = compile_program(prog)
+    assert second is not first
+    assert frames(second) != frames(first)
+    assert b"X15" in frames(second)[0]
+
+
+def test_key_covers_every_change():
+    prog = make_program()
+    key = program_key(prog)
+    for edit in (lambda p: setattr(p.steps[1], "delay", 2.0),
+                 lambda p: setattr(p.steps[1], "do0", 60),
+                 lambda p: p.steps.append(Step(delay=0.1)),
+                 lambda p: setattr(p, "name", "renamed")):
+        changed = copy.deepcopy(prog)
+        edit(changed)
+        assert program_key(changed) != key
+
+
+def test_override_and_modal_are_separate_entries():
+    clear_compile_cache()
+    prog = make_program()
+    assert compile_program(prog, 1.0) is not compile_program(prog, 0.5)
+    assert compile_program(prog, modal=True) is not compile_program(prog, modal=False)
@@ -0,0 +1,43 @@
+import time
+
+import pytest
+
+from models import Program, Step
+from streaming import compiled_frames, step_holds, stream_program
+from program_compiler import compile_program
+
+
+def long_move_program() -> Program:
+    """Short host delays, slow moves: every ack arrives long before the arm stops."""
+    return Program(name="test_stream", steps=[
+        Step(x=0, y=0, z=0, f=20, delay=0.1),
+        Step(x=60, y=0, z=0, f=20, delay=0.1),
+        Step(do0=40, delay=0.3),
+        Step(x=60, y=40, z=0, f=20, delay=0.1),
+    ])
+
+
+@pytest.mark.parametrize("wait_mode", ["delay", "arrival"])
+def test_stream_returns_when_arm_is_done(emulator, wait_mode):
+    prog = long_move_program()
+    start = time.perf_counter()
+    stats = stream_program(prog, port=emulator.port, wait_mode=wait_mode)
+    elapsed = time.perf_counter() - start
+
+    assert not emulator.is_moving()
+    assert stats['idle_wait'] > 0
+    assert elapsed >= sum(step_holds(compile_program(prog), wait_mode=wait_mode))
+    assert emulator.position() == pytest.approx((60, 40, 0))
+
+
+def test_gripper_step_keeps_delay_in_arrival_mode():
+    compiled = compile_program(long_move_program())
+    holds = step_holds(compiled, wait_mode="arrival")
+    assert holds == [0, 0, 0.3, 0]
+    assert "0x550xAA G04 P300 0xAA0x55" in compiled_frames(compiled, wait_mode="arrival")
+
+
+def test_delay_mode_sends_every_delay():
+    compiled = compile_program(long_move_program())
+    assert step_holds(compiled, wait_mode="delay") == [0.1, 0.1, 0.3, 0.1]
+    assert step_holds(compiled, dwell=False) == [0.0] * 4
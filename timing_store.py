@@ -0,0 +1,206 @@
+# timing_store.py
+#
+# Measured execution times, learned online. Every completed run records its
+# per-step and total durations into an exponentially weighted mean and
+# variance per recipe; ETAs (p50 / p90) come from these once a recipe has
+# run, so they follow the real arm as it ages or programs are re-timed.
+
+import json
+import math
+import os
+import threading
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from config import WAIT_MODE, TIMING_FILE
+
+BASE_DIR = Path(__file__).parent
+
+# Weight of the newest sample once a recipe has a few runs (higher adapts faster)
+ALPHA = 0.2
+
+# One-sided 90% point of the normal distribution (p90 = mean + Z90 * std)
+Z90 = 1.2816
+
+
+@dataclass
+class Ewma:
+    """Exponentially weighted mean / variance of one duration (seconds)."""
+    mean: float = 0.0
+    var: float = 0.0
+    count: int = 0
+
+    def add(self, value: float, alpha: float = ALPHA) -> None:
+        # Plain average for the first samples, so early ETAs are not dominated by run 1
+        weight = max(alpha, 1.0 / (self.count + 1))
+        diff = value - self.mean
+        self.mean += weight * diff
+        self.var = (1.0 - weight) * (self.var + weight * diff * diff)
+        self.count += 1
+
+    @property
+    def p50(self) -> float:
+        return self.mean
+
+    @property
+    def p90(self) -> float:
+        return self.mean + Z90 * math.sqrt(self.var)
+
+
+def timing_key(name: str, speed_override: float = 1.0, wait_mode: str = None,
+               streaming: bool = False) -> str:
+    """Store key: the same program runs at different speeds in different modes."""
+    mode = wait_mode or WAIT_MODE
+    return f"{name}|{mode}{'|stream' if streaming else ''}|{speed_override:g}"
+
+
+def program_signature(compiled) -> str:
+    """Short content hash of a CompiledProgram; learned times reset when it changes."""
+    crc = 0
+    for step in compiled.steps:
+        for frame in step.frames:
+            crc = zlib.crc32(frame.data, crc)
+        crc = zlib.crc32(f"{step.delay}/{step.dwell};".encode(), crc)
+    return f"{crc:08x}"
+
+
+class TimingStore:
+    """
+    Learned durations per timing_key(), persisted to a small JSON file.
+
+    record_step() / record_run() update the statistics in memory; record_run()
+    and save() write the file (atomically, so a crash never leaves it half
+    written). A recipe whose signature changed starts learning from scratch.
+    """
+
+    def __init__(self, path: Path = TIMING_FILE, alpha: float = ALPHA):
+        self.path = BASE_DIR / path  # An absolute path replaces BASE_DIR
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()  # One writer of the temp file at a time (fleet)
+        self._recipes: Dict[str, dict] = {}
+        self.load()
+
+    # ---------- Recording ----------
+
+    def _recipe(self, key: str, signature: str) -> dict:
+        recipe = self._recipes.get(key)
+        if recipe is None or recipe['signature'] != signature:
+            recipe = {'signature': signature, 'total': Ewma(), 'steps': []}
+            self._recipes[key] = recipe
+        return recipe
+
+    def record_step(self, key: str, signature: str, index: int, seconds: float) -> None:
+        with self._lock:
+            steps = self._recipe(key, signature)['steps']
+            while len(steps) <= index:
+                steps.append(Ewma())
+            steps[index].add(seconds, self.alpha)
+
+    def record_run(self, key: str, signature: str, seconds: float,
+                   step_seconds: List[float] = None, save: bool = True) -> None:
+        """Record a completed run (and optionally each of its steps), then save."""
+        with self._lock:
+            recipe = self._recipe(key, signature)
+            recipe['total'].add(seconds, self.alpha)
+        for index, value in enumerate(step_seconds or ()):
+            self.record_step(key, signature, index, value)
+        if save:
+            self.save()
+
+    # ---------- Queries ----------
+
+    def stats(self, key: str, signature: str = None) -> Optional[Ewma]:
+        """Whole-run statistics (None if never run or the signature changed)."""
+        with self._lock:
+            recipe = self._recipes.get(key)
+            if recipe is None or (signature is not None and recipe['signature'] != signature):
+                return None
+            total = recipe['total']
+            if total.count:
+                return Ewma(total.mean, total.var, total.count)
+            # Only stepped through (StepExecutor): add up the steps if all were seen
+            steps = recipe['steps']
+            if steps and all(s.count for s in steps):
+                return Ewma(sum(s.mean for s in steps), sum(s.var for s in steps),
+                            min(s.count for s in steps))
+            return None
+
+    def step_stats(self, key: str) -> List[Ewma]:
+        with self._lock:
+            recipe = self._recipes.get(key)
+            return [Ewma(s.mean, s.var, s.count) for s in recipe['steps']] if recipe else []
+
+    def eta(self, key: str, signature: str, fallback: float) -> dict:
+        """
+        Returns: {
+            'p50': float,       # Median seconds
+            'p90': float,       # 90th percentile seconds
+            'variance': float,  # Seconds^2 (0 when not learned yet)
+            'samples': int,     # Runs behind the numbers (0 = fallback model)
+        }
+        """
+        stats = self.stats(key, signature)
+        if stats is None:
+            return {'p50': fallback, 'p90': fallback, 'variance': 0.0, 'samples': 0}
+        return {'p50': stats.p50, 'p90': stats.p90, 'variance': stats.var,
+                'samples': stats.count}
+
+    # ---------- Persistence ----------
+
+    def load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Timing store not loaded ({self.path}): {e}")
+            return
+        with self._lock:
+            self._recipes = {
+                key: {'signature': entry['signature'],
+                      'total': Ewma(*entry['total']),
+                      'steps': [Ewma(*s) for s in entry.get('steps', [])]}
+                for key, entry in data.items()
+            }
+
+    def save(self) -> None:
+        with self._lock:
+            data = {
+                key: {'signature': r['signature'],
+                      'total': [r['total'].mean, r['total'].var, r['total'].count],
+                      'steps': [[s.mean, s.var, s.count] for s in r['steps']]}
+                for key, r in self._recipes.items()
+            }
+        tmp = self.path.with_suffix(".tmp")
+        with self._save_lock:
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, separators=(",", ":"))
+                os.replace(tmp, self.path)
+            except OSError as e:
+                print(f"Timing store not saved ({self.path}): {e}")
+
+
+_store: Optional[TimingStore] = None
+_store_lock = threading.Lock()
+
+
+def get_timing_store() -> TimingStore:
+    """Process-wide store backed by config TIMING_FILE."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = TimingStore()
+        return _store
+
+
+def use_timing_store(path: Path) -> TimingStore:
+    """Point the process-wide store at another file (e.g. a scratch file for emulator runs)."""
+    global _store
+    with _store_lock:
+        _store = TimingStore(path)
+        return _store
@@ -0,0 +1,137 @@
+# ui_events.py
+#
+# Thread -> Tk hand-off. Worker threads never touch widgets; they post
+# callbacks (UIEventQueue) or latest-wins field values (UIStateBus) here and
+# an after() pump applies them on the Tk thread.
+
+import queue
+import threading
+import tkinter as tk
+from typing import Any, Callable, Dict
+
+# Pump period: ~60 frames per second
+PUMP_INTERVAL_MS = 16
+
+# Most callbacks run per tick, so a burst cannot starve redraws
+MAX_EVENTS_PER_TICK = 200
+
+
+class UIEventQueue:
+    """
+    Thread-safe queue of callbacks drained on the Tk thread.
+
+        events = UIEventQueue(root).start()
+        events.post(label.config, text="done")   # from any thread
+    """
+
+    def __init__(self, widget: tk.Misc, interval_ms: int = PUMP_INTERVAL_MS):
+        self.widget = widget
+        self.interval_ms = interval_ms
+        self._queue: "queue.SimpleQueue" = queue.SimpleQueue()
+        self._job = None
+
+    def post(self, callback: Callable, *args, **kwargs) -> None:
+        """Queue callback(*args, **kwargs) to run on the Tk thread."""
+        self._queue.put((callback, args, kwargs))
+
+    def start(self) -> "UIEventQueue":
+        if self._job is None:
+            self._job = self.widget.after(self.interval_ms, self._pump)
+        return self
+
+    def stop(self) -> None:
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except tk.TclError:
+                pass  # Widget already destroyed
+            self._job = None
+
+    def _pump(self) -> None:
+        for _ in range(MAX_EVENTS_PER_TICK):
+            try:
+                callback, args, kwargs = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            try:
+                callback(*args, **kwargs)
+            except Exception as e:
+                print(f"UI event error in {getattr(callback, '__name__', callback)}: {e}")
+        try:
+            self._job = self.widget.after(self.interval_ms, self._pump)
+        except tk.TclError:
+            self._job = None  # Widget destroyed
+
+
+# UIStateBus apply rate (frames per second)
+STATE_FPS = 30
+
+
+class UIStateBus:
+    """
+    Latest-wins UI state shared between worker threads and Tk.
+
+    Workers call set(name, value) as often as they like; a pump running at
+    a fixed frame rate applies only the newest value of each changed field,
+    so Tk work per frame is bounded by the number of bound fields no matter
+    how fast steps complete.
+
+        bus = UIStateBus(root)
+        bus.bind("progress", lambda p: progress_var.set(p))   # Tk thread
+        bus.start()
+        bus.set("progress", 42.0)                              # any thread
+    """
+
+    def __init__(self, widget: tk.Misc, fps: int = STATE_FPS):
+        self.widget = widget
+        self.interval_ms = max(1, int(1000 / fps))
+        self._lock = threading.Lock()
+        self._dirty: Dict[str, Any] = {}
+        self._appliers: Dict[str, Callable[[Any], None]] = {}
+        self._job = None
+
+    def bind(self, name: str, apply: Callable[[Any], None]) -> None:
+        """Register the Tk-side function that shows a field (call on the Tk thread)."""
+        self._appliers[name] = apply
+
+    def set(self, name: str, value: Any = None) -> None:
+        """Publish a field value from any thread; replaces any value not yet shown."""
+        with self._lock:
+            self._dirty[name] = value
+
+    def update(self, **fields) -> None:
+        with self._lock:
+            self._dirty.update(fields)
+
+    def start(self) -> "UIStateBus":
+        if self._job is None:
+            self._job = self.widget.after(self.interval_ms, self._pump)
+        return self
+
+    def stop(self) -> None:
+        if self._job is not None:
+            try:
+                self.widget.after_cancel(self._job)
+            except tk.TclError:
+                pass  # Widget already destroyed
+            self._job = None
+
+    def flush(self) -> None:
+        """Apply pending values now (Tk thread only)."""
+        with self._lock:
+            pending, self._dirty = self._dirty, {}
+        for name, value in pending.items():
+            apply = self._appliers.get(name)
+            if apply is None:
+                continue
+            try:
+                apply(value)
+            except Exception as e:
+                print(f"UI state error in {name}: {e}")
+
+    def _pump(self) -> None:
+        self.flush()
+        try:
+            self._job = self.widget.after(self.interval_ms, self._pump)
+        except tk.TclError:
+            self._job = None  # Widget destroyed